@@ -18,6 +18,7 @@ CONFIG_DIR="/etc/lobbyshift"
 CONFIGS_DIR="$CONFIG_DIR/configs"
 SERVICE_USER="lobbyshift"
 WEB_PORT=8080
+WG_INTERFACE="lobbyshift"
 
 print_banner() {
     echo -e "${BLUE}"
@@ -84,6 +85,8 @@ install_dependencies() {
         python3-venv \
         iptables \
         iptables-persistent \
+        ethtool \
+        nftables \
         curl \
         git
     
@@ -158,6 +161,33 @@ web_host: 0.0.0.0
 autostart: false
 autostart_config: ""
 
+# Region switching: make_before_break (seamless) or classic
+switch_mode: make_before_break
+# Host pinged during switches to measure packet loss (empty = first host in allowed_ips)
+probe_host: ""
+
+# Matchmaking RTT probes through the tunnel (seconds, 0 = off)
+probe_interval: 60
+probe_targets: []
+
+# Tunnel traffic above which non-urgent switches wait for idle (bytes/s, packets/s)
+busy_threshold: 5000
+busy_pps: 20
+# Conntrack UDP flows toward allowed_ips that count as a match (0 = don't check)
+busy_flows: 0
+
+# Throughput tuning (GRO/GSO, rps/xps, fq_codel at startup; tunnel MTU from path MTU discovery)
+tune_interfaces: false
+path_mtu_discovery: false
+# Fast path for established game flows (nftables flowtable, kernel 5.7+)
+flow_offload: false
+# Tunneled traffic per console/PC (nftables counters)
+client_accounting: false
+
+# Connection log retention (0 = keep)
+log_retention_days: 30
+log_retention_max_entries: 1000
+
 # Logging
 log_level: INFO
 log_file: /var/log/lobbyshift/lobbyshift.log
@@ -171,7 +201,15 @@ setup_networking() {
     
     # Enable IP forwarding
     echo "net.ipv4.ip_forward=1" > /etc/sysctl.d/99-lobbyshift.conf
+    # IPv6 matchmaking ranges; keep accepting router advertisements on the LAN side
+    echo "net.ipv6.conf.all.forwarding=1" >> /etc/sysctl.d/99-lobbyshift.conf
+    echo "net.ipv6.conf.$INTERFACE.accept_ra=2" >> /etc/sysctl.d/99-lobbyshift.conf
+    # Fair queueing keeps game packets from waiting behind bulk traffic
+    echo "net.core.default_qdisc=fq_codel" >> /etc/sysctl.d/99-lobbyshift.conf
     sysctl -w net.ipv4.ip_forward=1
+    sysctl -w net.ipv6.conf.$INTERFACE.accept_ra=2
+    sysctl -w net.ipv6.conf.all.forwarding=1
+    sysctl -w net.core.default_qdisc=fq_codel
     
     # Get local subnet
     LOCAL_SUBNET=$(ip -o -f inet addr show $INTERFACE | awk '{print $4}' | head -n1)
@@ -189,19 +227,22 @@ setup_networking() {
     # Create iptables rules script
     cat > $CONFIG_DIR/iptables-rules.sh << 'EOFSCRIPT'
 #!/bin/bash
-# LobbyShift iptables rules
+# LobbyShift iptables rules (gateway mode)
+# Tunnel NAT/forwarding for allowed_ips (IPv4 and IPv6) is managed by LobbyShift itself
 
 INTERFACE="PLACEHOLDER_INTERFACE"
 LOCAL_SUBNET="PLACEHOLDER_SUBNET"
-COD_IPS="185.34.0.0/16"
-
-# Flush existing LobbyShift rules (marked with comment)
-iptables -t nat -S 2>/dev/null | grep "lobbyshift" | while read rule; do
-    iptables -t nat $(echo $rule | sed 's/-A/-D/') 2>/dev/null
-done
-
-iptables -S 2>/dev/null | grep "lobbyshift" | while read rule; do
-    iptables $(echo $rule | sed 's/-A/-D/') 2>/dev/null
+# Rules are tagged per instance, so instances with their own wg_interface don't remove each other's
+WG_INTERFACE="PLACEHOLDER_WG_INTERFACE"
+TAG="lobbyshift-gateway-$WG_INTERFACE"
+
+# Flush this instance's gateway rules (marked with comment)
+for cmd in iptables ip6tables; do
+    for table in nat filter; do
+        $cmd -t $table -S 2>/dev/null | grep -E -- "$TAG(\"| |$)" | while read rule; do
+            $cmd -t $table $(echo $rule | sed 's/-A/-D/') 2>/dev/null
+        done
+    done
 done
 
 # ============================================
@@ -209,29 +250,20 @@ done
 # ============================================
 
 # NAT for all outgoing traffic from LAN (this allows PS5/Xbox to access internet)
-iptables -t nat -A POSTROUTING -o $INTERFACE -s $LOCAL_SUBNET -j MASQUERADE -m comment --comment "lobbyshift-gateway"
+iptables -t nat -A POSTROUTING -o $INTERFACE -s $LOCAL_SUBNET -j MASQUERADE -m comment --comment "$TAG"
 
 # Allow forwarding from LAN to internet
-iptables -A FORWARD -i $INTERFACE -s $LOCAL_SUBNET -j ACCEPT -m comment --comment "lobbyshift-gateway"
+iptables -A FORWARD -i $INTERFACE -s $LOCAL_SUBNET -j ACCEPT -m comment --comment "$TAG"
 
 # Allow return traffic
-iptables -A FORWARD -o $INTERFACE -d $LOCAL_SUBNET -m state --state RELATED,ESTABLISHED -j ACCEPT -m comment --comment "lobbyshift-gateway"
-
-# ============================================
-# VPN MODE - Route CoD traffic through VPN
-# ============================================
+iptables -A FORWARD -o $INTERFACE -d $LOCAL_SUBNET -m state --state RELATED,ESTABLISHED -j ACCEPT -m comment --comment "$TAG"
 
-# Only apply if VPN interface exists
-if ip link show lobbyshift &>/dev/null; then
-    # NAT for VPN traffic
-    iptables -t nat -A POSTROUTING -o lobbyshift -j MASQUERADE -m comment --comment "lobbyshift-vpn"
-    
-    # Forward CoD traffic to VPN
-    iptables -A FORWARD -i $INTERFACE -o lobbyshift -s $LOCAL_SUBNET -d $COD_IPS -j ACCEPT -m comment --comment "lobbyshift-vpn"
-    
-    # Allow return traffic from VPN
-    iptables -A FORWARD -i lobbyshift -o $INTERFACE -m state --state RELATED,ESTABLISHED -j ACCEPT -m comment --comment "lobbyshift-vpn"
-fi
+# IPv6: forward LAN traffic into the tunnel only (both make-before-break interfaces),
+# all.forwarding=1 must not turn the gateway into an open IPv6 router
+for tunnel in $WG_INTERFACE $WG_INTERFACE-b; do
+    ip6tables -A FORWARD -i $INTERFACE -o $tunnel -j ACCEPT -m comment --comment "$TAG"
+    ip6tables -A FORWARD -i $tunnel -o $INTERFACE -m state --state RELATED,ESTABLISHED -j ACCEPT -m comment --comment "$TAG"
+done
 
 echo "iptables rules applied successfully"
 EOFSCRIPT
@@ -239,6 +271,7 @@ EOFSCRIPT
     # Replace placeholders with actual values
     sed -i "s/PLACEHOLDER_INTERFACE/$INTERFACE/g" $CONFIG_DIR/iptables-rules.sh
     sed -i "s|PLACEHOLDER_SUBNET|$LOCAL_SUBNET|g" $CONFIG_DIR/iptables-rules.sh
+    sed -i "s/PLACEHOLDER_WG_INTERFACE/$WG_INTERFACE/g" $CONFIG_DIR/iptables-rules.sh
     
     chmod +x $CONFIG_DIR/iptables-rules.sh
     
@@ -325,6 +358,12 @@ case "$1" in
         echo ""
         echo "=== Forward Rules ==="
         sudo iptables -L FORWARD -v -n | grep -E "lobbyshift|Chain"
+        echo ""
+        echo "=== IPv6 NAT Rules ==="
+        sudo ip6tables -t nat -L -v -n | grep -E "lobbyshift|Chain"
+        echo ""
+        echo "=== IPv6 Forward Rules ==="
+        sudo ip6tables -L FORWARD -v -n | grep -E "lobbyshift|Chain"
         ;;
     *)
         echo "LobbyShift CLI"
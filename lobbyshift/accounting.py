@@ -0,0 +1,233 @@
+"""
+LobbyShift - Per-Client Traffic Accounting
+"""
+
+import json
+import time
+import asyncio
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .config import CONFIG_DIR
+from .runner import CommandRunner
+
+
+ACCOUNTING_TABLE = "lobbyshift_accounting"
+# Seconds between counter samples, and samples kept per client (10 minutes)
+ACCOUNTING_INTERVAL = 5
+ACCOUNTING_HISTORY = 120
+# Clients the kernel keeps counters for, and how long an idle client's counters live (seconds)
+ACCOUNTING_MAX_CLIENTS = 4096
+ACCOUNTING_CLIENT_TIMEOUT = 3600
+
+_ruleset_file = CONFIG_DIR / "accounting.nft"
+
+
+class ClientAccounting:
+    """Byte and packet counters per LAN client for traffic to and from the tunneled ranges"""
+
+    def __init__(self, runner: CommandRunner, lan_interface: str, table: str = ACCOUNTING_TABLE):
+        self.runner = runner
+        self.lan_interface = lan_interface
+        self.table = table
+        # "ingress/egress" (netdev hooks, sees flowtable-offloaded flows) or "forward" (older kernels)
+        self.hook: Optional[str] = None
+        self.ranges: Optional[List[str]] = None
+        self.error: Optional[str] = None
+        self._synced = False
+        # Client address -> {"counters": last kernel counters, "totals", "rate", "history", "last_active"}
+        self.clients: Dict[str, Dict] = {}
+        self.sampled_at: Optional[float] = None
+
+    # =========================================================================
+    # Ruleset
+    # =========================================================================
+
+    def _ruleset(self, family: str, ranges: List[str]) -> str:
+        """nftables table counting per-client traffic toward (tx) and from (rx) the ranges"""
+        table = self.table
+        lan = self.lan_interface
+        sets = []
+        for version, addr_type in ((4, "ipv4_addr"), (6, "ipv6_addr")):
+            members = [cidr for cidr in ranges if (":" in cidr) == (version == 6)]
+            elements = f" elements = {{ {', '.join(members)} }};" if members else ""
+            sets.append(f"    set ranges{version} {{ type {addr_type}; flags interval;{elements} }}")
+            for direction in ("tx", "rx"):
+                sets.append(
+                    f"    set {direction}{version} {{ type {addr_type}; size {ACCOUNTING_MAX_CLIENTS}; "
+                    f"flags dynamic,timeout; timeout {ACCOUNTING_CLIENT_TIMEOUT}s; }}"
+                )
+
+        # Client -> game server is keyed by source, game server -> client by destination (after un-NAT)
+        tx = [
+            'ip daddr @ranges4 update @tx4 { ip saddr counter }',
+            'ip6 daddr @ranges6 update @tx6 { ip6 saddr counter }',
+        ]
+        rx = [
+            'ip saddr @ranges4 update @rx4 { ip daddr counter }',
+            'ip6 saddr @ranges6 update @rx6 { ip6 daddr counter }',
+        ]
+        if family == "netdev":
+            # Ahead of the flowtable (priority 0), so offloaded flows are still counted
+            chains = [
+                ("ingress", f'type filter hook ingress device "{lan}" priority -10; policy accept;', tx),
+                ("egress", f'type filter hook egress device "{lan}" priority -10; policy accept;', rx),
+            ]
+        else:
+            chains = [
+                ("forward", "type filter hook forward priority -10; policy accept;",
+                 [f'iifname "{lan}" {rule}' for rule in tx] + [f'oifname "{lan}" {rule}' for rule in rx]),
+            ]
+
+        lines = [f"table {family} {table}", f"delete table {family} {table}", f"table {family} {table} {{"]
+        lines += sets
+        for name, hook, rules in chains:
+            lines.append(f"    chain {name} {{")
+            lines.append(f"        {hook}")
+            lines += [f"        {rule}" for rule in rules]
+            lines.append("    }")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    async def _remove(self) -> None:
+        """Delete the accounting table in either family"""
+        for family in ("netdev", "inet"):
+            await self.runner.run(["nft", "delete", "table", family, self.table], check=False)
+
+    async def sync(self, ranges: Optional[List[str]]) -> None:
+        """Count traffic for the ranges the active tunnel carries, or stop counting (None)"""
+        if self._synced and ranges == self.ranges:
+            return
+        try:
+            await self._remove()
+            self.hook = None
+            if ranges:
+                # The egress hook needs kernel 5.16+, fall back to the forward hook
+                for family, hook in (("netdev", "ingress/egress"), ("inet", "forward")):
+                    _ruleset_file.write_text(self._ruleset(family, ranges))
+                    result = await self.runner.run(["nft", "-f", str(_ruleset_file)], check=False)
+                    if result.returncode == 0:
+                        self.hook = hook
+                        break
+                else:
+                    raise RuntimeError(result.stderr.strip() or "nft failed")
+            # The kernel counters start from zero in the new table
+            for client in self.clients.values():
+                client["counters"] = [0, 0, 0, 0]
+            self.ranges = ranges
+            self.error = None
+            self._synced = True
+        except Exception as e:
+            self.ranges = None
+            self.error = str(e)
+            self._synced = False
+            print(f"Client accounting failed: {e}")
+
+    # =========================================================================
+    # Sampling
+    # =========================================================================
+
+    async def _read_counters(self) -> Dict[str, List[int]]:
+        """Kernel counters per client: [rx_bytes, tx_bytes, rx_packets, tx_packets]"""
+        family = "netdev" if self.hook == "ingress/egress" else "inet"
+        # One listing for all clients, so a sample costs the same command however many there are
+        result = await self.runner.run(["nft", "-j", "list", "table", family, self.table], check=False)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "nft list failed")
+
+        counters: Dict[str, List[int]] = {}
+        for item in json.loads(result.stdout).get("nftables", []):
+            nft_set = item.get("set")
+            if not nft_set or nft_set.get("name", "")[:2] not in ("rx", "tx"):
+                continue
+            offset = 0 if nft_set["name"].startswith("rx") else 1
+            for element in nft_set.get("elem", []):
+                element = element.get("elem", element) if isinstance(element, dict) else {"val": element}
+                counter = element.get("counter") or {}
+                values = counters.setdefault(str(element.get("val")), [0, 0, 0, 0])
+                values[offset] += counter.get("bytes", 0)
+                values[offset + 2] += counter.get("packets", 0)
+        return counters
+
+    async def sample(self) -> None:
+        """Read the counters and append the deltas since the last sample to each client's history"""
+        now = time.time()
+        counters = await self._read_counters()
+        elapsed = now - self.sampled_at if self.sampled_at else None
+
+        for address, values in counters.items():
+            client = self.clients.get(address)
+            if client is None:
+                client = self.clients[address] = {
+                    "counters": [0, 0, 0, 0],
+                    "totals": [0, 0, 0, 0],
+                    "rate": [0, 0, 0, 0],
+                    "history": deque(maxlen=ACCOUNTING_HISTORY),
+                    "last_active": now
+                }
+            # Counters start over when the table is rebuilt (switch) or the entry expired
+            deltas = [value - last if value >= last else value for value, last in zip(values, client["counters"])]
+            client["counters"] = values
+            client["totals"] = [total + delta for total, delta in zip(client["totals"], deltas)]
+            client["rate"] = [int(delta / elapsed) for delta in deltas] if elapsed else [0, 0, 0, 0]
+            if any(deltas):
+                client["last_active"] = now
+            client["history"].append((int(now), *deltas))
+
+        # The kernel dropped clients idle longer than the set timeout, follow it
+        for address in set(self.clients) - set(counters):
+            del self.clients[address]
+        self.sampled_at = now
+
+    async def run(self, interval: int = ACCOUNTING_INTERVAL,
+                  on_sample: Optional[Callable[[Dict], None]] = None) -> None:
+        """Sample the counters in the background"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.hook:
+                if self.clients:
+                    self.clients.clear()
+                    self.sampled_at = None
+                continue
+            try:
+                await self.sample()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Client accounting sample failed: {e}")
+                continue
+            if on_sample:
+                on_sample(self.get_clients())
+
+    # =========================================================================
+    # Reporting
+    # =========================================================================
+
+    @staticmethod
+    def _client_summary(address: str, client: Dict) -> Dict:
+        """Totals and current rates of one client"""
+        totals, rate = client["totals"], client["rate"]
+        return {
+            "address": address,
+            "rx_bytes": totals[0], "tx_bytes": totals[1], "rx_packets": totals[2], "tx_packets": totals[3],
+            "rx_bps": rate[0], "tx_bps": rate[1], "rx_pps": rate[2], "tx_pps": rate[3],
+            "last_active": client["last_active"]
+        }
+
+    def get_clients(self) -> Dict:
+        """All clients with totals and current rates, busiest first"""
+        clients = [self._client_summary(address, client) for address, client in self.clients.items()]
+        clients.sort(key=lambda c: (c["rx_bps"] + c["tx_bps"], c["rx_bytes"] + c["tx_bytes"]), reverse=True)
+        return {
+            "hook": self.hook,
+            "ranges": self.ranges,
+            "error": self.error,
+            "sampled_at": self.sampled_at,
+            "clients": clients
+        }
+
+    def get_client(self, address: str) -> Optional[Dict]:
+        """One client with its sample history ([time, rx_bytes, tx_bytes, rx_packets, tx_packets] deltas)"""
+        client = self.clients.get(address)
+        if client is None:
+            return None
+        return {**self._client_summary(address, client), "history": [list(sample) for sample in client["history"]]}
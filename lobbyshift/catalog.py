@@ -0,0 +1,162 @@
+"""
+LobbyShift - Config Catalog Index
+"""
+
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+
+CONTINENT_NAMES = {
+    "AF": "Africa",
+    "AN": "Antarctica",
+    "AS": "Asia",
+    "EU": "Europe",
+    "NA": "North America",
+    "OC": "Oceania",
+    "SA": "South America",
+}
+
+_CONTINENT_COUNTRIES = {
+    "AF": "DZ AO BJ BW BF BI CM CV CF TD KM CG CD CI DJ EG GQ ER SZ ET GA GM GH GN GW KE LS LR LY "
+          "MG MW ML MR MU YT MA MZ NA NE NG RE RW SH ST SN SC SL SO ZA SS SD TZ TG TN UG EH ZM ZW",
+    "AN": "AQ GS",
+    "AS": "AF AM AZ BH BD BT BN KH CN GE HK IN ID IR IQ IL JP JO KZ KP KR KW KG LA LB MO MY MV MN "
+          "MM NP OM PK PS PH QA SA SG LK SY TW TJ TH TL TR TM AE UZ VN YE",
+    "EU": "AL AD AT BY BE BA BG HR CY CZ DK EE FO FI FR DE GI GR GG HU IS IE IM IT JE LV LI LT LU "
+          "MT MD MC ME NL MK NO PL PT RO RU SM RS SK SI ES SJ SE CH UA GB UK",
+    "NA": "AI AG AW BS BB BZ BM CA KY CR CU CW DM DO SV GL GD GP GT HT HN JM MQ MX MS NI PA PR BL "
+          "KN LC MF PM VC SX TT TC US VG VI",
+    "OC": "AS AU FJ PF GU KI MH FM NR NC NZ NU NF MP PW PG PN WS SB TK TO TV VU WF UM",
+    "SA": "AR BO BR CL CO EC FK GF GY PY PE SR UY VE",
+}
+
+# Country code -> continent code
+COUNTRY_CONTINENTS = {
+    code: continent
+    for continent, codes in _CONTINENT_COUNTRIES.items()
+    for code in codes.split()
+}
+
+SORT_KEYS = ("name", "country", "latency", "last_used")
+
+
+def get_continent(country_code: Optional[str]) -> Optional[str]:
+    """Get the continent code for a country code"""
+    return COUNTRY_CONTINENTS.get((country_code or "").upper())
+
+
+class ConfigIndex:
+    """Secondary indexes over the config catalog, kept up to date incrementally"""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self.by_country: Dict[str, Set[str]] = {}
+        self.by_continent: Dict[str, Set[str]] = {}
+        self.favorites: Set[str] = set()
+        self.latency: Dict[str, float] = {}
+        # Unix timestamps
+        self.last_used: Dict[str, float] = {}
+
+    def _unlink(self, name: str) -> None:
+        """Remove a config from the country/continent buckets"""
+        entry = self.entries.get(name)
+        if not entry:
+            return
+        for bucket, key in ((self.by_country, entry["country"].get("code")),
+                            (self.by_continent, entry.get("continent"))):
+            names = bucket.get(key)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del bucket[key]
+
+    def update(self, entry: Dict) -> None:
+        """Add or replace a catalog entry"""
+        name = entry["name"]
+        self._unlink(name)
+
+        entry = dict(entry, continent=get_continent(entry["country"].get("code")))
+        self.entries[name] = entry
+        self.by_country.setdefault(entry["country"].get("code"), set()).add(name)
+        if entry["continent"]:
+            self.by_continent.setdefault(entry["continent"], set()).add(name)
+
+    def remove(self, name: str) -> None:
+        """Drop a config from all indexes"""
+        self._unlink(name)
+        self.entries.pop(name, None)
+        self.latency.pop(name, None)
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Look up one catalog entry by name"""
+        return self.entries.get(name)
+
+    def set_favorites(self, favorites: List[str]) -> None:
+        """Replace the favorite set"""
+        self.favorites = set(favorites)
+
+    def set_latency(self, name: str, latency_ms: Optional[float]) -> None:
+        """Record the latest measured latency for a config"""
+        if latency_ms is None:
+            self.latency.pop(name, None)
+        else:
+            self.latency[name] = latency_ms
+
+    def set_last_used(self, name: str, timestamp: str) -> None:
+        """Record when a config was last connected (ISO timestamp)"""
+        try:
+            self.last_used[name] = datetime.fromisoformat(timestamp).timestamp()
+        except (TypeError, ValueError):
+            pass
+
+    def _sort_key(self, sort: str):
+        """Build a sort key function, entries without a value sort last"""
+        if sort == "latency":
+            return lambda name: (name not in self.latency, self.latency.get(name, 0), name.lower())
+        if sort == "last_used":
+            # Most recently used first
+            return lambda name: (name not in self.last_used, -self.last_used.get(name, 0), name.lower())
+        if sort == "country":
+            return lambda name: (self.entries[name]["country"].get("name", ""), name.lower())
+        # Default: favorites first, then alphabetically
+        return lambda name: (name not in self.favorites, name.lower())
+
+    def query(
+        self,
+        country: Optional[str] = None,
+        continent: Optional[str] = None,
+        favorite: Optional[bool] = None,
+        sort: str = "name",
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """Filter and sort configs using the indexes, returns a page of names and the total"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+
+        candidates: Optional[Set[str]] = None
+        if country:
+            candidates = set(self.by_country.get(country.upper(), ()))
+        if continent:
+            names = self.by_continent.get(continent.upper(), set())
+            candidates = names.copy() if candidates is None else candidates & names
+        if favorite is not None:
+            if favorite:
+                names = self.favorites & self.entries.keys()
+                candidates = names if candidates is None else candidates & names
+            else:
+                base = self.entries.keys() if candidates is None else candidates
+                candidates = set(base) - self.favorites
+        if candidates is None:
+            candidates = set(self.entries)
+
+        key = self._sort_key(sort)
+        if limit is None:
+            ordered = sorted(candidates, key=key)[offset:]
+        else:
+            # Only the requested page needs to be ordered
+            ordered = heapq.nsmallest(offset + limit, candidates, key=key)[offset:]
+
+        return {"names": ordered, "total": len(candidates)}
+
@@ -0,0 +1,143 @@
+"""
+LobbyShift - Multi-Gateway Cluster Controller
+"""
+
+import hmac
+import json
+import asyncio
+import ipaddress
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional
+
+
+# Per-agent request timeout (seconds)
+CLUSTER_TIMEOUT = 5
+# Maximum concurrent requests to agents
+CLUSTER_CONCURRENCY = 16
+
+
+def is_insecure_url(url: str) -> bool:
+    """Check if an agent URL sends tokens and configs (private keys) in clear text over the network"""
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme != "http":
+        return False
+    host = parsed.hostname or ""
+    if host == "localhost":
+        return False
+    try:
+        return not ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return True
+
+
+def check_token(expected: str, authorization: Optional[str]) -> bool:
+    """Check a 'Bearer <token>' header against the configured cluster token"""
+    if not expected or not authorization or not authorization.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(authorization[len("Bearer "):].encode(), expected.encode())
+
+
+class ClusterController:
+    """Aggregates and manages several LobbyShift agents over their HTTP API"""
+
+    def __init__(self, agents: List[Dict]):
+        # Each agent: {"name": ..., "url": "https://host:port", "token": ...}
+        self.agents = {
+            agent.get("name") or agent["url"]: {**agent, "url": agent["url"].rstrip("/")}
+            for agent in agents
+        }
+        for name, agent in self.agents.items():
+            if is_insecure_url(agent["url"]):
+                print(f"Warning: agent {name} uses {agent['url']}, config pushes carry WireGuard private keys "
+                      f"in clear text; put the agent behind HTTPS (reverse proxy) or a VPN")
+        self._semaphore = asyncio.Semaphore(CLUSTER_CONCURRENCY)
+
+    def _get_agent(self, name: str) -> Dict:
+        """Get an agent by name"""
+        if name not in self.agents:
+            raise KeyError(name)
+        return self.agents[name]
+
+    @staticmethod
+    def _http(agent: Dict, method: str, path: str, body: Optional[Dict]) -> Dict:
+        """Blocking HTTP request to an agent"""
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            f"{agent['url']}{path}",
+            data=data,
+            method=method,
+            headers={
+                "Authorization": f"Bearer {agent.get('token', '')}",
+                "Content-Type": "application/json",
+                "User-Agent": "LobbyShift-Controller/1.0"
+            }
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=CLUSTER_TIMEOUT) as response:
+                return json.loads(response.read().decode())
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode(errors="replace")
+            raise RuntimeError(f"HTTP {e.code}: {detail}")
+
+    async def _request(self, name: str, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        """Request one agent, returns {"agent", "ok", "data"|"error"}"""
+        agent = self._get_agent(name)
+        async with self._semaphore:
+            try:
+                data = await asyncio.to_thread(self._http, agent, method, path, body)
+                return {"agent": name, "ok": True, "data": data}
+            except Exception as e:
+                return {"agent": name, "ok": False, "error": str(e)}
+
+    async def fan_out(self, method: str, path: str, body: Optional[Dict] = None,
+                      agents: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Send the same request to several agents concurrently"""
+        names = agents or list(self.agents)
+        results = await asyncio.gather(*(self._request(name, method, path, body) for name in names))
+        return {result["agent"]: result for result in results}
+
+    # =========================================================================
+    # Aggregation
+    # =========================================================================
+
+    async def get_summaries(self) -> Dict[str, Dict]:
+        """Status, metrics and config catalog of every agent"""
+        return await self.fan_out("GET", "/api/agent/summary")
+
+    async def get_latency_table(self) -> Dict:
+        """Matchmaking RTT per config and agent, plus the best agent per config"""
+        summaries = await self.get_summaries()
+        table: Dict[str, Dict] = {}
+
+        for name, result in summaries.items():
+            if not result["ok"]:
+                continue
+            for cfg in result["data"].get("configs", []):
+                row = table.setdefault(cfg["name"], {
+                    "country": cfg.get("country", {}).get("code"),
+                    "agents": {}
+                })
+                row["agents"][name] = cfg.get("latency_ms")
+
+        for row in table.values():
+            measured = {agent: rtt for agent, rtt in row["agents"].items() if rtt is not None}
+            row["best_agent"] = min(measured, key=measured.get) if measured else None
+
+        errors = {name: result["error"] for name, result in summaries.items() if not result["ok"]}
+        return {"latency": table, "errors": errors}
+
+    # =========================================================================
+    # Management
+    # =========================================================================
+
+    async def push_configs(self, configs: List[Dict], agents: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Upload configs ({"name", "content"}) to several agents in one request each"""
+        return await self.fan_out("POST", "/api/agent/configs", {"configs": configs}, agents)
+
+    async def switch(self, agent: str, config_name: str, when_idle: bool = False,
+                     mode: Optional[str] = None) -> Dict:
+        """Switch an agent to a config"""
+        path = f"/api/agent/switch/{urllib.request.quote(config_name)}"
+        return await self._request(agent, "POST", path, {"when_idle": when_idle, "mode": mode})
@@ -9,7 +9,9 @@ from typing import List, Optional
 import yaml
 
 
-CONFIG_FILE = Path("/etc/lobbyshift/config.yaml")
+# Override to run several instances on one host (e.g. for cluster testing)
+CONFIG_DIR = Path(os.environ.get("LOBBYSHIFT_CONFIG_DIR", "/etc/lobbyshift"))
+CONFIG_FILE = CONFIG_DIR / "config.yaml"
 
 # Default CoD matchmaking IP ranges
 DEFAULT_ALLOWED_IPS = ["185.34.0.0/16"]
@@ -22,6 +24,8 @@ class Config:
     # Network
     interface: str = "eth0"
     server_ip: str = "192.168.1.1"
+    # WireGuard interface managed by LobbyShift
+    wg_interface: str = "lobbyshift"
     
     # CoD IPs to route through VPN
     allowed_ips: List[str] = field(default_factory=lambda: DEFAULT_ALLOWED_IPS.copy())
@@ -34,6 +38,47 @@ class Config:
     autostart: bool = False
     autostart_config: str = ""
     
+    # Switching ("make_before_break" or "classic")
+    switch_mode: str = "make_before_break"
+    # Host pinged during switches to measure packet loss (default: first host in allowed_ips)
+    probe_host: str = ""
+    
+    # Matchmaking RTT probes through the tunnel (seconds, 0 = off)
+    probe_interval: int = 60
+    # Addresses inside allowed_ips to probe (default: sampled from each range)
+    probe_targets: List[str] = field(default_factory=list)
+    
+    # Tunnel traffic above which non-urgent switches wait for idle (bytes/s, packets/s)
+    busy_threshold: int = 5000
+    busy_pps: int = 20
+    # Conntrack UDP flows toward allowed_ips that count as a match (0 = don't check)
+    busy_flows: int = 0
+    
+    # Cluster: token agents accept from a controller (empty = agent API off),
+    # and for a controller the agents to manage: [{"name", "url", "token"}]
+    cluster_name: str = ""
+    cluster_token: str = ""
+    cluster_agents: List[dict] = field(default_factory=list)
+    
+    # Connection log retention, enforced in the background (0 = keep)
+    log_retention_days: int = 30
+    log_retention_max_entries: int = 1000
+    
+    # Throughput tuning: GRO/GSO, rps/xps and fq_codel on the LAN interface and tunnel at startup,
+    # and tunnel MTU from the discovered path MTU to each endpoint
+    tune_interfaces: bool = False
+    path_mtu_discovery: bool = False
+    # nftables flowtable fast path for established flows between interface and the tunnel
+    flow_offload: bool = False
+    # Per-LAN-client byte/packet counters for tunneled traffic (/api/clients)
+    client_accounting: bool = False
+    
+    # Debugging: keep traces of requests slower than trace_slow_ms (/api/debug/traces),
+    # and allow on-demand sampling profiles (/api/debug/profile)
+    tracing: bool = False
+    trace_slow_ms: int = 200
+    profiler_enabled: bool = False
+    
     # Logging
     log_level: str = "INFO"
     log_file: str = "/var/log/lobbyshift/lobbyshift.log"
@@ -55,18 +100,21 @@ def load_config() -> Config:
         except Exception as e:
             print(f"Warning: Could not load config file: {e}")
     
-    # Auto-detect server IP if not set
+    return config
+
+
+def detect_server_ip(config: Config) -> None:
+    """Auto-detect server IP if not set (opens an outbound socket, call off the startup path)"""
     if config.server_ip == "192.168.1.1":
         try:
             import socket
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.settimeout(2)
             s.connect(("8.8.8.8", 80))
             config.server_ip = s.getsockname()[0]
             s.close()
         except:
             pass
-    
-    return config
 
 
 def save_config(config: Config) -> None:
@@ -74,11 +122,31 @@ def save_config(config: Config) -> None:
     data = {
         "interface": config.interface,
         "server_ip": config.server_ip,
+        "wg_interface": config.wg_interface,
         "allowed_ips": config.allowed_ips,
         "web_port": config.web_port,
         "web_host": config.web_host,
         "autostart": config.autostart,
         "autostart_config": config.autostart_config,
+        "switch_mode": config.switch_mode,
+        "probe_host": config.probe_host,
+        "probe_interval": config.probe_interval,
+        "probe_targets": config.probe_targets,
+        "busy_threshold": config.busy_threshold,
+        "busy_pps": config.busy_pps,
+        "busy_flows": config.busy_flows,
+        "cluster_name": config.cluster_name,
+        "cluster_token": config.cluster_token,
+        "cluster_agents": config.cluster_agents,
+        "log_retention_days": config.log_retention_days,
+        "log_retention_max_entries": config.log_retention_max_entries,
+        "tune_interfaces": config.tune_interfaces,
+        "path_mtu_discovery": config.path_mtu_discovery,
+        "flow_offload": config.flow_offload,
+        "client_accounting": config.client_accounting,
+        "tracing": config.tracing,
+        "trace_slow_ms": config.trace_slow_ms,
+        "profiler_enabled": config.profiler_enabled,
         "log_level": config.log_level,
         "log_file": config.log_file,
     }
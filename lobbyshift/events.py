@@ -0,0 +1,48 @@
+"""
+LobbyShift - Server-Sent Events
+"""
+
+import json
+import asyncio
+from typing import AsyncIterator, Dict, Set
+
+
+# Events buffered per client, the oldest are dropped for clients that fall behind
+EVENT_QUEUE_SIZE = 64
+# Send a comment line on idle connections so proxies keep them open (seconds)
+EVENT_KEEPALIVE = 15
+
+
+class EventHub:
+    """Pushes server events to connected web UIs"""
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected clients"""
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Dict) -> None:
+        """Send an event to every connected client"""
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    async def stream(self) -> AsyncIterator[str]:
+        """Server-sent event stream for one client, ends when the client disconnects"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            self._subscribers.discard(queue)
@@ -2,55 +2,172 @@
 LobbyShift - FastAPI Backend
 """
 
+import io
 import os
+import csv
+import json
+import time
 import asyncio
+import hashlib
 from pathlib import Path
 from typing import Optional
 from contextlib import asynccontextmanager
 
-import yaml
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.templating import Jinja2Templates
-import uvicorn
 
-from .wireguard import WireGuardManager
-from .config import Config, load_config
+from .wireguard import WireGuardManager, LOG_PAGE_SIZE
+from .scheduler import Scheduler
+from .watcher import ConfigWatcher
+from .events import EventHub
+from . import tracing
+from .tracing import TracingMiddleware, span
+from .cluster import ClusterController, check_token
+from . import __version__
+from .config import Config, CONFIG_DIR, load_config, detect_server_ip
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
-CONFIG_DIR = Path("/etc/lobbyshift")
 CONFIGS_DIR = CONFIG_DIR / "configs"
 
 # Global instances
 config: Config = None
 wg_manager: WireGuardManager = None
+scheduler: Scheduler = None
+cluster: Optional[ClusterController] = None
+config_watcher: ConfigWatcher = None
+# Pushes changes to connected web UIs (/api/events)
+events = EventHub()
+
+# Startup state: phase timings (ms) and background task bookkeeping
+startup = {
+    "started": time.monotonic(),
+    "ready": False,
+    "phases": {},
+    "errors": {}
+}
+background_tasks: set = set()
+
+
+def _record_phase(name: str, started: float) -> None:
+    """Record how long a startup phase took"""
+    startup["phases"][name] = round((time.monotonic() - started) * 1000, 1)
+
+
+def _notify_configs_changed(names) -> None:
+    """Tell connected UIs that configs were added, changed or removed"""
+    events.publish("configs", {
+        "changed": list(names),
+        "version": _make_etag(wg_manager.get_version("configs"))
+    })
+
+
+def _publish_clients(report) -> None:
+    """Push per-client traffic samples to connected UIs"""
+    if events.subscribers:
+        events.publish("clients", report)
+
+
+def _spawn(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+async def _background_startup():
+    """Slow startup work that must not delay serving the UI"""
+    # Server IP detection opens a socket, which can hang while the WAN is down
+    phase = time.monotonic()
+    await asyncio.to_thread(detect_server_ip, config)
+    _record_phase("detect_server_ip", phase)
+    
+    # Auto-start if configured
+    if config.autostart and config.autostart_config:
+        phase = time.monotonic()
+        try:
+            await wg_manager.start(config.autostart_config)
+        except Exception as e:
+            startup["errors"]["autostart"] = str(e)
+            print(f"Auto-start failed: {e}")
+        _record_phase("autostart", phase)
+    
+    # Offloads, packet steering and qdisc don't survive reboots, apply them again
+    if config.tune_interfaces:
+        phase = time.monotonic()
+        try:
+            await wg_manager.tuner.apply(wg_manager.active_interface if wg_manager.active_config else None)
+        except Exception as e:
+            startup["errors"]["tuning"] = str(e)
+        _record_phase("tuning", phase)
+    
+    # Warm the GeoIP cache for all configs (first sync of the config watcher)
+    phase = time.monotonic()
+    await config_watcher.synced.wait()
+    if not wg_manager.watching:
+        startup["errors"]["config_watcher"] = "not running, configs are scanned on request"
+    _record_phase("geoip_warmup", phase)
+    
+    startup["ready"] = True
+    _record_phase("total", startup["started"])
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
-    global config, wg_manager
+    global config, wg_manager, scheduler, cluster, config_watcher
     
-    # Startup
-    config = load_config()
+    # Startup (main() may already have loaded the config)
+    phase = time.monotonic()
+    if config is None:
+        config = load_config()
+    tracing.configure(config.tracing, config.trace_slow_ms)
+    _record_phase("load_config", phase)
+    
+    phase = time.monotonic()
     wg_manager = WireGuardManager(
         configs_dir=CONFIGS_DIR,
-        interface_name="lobbyshift",
-        allowed_ips=config.allowed_ips
+        interface_name=config.wg_interface,
+        allowed_ips=config.allowed_ips,
+        switch_mode=config.switch_mode,
+        probe_host=config.probe_host,
+        probe_targets=config.probe_targets,
+        busy_threshold=config.busy_threshold,
+        busy_pps=config.busy_pps,
+        busy_flows=config.busy_flows,
+        lan_interface=config.interface,
+        path_mtu_discovery=config.path_mtu_discovery,
+        flow_offload=config.flow_offload,
+        client_accounting=config.client_accounting
     )
+    scheduler = Scheduler(wg_manager)
+    config_watcher = ConfigWatcher(wg_manager, on_change=_notify_configs_changed)
+    if config.cluster_agents:
+        cluster = ClusterController(config.cluster_agents)
+    _record_phase("init_manager", phase)
     
-    # Auto-start if configured
-    if config.autostart and config.autostart_config:
-        try:
-            await wg_manager.start(config.autostart_config)
-        except Exception as e:
-            print(f"Auto-start failed: {e}")
+    _spawn(config_watcher.run())
+    _spawn(_background_startup())
+    _spawn(wg_manager.run_dns_refresh())
+    if config.probe_interval > 0:
+        _spawn(wg_manager.run_latency_probes(config.probe_interval))
+    _spawn(scheduler.run())
+    _spawn(wg_manager.run_switch_guard())
+    if wg_manager.accounting is not None:
+        _spawn(wg_manager.accounting.run(on_sample=_publish_clients))
+    if config.log_retention_days > 0 or config.log_retention_max_entries > 0:
+        _spawn(wg_manager.run_log_retention(config.log_retention_days, config.log_retention_max_entries))
+    _record_phase("serving", startup["started"])
     
     yield
     
     # Shutdown
+    for task in list(background_tasks):
+        task.cancel()
     await wg_manager.stop()
 
 
@@ -62,64 +179,185 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Compress HTML, JS, CSS and JSON responses
+class _GZipMiddleware(GZipMiddleware):
+    """GZip, except for the event stream (the compressor would hold events back)"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/api/events":
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(_GZipMiddleware, minimum_size=1000)
+# Added last so traces include compression
+app.add_middleware(TracingMiddleware)
+
+
+class CachedStaticFiles(StaticFiles):
+    """Static files with Cache-Control, versioned URLs (?v=) are cached for a year"""
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
 # Mount static files
 static_dir = BASE_DIR / "static"
-if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-else:
+if not static_dir.exists():
     # Create static dir if it doesn't exist
     static_dir.mkdir(parents=True, exist_ok=True)
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
 
 # Templates
 templates_dir = BASE_DIR / "templates"
 templates = Jinja2Templates(directory=str(templates_dir))
 
 
+def _asset_version(name: str) -> str:
+    """Content hash of a static asset, used for cache busting"""
+    try:
+        return hashlib.sha1((static_dir / name).read_bytes()).hexdigest()[:12]
+    except OSError:
+        return "0"
+
+
+ASSET_VERSIONS = {name: _asset_version(name) for name in ("app.css", "app.js")}
+
+# Rendered index page, re-rendered only when its inputs change
+_index_cache = {"key": None, "html": None, "etag": None}
+
+# Part of every API ETag, so version counters restarting at 0 never collide
+_boot_id = time.time_ns()
+
+
+def _make_etag(version) -> str:
+    """Build a strong ETag from a store version key"""
+    return '"' + hashlib.sha1(repr((_boot_id, version)).encode()).hexdigest()[:16] + '"'
+
+
+def _conditional_json(request: Request, version, build) -> Response:
+    """Return 304 if the client has the current version, otherwise build and send the payload"""
+    etag = _make_etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    with span("build_response"):
+        return JSONResponse(build(), headers=headers)
+
+
 # =============================================================================
 # Web Interface
 # =============================================================================
 
+def _render_index() -> tuple:
+    """Render the index page once per server IP / port, returns (html, etag)"""
+    key = (config.server_ip, config.web_port)
+    if _index_cache["key"] != key:
+        html = templates.get_template("index.html").render(
+            server_ip=config.server_ip,
+            web_port=config.web_port,
+            asset_versions=ASSET_VERSIONS
+        )
+        _index_cache["html"] = html
+        _index_cache["etag"] = '"' + hashlib.sha1(html.encode()).hexdigest()[:16] + '"'
+        _index_cache["key"] = key
+    return _index_cache["html"], _index_cache["etag"]
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    """Main web interface"""
-    status = await wg_manager.get_status()
-    configs = wg_manager.list_configs()
+    """Main web interface (static shell, dynamic data is loaded via the API)"""
+    html, etag = _render_index()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
     
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "status": status,
-        "configs": configs,
-        "server_ip": config.server_ip,
-        "web_port": config.web_port
-    })
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return HTMLResponse(html, headers=headers)
+
+
+# =============================================================================
+# Health
+# =============================================================================
+
+@app.get("/api/health/live")
+async def api_health_live():
+    """Liveness: the web server is up"""
+    return {"status": "ok"}
+
+
+@app.get("/api/health/ready")
+async def api_health_ready():
+    """Readiness: background startup (autostart, GeoIP warmup) has finished"""
+    body = {
+        "ready": startup["ready"],
+        "phases": startup["phases"],
+        "errors": startup["errors"]
+    }
+    return JSONResponse(body, status_code=200 if startup["ready"] else 503)
 
 
 # =============================================================================
 # API Endpoints
 # =============================================================================
 
-@app.get("/api/status")
-async def api_status():
-    """Get current VPN status"""
+async def _build_status() -> dict:
+    """Get current VPN status with country info"""
     status = await wg_manager.get_status()
     
     # Add country info if active
     if status.get("active") and status.get("config"):
-        configs = wg_manager.list_configs()
-        for cfg in configs:
-            if cfg["name"] == status["config"]:
-                status["country"] = cfg.get("country")
-                break
+        cfg = wg_manager.get_config(status["config"])
+        if cfg:
+            status["country"] = cfg.get("country")
+        latency = wg_manager.get_latency(status["config"])
+        status["matchmaking_rtt_ms"] = latency.get("rtt_ms") if latency else None
     
     return status
 
 
+@app.get("/api/status")
+async def api_status():
+    """Get current VPN status"""
+    return await _build_status()
+
+
 @app.get("/api/configs")
-async def api_list_configs():
-    """List all available configs"""
-    configs = wg_manager.list_configs()
-    return {"configs": configs}
+async def api_list_configs(
+    request: Request,
+    country: Optional[str] = None,
+    continent: Optional[str] = None,
+    favorite: Optional[bool] = None,
+    sort: str = "name",
+    offset: int = 0,
+    limit: Optional[int] = None
+):
+    """List configs, optionally filtered (country, continent, favorite), sorted and paginated"""
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="Invalid offset or limit")
+    
+    def build():
+        return wg_manager.query_configs(
+            country=country, continent=continent, favorite=favorite,
+            sort=sort, offset=offset, limit=limit
+        )
+    
+    try:
+        return _conditional_json(
+            request,
+            (wg_manager.get_version("configs"), str(request.query_params)),
+            build
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/api/configs")
@@ -133,7 +371,10 @@ async def api_upload_config(file: UploadFile = File(...)):
     try:
         config_name = file.filename.replace('.conf', '')
         saved_path = await wg_manager.save_config(config_name, content.decode('utf-8'))
-        return {"message": "Config uploaded", "name": config_name, "path": str(saved_path)}
+        _notify_configs_changed([saved_path.stem])
+        return {"message": "Config uploaded", "name": saved_path.stem, "path": str(saved_path)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -148,6 +389,15 @@ async def api_get_config(name: str):
         raise HTTPException(status_code=404, detail="Config not found")
 
 
+@app.get("/api/configs/{name}/validate")
+async def api_validate_config(name: str, probe: bool = True):
+    """Run the validation pipeline on a stored config (probe: also ping the endpoint)"""
+    try:
+        return {"name": name, **await wg_manager.validate_config(name, probe=probe)}
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Config not found")
+
+
 @app.put("/api/configs/{name}")
 async def api_update_config(name: str, request: Request):
     """Update config content"""
@@ -159,9 +409,12 @@ async def api_update_config(name: str, request: Request):
     
     try:
         await wg_manager.update_config(name, content)
+        _notify_configs_changed([name])
         return {"message": "Config updated", "name": name}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Config not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -176,23 +429,72 @@ async def api_delete_config(name: str):
             await wg_manager.stop()
         
         wg_manager.delete_config(name)
+        _notify_configs_changed([name])
         return {"message": "Config deleted", "name": name}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Config not found")
 
 
 @app.post("/api/switch/{name}")
-async def api_switch_config(name: str):
-    """Switch to a different config"""
+async def api_switch_config(name: str, mode: Optional[str] = None, when_idle: bool = False, dry_run: bool = False):
+    """Switch to a different config (mode: make_before_break or classic, when_idle: wait for no game traffic, dry_run: only show the plan)"""
     try:
-        await wg_manager.switch(name)
-        return {"message": f"Switched to {name}", "config": name}
+        if dry_run:
+            return {"dry_run": True, **await wg_manager.dry_run(name, mode=mode)}
+        if when_idle:
+            result = await wg_manager.request_switch(name, when_idle=True, source="ui", mode=mode)
+            if result["queued"]:
+                return {"message": f"Switch to {name} queued until idle", "config": name, "pending": result["pending"]}
+            report = result["switch"]
+        else:
+            wg_manager.cancel_pending_switch()
+            report = await wg_manager.switch(name, mode=mode)
+        return {"message": f"Switched to {name}", "config": name, "switch": report}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Config not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/switch/pending")
+async def api_get_pending_switch():
+    """Get the switch waiting for the tunnel to go idle"""
+    return {"pending": wg_manager.pending_switch, "last_executed": wg_manager.last_deferred_switch}
+
+
+@app.delete("/api/switch/pending")
+async def api_cancel_pending_switch():
+    """Cancel the switch waiting for the tunnel to go idle"""
+    return {"message": "Pending switch cancelled", "cancelled": wg_manager.cancel_pending_switch()}
+
+
+@app.get("/api/traffic")
+async def api_traffic():
+    """Tunnel traffic rate and whether a game session looks active"""
+    return await wg_manager.get_traffic_rate()
+
+
+@app.get("/api/clients")
+async def api_clients():
+    """Tunneled traffic per LAN client: totals and current rates, busiest first"""
+    if wg_manager.accounting is None:
+        raise HTTPException(status_code=404, detail="Client accounting disabled")
+    return wg_manager.accounting.get_clients()
+
+
+@app.get("/api/clients/{address}")
+async def api_client(address: str):
+    """One LAN client with its recent samples"""
+    if wg_manager.accounting is None:
+        raise HTTPException(status_code=404, detail="Client accounting disabled")
+    client = wg_manager.accounting.get_client(address)
+    if client is None:
+        raise HTTPException(status_code=404, detail="Unknown client")
+    return client
+
+
 @app.post("/api/up")
 async def api_start_vpn():
     """Start VPN with current or default config"""
@@ -202,7 +504,7 @@ async def api_start_vpn():
         return {"message": "VPN already running", "status": status}
     
     # Get first available config
-    configs = wg_manager.list_configs()
+    configs = wg_manager.query_configs(limit=1)["configs"]
     if not configs:
         raise HTTPException(status_code=400, detail="No configs available")
     
@@ -219,6 +521,21 @@ async def api_stop_vpn():
     return {"message": "VPN stopped"}
 
 
+@app.get("/api/latency")
+async def api_get_latency():
+    """Matchmaking RTT measured through the tunnel, per config"""
+    return {"latency": wg_manager.get_latency()}
+
+
+@app.post("/api/latency/probe")
+async def api_probe_latency():
+    """Measure matchmaking RTT for the active tunnel now"""
+    result = await wg_manager.probe_matchmaking_rtt()
+    if result is None:
+        raise HTTPException(status_code=400, detail="VPN not running")
+    return {"config": wg_manager.active_config, "latency": result}
+
+
 @app.post("/api/refresh-iptables")
 async def api_refresh_iptables():
     """Refresh iptables rules"""
@@ -230,10 +547,13 @@ async def api_refresh_iptables():
 
 
 @app.get("/api/favorites")
-async def api_get_favorites():
+async def api_get_favorites(request: Request):
     """Get list of favorite configs"""
-    favorites = wg_manager.get_favorites()
-    return {"favorites": favorites}
+    return _conditional_json(
+        request,
+        wg_manager.get_version("favorites"),
+        lambda: {"favorites": wg_manager.get_favorites()}
+    )
 
 
 @app.post("/api/favorites/{name}")
@@ -250,18 +570,68 @@ async def api_remove_favorite(name: str):
     return {"message": f"Removed {name} from favorites"}
 
 
+LOG_EXPORT_FIELDS = ("id", "timestamp", "action", "config", "details")
+SCHEDULE_EXPORT_FIELDS = ("timestamp", "policy", "policy_name", "result", "config", "details")
+
+
 @app.get("/api/logs")
-async def api_get_logs():
-    """Get connection history logs"""
-    logs = wg_manager.get_connection_logs()
-    return {"logs": logs}
+async def api_get_logs(request: Request, limit: int = LOG_PAGE_SIZE, before: Optional[int] = None):
+    """Get a page of connection history logs, newest first (before: cursor from next_cursor)"""
+    if limit < 1 or limit > 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return _conditional_json(
+        request,
+        (wg_manager.get_version("logs"), str(request.query_params)),
+        lambda: wg_manager.get_logs_page(limit=limit, before=before)
+    )
+
+
+@app.get("/api/logs/export")
+async def api_export_logs(format: str = "ndjson", source: str = "connections"):
+    """Stream connection logs or scheduler history as NDJSON or CSV, oldest first"""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    if source == "connections":
+        entries, fields = wg_manager.iter_connection_logs(), LOG_EXPORT_FIELDS
+    elif source == "schedule":
+        entries, fields = reversed(list(scheduler.history)), SCHEDULE_EXPORT_FIELDS
+    else:
+        raise HTTPException(status_code=400, detail="source must be connections or schedule")
+    
+    def ndjson():
+        for entry in entries:
+            yield json.dumps(entry, default=str) + "\n"
+    
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow({
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in entry.items()
+            })
+            # Hand each row over as soon as it is written
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    filename = f"lobbyshift-{source}.{format}"
+    return StreamingResponse(
+        ndjson() if format == "ndjson" else csv_rows(),
+        media_type="application/x-ndjson" if format == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @app.delete("/api/logs")
-async def api_clear_logs():
-    """Clear connection history"""
-    wg_manager.clear_connection_logs()
-    return {"message": "Logs cleared"}
+async def api_clear_logs(older_than_days: Optional[int] = None, keep_last: Optional[int] = None):
+    """Clear connection history, or only entries older than N days / beyond the last N"""
+    if (older_than_days is not None and older_than_days < 0) or (keep_last is not None and keep_last < 0):
+        raise HTTPException(status_code=400, detail="older_than_days and keep_last must not be negative")
+    removed = await wg_manager.trim_connection_logs(older_than_days, keep_last)
+    return {"message": "Logs cleared", "removed": removed}
 
 
 @app.delete("/api/geoip-cache")
@@ -271,9 +641,181 @@ async def api_clear_geoip_cache():
     _geoip_cache.clear()
     if _cache_file.exists():
         _cache_file.unlink()
+    wg_manager.invalidate_catalog()
+    if wg_manager.watching:
+        _spawn(config_watcher.resync())
     return {"message": "GeoIP cache cleared"}
 
 
+# =============================================================================
+# Schedule API
+# =============================================================================
+
+@app.get("/api/schedule")
+async def api_get_schedule():
+    """Get schedule policies and recent scheduler actions"""
+    return {"policies": scheduler.policies, "history": scheduler.history}
+
+
+@app.post("/api/schedule")
+async def api_add_schedule(request: Request):
+    """Add a schedule policy"""
+    body = await request.json()
+    try:
+        policy = scheduler.add_policy(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Policy added", "policy": policy}
+
+
+@app.put("/api/schedule/{policy_id}")
+async def api_update_schedule(policy_id: str, request: Request):
+    """Update a schedule policy"""
+    body = await request.json()
+    try:
+        policy = scheduler.update_policy(policy_id, body)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Policy updated", "policy": policy}
+
+
+@app.delete("/api/schedule/{policy_id}")
+async def api_delete_schedule(policy_id: str):
+    """Delete a schedule policy"""
+    try:
+        scheduler.delete_policy(policy_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return {"message": "Policy deleted", "id": policy_id}
+
+
+@app.post("/api/schedule/{policy_id}/run")
+async def api_run_schedule(policy_id: str):
+    """Apply a schedule policy now"""
+    try:
+        policy = scheduler.get_policy(policy_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return {"result": await scheduler.run_policy(policy, manual=True)}
+
+
+# =============================================================================
+# Cluster Agent API (called by a controller, token protected)
+# =============================================================================
+
+def _require_cluster_token(request: Request) -> None:
+    """Reject requests without the cluster token"""
+    if not config.cluster_token:
+        raise HTTPException(status_code=404, detail="Agent API disabled")
+    if not check_token(config.cluster_token, request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="Invalid cluster token")
+
+
+async def _build_agent_summary() -> dict:
+    """Everything a controller needs from this gateway in one response"""
+    import socket
+    return {
+        "name": config.cluster_name or socket.gethostname(),
+        "version": __version__,
+        "status": await _build_status(),
+        "traffic": await wg_manager.get_traffic_rate(),
+        "configs": wg_manager.list_configs(),
+        "latency": wg_manager.get_latency()
+    }
+
+
+@app.get("/api/agent/summary")
+async def api_agent_summary(request: Request):
+    """Status, metrics and config catalog of this gateway"""
+    _require_cluster_token(request)
+    return await _build_agent_summary()
+
+
+@app.post("/api/agent/configs")
+async def api_agent_push_configs(request: Request):
+    """Save several configs at once"""
+    _require_cluster_token(request)
+    body = await request.json()
+    
+    results = {}
+    for item in body.get("configs", []):
+        name = item.get("name", "").replace('.conf', '')
+        try:
+            # Keyed by the name actually saved on this agent (sanitized), with the name it was sent as
+            saved_path = await wg_manager.save_config(name, item.get("content", ""))
+            results[saved_path.stem] = {"ok": True, "requested": name}
+        except Exception as e:
+            results[name] = {"ok": False, "error": str(e)}
+    _notify_configs_changed([name for name, result in results.items() if result["ok"]])
+    return {"results": results}
+
+
+@app.post("/api/agent/switch/{name}")
+async def api_agent_switch(name: str, request: Request):
+    """Switch this gateway on behalf of a controller"""
+    _require_cluster_token(request)
+    body = await request.json()
+    try:
+        return await wg_manager.request_switch(
+            name, when_idle=bool(body.get("when_idle")), source="controller", mode=body.get("mode")
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Config not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# =============================================================================
+# Cluster Controller API
+# =============================================================================
+
+def _require_controller() -> ClusterController:
+    """Get the controller or fail if no agents are configured"""
+    if cluster is None:
+        raise HTTPException(status_code=404, detail="Controller mode disabled (no cluster_agents)")
+    return cluster
+
+
+@app.get("/api/cluster")
+async def api_cluster_summary():
+    """Status, metrics and configs of this gateway and all agents"""
+    controller = _require_controller()
+    agents = await controller.get_summaries()
+    return {"local": await _build_agent_summary(), "agents": agents}
+
+
+@app.get("/api/cluster/latency")
+async def api_cluster_latency():
+    """Matchmaking RTT per config across all agents"""
+    return await _require_controller().get_latency_table()
+
+
+@app.post("/api/cluster/configs")
+async def api_cluster_push_configs(request: Request):
+    """Push configs to agents: {"configs": [{"name", "content"}], "agents": [optional names]}"""
+    controller = _require_controller()
+    body = await request.json()
+    configs = body.get("configs") or []
+    if not configs:
+        raise HTTPException(status_code=400, detail="configs required")
+    try:
+        return {"results": await controller.push_configs(configs, body.get("agents"))}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown agent: {e}")
+
+
+@app.post("/api/cluster/{agent}/switch/{name}")
+async def api_cluster_switch(agent: str, name: str, when_idle: bool = False, mode: Optional[str] = None):
+    """Switch an agent to a config"""
+    controller = _require_controller()
+    try:
+        return await controller.switch(agent, name, when_idle, mode)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown agent")
+
+
 # =============================================================================
 # Settings API
 # =============================================================================
@@ -300,9 +842,33 @@ def save_config_names(names: dict):
         json.dump(names, f, indent=2)
 
 
-@app.get("/api/settings")
-async def api_get_settings():
-    """Get current settings"""
+def _settings_version() -> tuple:
+    """Version key for the settings payload"""
+    from .config import CONFIG_FILE
+    mtimes = []
+    for path in (CONFIG_FILE, CONFIG_NAMES_FILE):
+        try:
+            mtimes.append(path.stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return (tuple(mtimes), wg_manager.get_version("configs"))
+
+
+# Settings payload of the last _settings_version(), rebuilt only when config.yaml, names or configs change
+_settings_cache = {"version": None, "payload": None}
+
+
+def _build_settings() -> dict:
+    """Get current settings, cached per settings version"""
+    version = _settings_version()
+    if _settings_cache["version"] != version:
+        _settings_cache["payload"] = _read_settings()
+        _settings_cache["version"] = version
+    return _settings_cache["payload"]
+
+
+def _read_settings() -> dict:
+    """Read settings from config.yaml, the config names and the configs directory"""
     cfg = load_config()
     configs = wg_manager.list_configs()
     config_names = load_config_names()
@@ -315,6 +881,125 @@ async def api_get_settings():
     }
 
 
+@app.get("/api/settings")
+async def api_get_settings(request: Request):
+    """Get current settings"""
+    return _conditional_json(request, _settings_version(), _build_settings)
+
+
+@app.get("/api/snapshot")
+async def api_snapshot(configs: Optional[str] = None, settings: Optional[str] = None):
+    """Status in one round trip, plus configs and settings only if they differ from the versions the client sent"""
+    versions = {
+        "configs": _make_etag(wg_manager.get_version("configs")),
+        "settings": _make_etag(_settings_version())
+    }
+    snapshot = {"status": await _build_status(), "versions": versions}
+    if configs != versions["configs"]:
+        snapshot["configs"] = wg_manager.list_configs()
+    if settings != versions["settings"]:
+        snapshot["settings"] = _build_settings()
+    return snapshot
+
+
+@app.get("/api/events")
+async def api_events():
+    """Server-sent events: "configs" whenever configs are added, changed or removed, "clients" with traffic per LAN client"""
+    return StreamingResponse(
+        events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =============================================================================
+# Tuning API
+# =============================================================================
+
+def _tunnel_interface() -> Optional[str]:
+    """Interface of the running tunnel, if any"""
+    return wg_manager.active_interface if wg_manager.active_config else None
+
+
+@app.get("/api/tuning")
+async def api_get_tuning():
+    """Offload, packet steering and qdisc settings of the LAN interface and tunnel, plus path MTUs"""
+    report = await wg_manager.tuner.check(_tunnel_interface())
+    report["path_mtu"] = wg_manager.tuner.path_mtu
+    report["path_mtu_discovery"] = wg_manager.path_mtu_discovery
+    return report
+
+
+@app.post("/api/tuning/apply")
+async def api_apply_tuning():
+    """Apply the recommended settings, returns them before and after"""
+    return await wg_manager.tuner.apply(_tunnel_interface())
+
+
+@app.post("/api/tuning/mtu")
+async def api_discover_mtu():
+    """Discover the path MTU to every config endpoint (used on the next connect)"""
+    return {"path_mtu": await wg_manager.discover_path_mtus()}
+
+
+@app.post("/api/tuning/benchmark")
+async def api_tuning_benchmark(seconds: float = 5):
+    """Measure forwarding throughput through local network namespaces, untuned vs. tuned"""
+    try:
+        return await wg_manager.tuner.benchmark(seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# =============================================================================
+# Debug API
+# =============================================================================
+
+@app.get("/api/debug/traces")
+async def api_get_traces():
+    """Recent slow request traces with their spans, newest first"""
+    return {**tracing.get_state(), "traces": tracing.get_traces()}
+
+
+@app.delete("/api/debug/traces")
+async def api_clear_traces():
+    """Drop recorded traces"""
+    tracing.clear_traces()
+    return {"message": "Traces cleared"}
+
+
+@app.put("/api/debug/tracing")
+async def api_set_tracing(request: Request):
+    """Turn tracing on or off at runtime ({"enabled": bool, "slow_ms": int})"""
+    body = await request.json()
+    try:
+        state = tracing.configure(body.get("enabled", tracing.is_enabled()), body.get("slow_ms"))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return state
+
+
+@app.get("/api/debug/commands")
+async def api_command_metrics():
+    """Duration metrics per external program and recent failed or timed out commands"""
+    return wg_manager.runner.get_metrics()
+
+
+@app.post("/api/debug/profile")
+async def api_profile(seconds: float = 5, top: int = 30):
+    """Sample all threads (including the event loop) for a few seconds"""
+    if not config.profiler_enabled:
+        raise HTTPException(status_code=403, detail="Profiler is disabled (set profiler_enabled in config.yaml)")
+    try:
+        return await asyncio.to_thread(tracing.sample_profile, seconds, tracing.PROFILE_INTERVAL, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @app.post("/api/settings/autostart")
 async def api_update_autostart(request: Request):
     """Update autostart settings"""
@@ -326,9 +1011,7 @@ async def api_update_autostart(request: Request):
     
     # Validate config exists if enabling
     if autostart_enabled and autostart_config:
-        configs = wg_manager.list_configs()
-        config_names = [c["name"] for c in configs]
-        if autostart_config not in config_names:
+        if wg_manager.get_config(autostart_config) is None:
             raise HTTPException(status_code=400, detail="Config not found")
     
     try:
@@ -390,11 +1073,15 @@ async def api_set_config_name(config_name: str, request: Request):
 
 def main():
     """Run the application"""
-    cfg = load_config()
+    global config
+    import uvicorn
+    
+    # Loaded once, lifespan reuses it
+    config = load_config()
     uvicorn.run(
-        "lobbyshift.main:app",
-        host=cfg.web_host,
-        port=cfg.web_port,
+        app,
+        host=config.web_host,
+        port=config.web_port,
         reload=False,
         log_level="info"
     )
@@ -0,0 +1,214 @@
+"""
+LobbyShift - Command Runner
+"""
+
+import os
+import time
+import signal
+import asyncio
+import subprocess
+from collections import deque
+from typing import Dict, List, Optional
+
+from .tracing import span
+
+
+# Default timeout per command (seconds), and overrides per program
+COMMAND_TIMEOUT = 30
+COMMAND_TIMEOUTS = {
+    "wg-quick": 60,
+    "bash": 60,
+    "wg": 10,
+    "ip": 10,
+    "iptables": 20,
+    "ip6tables": 20,
+    "conntrack": 15,
+    "ping": 15,
+}
+# Time between SIGTERM and SIGKILL for a command that timed out
+KILL_GRACE = 3
+# Commands running at the same time
+COMMAND_CONCURRENCY = 8
+# stderr lines kept with a result (everything is still logged)
+STDERR_TAIL = 20
+# Recent failed or timed out commands kept for /api/debug/commands
+FAILURE_HISTORY = 20
+
+
+class CommandError(RuntimeError):
+    """A command exited non-zero or timed out"""
+
+    def __init__(self, cmd: List[str], returncode: Optional[int], stderr: str, duration_ms: float,
+                 timed_out: bool = False):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr
+        self.duration_ms = duration_ms
+        self.timed_out = timed_out
+        reason = "timed out" if timed_out else f"exit {returncode}"
+        super().__init__(f"Command failed: {' '.join(cmd)} ({reason} after {duration_ms:.0f} ms)\n{stderr}")
+
+
+class CommandRunner:
+    """Runs external commands with timeouts, bounded concurrency and duration metrics"""
+
+    def __init__(self, concurrency: int = COMMAND_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Program -> {"count", "failures", "timeouts", "total_ms", "max_ms", "last_ms"}
+        self.metrics: Dict[str, Dict] = {}
+        self.failures: deque = deque(maxlen=FAILURE_HISTORY)
+        # Shared read-only commands: cmd -> running task, and cmd -> (finished at, result)
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._recent: Dict[tuple, tuple] = {}
+
+    # =========================================================================
+    # Execution
+    # =========================================================================
+
+    @staticmethod
+    async def _log_stderr(stream: asyncio.StreamReader, program: str, pid: int, tail: deque) -> None:
+        """Log stderr line by line while the command runs"""
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            text = line.decode(errors="replace").rstrip()
+            if text:
+                tail.append(text)
+                print(f"[cmd] program={program} pid={pid} stderr={text!r}")
+
+    @staticmethod
+    def _signal(process: asyncio.subprocess.Process, sig: int) -> None:
+        """Signal a command and everything it started"""
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        """SIGTERM, then SIGKILL if the command doesn't exit within the grace period"""
+        self._signal(process, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=KILL_GRACE)
+        except asyncio.TimeoutError:
+            self._signal(process, signal.SIGKILL)
+            await process.wait()
+
+    def _record(self, cmd: List[str], program: str, returncode: Optional[int], duration_ms: float,
+                timed_out: bool, stderr_tail: List[str]) -> None:
+        """Update duration metrics"""
+        stats = self.metrics.setdefault(program, {
+            "count": 0, "failures": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0
+        })
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["last_ms"] = duration_ms
+        if timed_out:
+            stats["timeouts"] += 1
+        if timed_out or returncode != 0:
+            stats["failures"] += 1
+            self.failures.append({
+                "cmd": " ".join(cmd),
+                "returncode": returncode,
+                "timed_out": timed_out,
+                "duration_ms": round(duration_ms, 1),
+                "stderr": stderr_tail,
+                "at": time.time()
+            })
+
+    async def run(self, cmd: List[str], check: bool = True,
+                  timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """Run a command, raising CommandError if check is set and it fails or times out"""
+        program = os.path.basename(cmd[0])
+        timeout = timeout or COMMAND_TIMEOUTS.get(program, COMMAND_TIMEOUT)
+
+        async with self._semaphore:
+            with span("subprocess", cmd=" ".join(cmd[:3])):
+                started = time.perf_counter()
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        # Own process group, so a timeout also kills what the command started
+                        start_new_session=True
+                    )
+                except FileNotFoundError:
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    self._record(cmd, program, 127, duration_ms, False, [f"{program}: not found"])
+                    if check:
+                        raise CommandError(cmd, 127, f"{program}: not found", duration_ms)
+                    return subprocess.CompletedProcess(cmd, 127, "", f"{program}: not found")
+                stderr_tail: deque = deque(maxlen=STDERR_TAIL)
+                stderr_task = asyncio.ensure_future(
+                    self._log_stderr(process.stderr, program, process.pid, stderr_tail)
+                )
+
+                timed_out = False
+                try:
+                    stdout = await asyncio.wait_for(process.stdout.read(), timeout=timeout)
+                    await asyncio.wait_for(process.wait(), timeout=max(timeout - (time.perf_counter() - started), 0.1))
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    stdout = b""
+                    await self._terminate(process)
+                except asyncio.CancelledError:
+                    await self._terminate(process)
+                    raise
+                finally:
+                    try:
+                        # Something the command left running may hold stderr open
+                        await asyncio.wait_for(stderr_task, timeout=KILL_GRACE)
+                    except asyncio.TimeoutError:
+                        pass
+
+                duration_ms = (time.perf_counter() - started) * 1000
+                returncode = None if timed_out else process.returncode
+                self._record(cmd, program, returncode, duration_ms, timed_out, list(stderr_tail))
+
+        stderr = "\n".join(stderr_tail)
+        if check and (timed_out or returncode != 0):
+            raise CommandError(cmd, returncode, stderr, duration_ms, timed_out)
+
+        # Unchecked callers only look at the return code, a timeout counts as failure
+        return subprocess.CompletedProcess(
+            cmd, -1 if timed_out else returncode,
+            stdout.decode(errors="replace"), stderr
+        )
+
+    async def run_shared(self, cmd: List[str], max_age: float = 0.0) -> subprocess.CompletedProcess:
+        """Run an idempotent read command once for all concurrent callers, reusing results up to max_age seconds"""
+        key = tuple(cmd)
+        recent = self._recent.get(key)
+        if recent and time.monotonic() - recent[0] <= max_age:
+            return recent[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.run(cmd, check=False))
+            self._inflight[key] = task
+            try:
+                result = await asyncio.shield(task)
+            finally:
+                self._inflight.pop(key, None)
+            self._recent[key] = (time.monotonic(), result)
+            return result
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> None:
+        """Forget shared results (after changing interfaces)"""
+        self._recent.clear()
+
+    def get_metrics(self) -> Dict:
+        """Duration metrics per program and recent failures"""
+        return {
+            "programs": {
+                program: {
+                    **{key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()},
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 1) if stats["count"] else 0.0
+                }
+                for program, stats in self.metrics.items()
+            },
+            "failures": list(reversed(self.failures))
+        }
@@ -0,0 +1,299 @@
+"""
+LobbyShift - Scheduled Region Rotation
+"""
+
+import json
+import uuid
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from .config import CONFIG_DIR
+from .wireguard import SWITCH_MODES
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+
+_schedule_file = CONFIG_DIR / "schedule.json"
+_history_file = CONFIG_DIR / "schedule_history.json"
+
+# Keep only the most recent scheduler actions
+HISTORY_LIMIT = 100
+
+# Policy targets
+TARGET_CONFIG = "config"
+TARGET_COUNTRY = "country"
+TARGET_FASTEST_IN_COUNTRY = "fastest_in_country"
+TARGET_TYPES = (TARGET_CONFIG, TARGET_COUNTRY, TARGET_FASTEST_IN_COUNTRY)
+
+# Cron field ranges: minute, hour, day of month, month, day of week (0 and 7 = Sunday)
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """Parse one cron field (*, lists, ranges and steps)"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"invalid step in {field}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = high
+        if start < low or end > high or start > end:
+            raise ValueError(f"{field} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expression: str) -> List[Set[int]]:
+    """Parse a 5-field cron expression"""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError("cron expression needs 5 fields: minute hour day month weekday")
+    parsed = [_parse_cron_field(f, low, high) for f, (low, high) in zip(fields, _CRON_RANGES)]
+    if 7 in parsed[4]:
+        parsed[4].discard(7)
+        parsed[4].add(0)
+    return parsed
+
+
+def cron_matches(expression: str, moment: datetime) -> bool:
+    """Check if a cron expression matches a point in time (minute resolution)"""
+    minute, hour, day, month, weekday = parse_cron(expression)
+    day_match = moment.day in day
+    weekday_match = (moment.weekday() + 1) % 7 in weekday
+    # Like cron, a day that matches either field counts when both are restricted (not starting with *)
+    fields = expression.split()
+    if not fields[2].startswith("*") and not fields[4].startswith("*"):
+        day_matches = day_match or weekday_match
+    else:
+        day_matches = day_match and weekday_match
+    return (
+        moment.minute in minute
+        and moment.hour in hour
+        and moment.month in month
+        and day_matches
+    )
+
+
+def validate_cron(expression: str) -> None:
+    """Validate a cron expression, raising ValueError"""
+    try:
+        parse_cron(expression)
+    except ValueError as e:
+        raise ValueError(f"Invalid cron expression '{expression}': {e}")
+
+
+def validate_policy(policy: Dict) -> Dict:
+    """Validate and normalize a schedule policy"""
+    cron = (policy.get("cron") or "").strip()
+    if not cron:
+        raise ValueError("cron is required")
+    validate_cron(cron)
+
+    target = policy.get("target") or {}
+    if target.get("type") not in TARGET_TYPES:
+        raise ValueError(f"target.type must be one of {', '.join(TARGET_TYPES)}")
+    if not target.get("value"):
+        raise ValueError("target.value is required")
+
+    timezone = policy.get("timezone") or None
+    if timezone:
+        if ZoneInfo is None:
+            raise ValueError("Time zones need Python 3.9+")
+        try:
+            ZoneInfo(timezone)
+        except Exception:
+            raise ValueError(f"Unknown time zone: {timezone}")
+
+    mode = policy.get("mode") or None
+    if mode and mode not in SWITCH_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SWITCH_MODES)}")
+
+    return {
+        "id": policy.get("id") or uuid.uuid4().hex[:8],
+        "name": policy.get("name") or f"{target['type']}: {target['value']}",
+        "enabled": bool(policy.get("enabled", True)),
+        "cron": cron,
+        "timezone": timezone,
+        "target": {"type": target["type"], "value": str(target["value"])},
+        # Switch even while the tunnel carries heavy traffic
+        "force": bool(policy.get("force", False)),
+        # Switch mode, None uses the configured default
+        "mode": mode
+    }
+
+
+class Scheduler:
+    """Runs time-based region switching policies through the WireGuard manager"""
+
+    def __init__(self, wg_manager):
+        self.wg_manager = wg_manager
+        self.policies: List[Dict] = self._load(_schedule_file)
+        self.history: List[Dict] = self._load(_history_file)
+        self._last_run: Dict[str, str] = {}
+        wg_manager.deferred_switch_listeners.append(self._on_deferred_switch)
+
+    # =========================================================================
+    # Persistence
+    # =========================================================================
+
+    @staticmethod
+    def _load(path: Path) -> List[Dict]:
+        """Load a JSON list from file"""
+        try:
+            if path.exists():
+                return json.loads(path.read_text())
+        except:
+            pass
+        return []
+
+    @staticmethod
+    def _save(path: Path, data: List[Dict]) -> None:
+        """Save a JSON list to file"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(data, indent=2))
+        except:
+            pass
+
+    # =========================================================================
+    # Policy Management
+    # =========================================================================
+
+    def get_policy(self, policy_id: str) -> Dict:
+        """Get a policy by id"""
+        for policy in self.policies:
+            if policy["id"] == policy_id:
+                return policy
+        raise KeyError(policy_id)
+
+    def add_policy(self, data: Dict) -> Dict:
+        """Add a new policy"""
+        policy = validate_policy({**data, "id": None})
+        self.policies.append(policy)
+        self._save(_schedule_file, self.policies)
+        return policy
+
+    def update_policy(self, policy_id: str, data: Dict) -> Dict:
+        """Replace an existing policy"""
+        existing = self.get_policy(policy_id)
+        policy = validate_policy({**existing, **data, "id": policy_id})
+        self.policies[self.policies.index(existing)] = policy
+        self._save(_schedule_file, self.policies)
+        return policy
+
+    def delete_policy(self, policy_id: str) -> None:
+        """Delete a policy"""
+        self.policies.remove(self.get_policy(policy_id))
+        self._save(_schedule_file, self.policies)
+
+    def _record(self, policy: Dict, result: str, config: Optional[str] = None, details=None) -> Dict:
+        """Record a scheduler action"""
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "policy": policy["id"],
+            "policy_name": policy["name"],
+            "result": result,
+            "config": config,
+            "details": details
+        }
+        self.history.insert(0, entry)  # Newest first
+        self.history = self.history[:HISTORY_LIMIT]
+        self._save(_history_file, self.history)
+        return entry
+
+    # =========================================================================
+    # Execution
+    # =========================================================================
+
+    def resolve_target(self, target: Dict) -> Optional[str]:
+        """Pick the config a policy target points to"""
+        if target["type"] == TARGET_CONFIG:
+            return target["value"]
+
+        country = target["value"].upper()
+        if target["type"] == TARGET_FASTEST_IN_COUNTRY:
+            result = self.wg_manager.query_configs(country=country, sort="latency", limit=1)
+        else:
+            # Favorites first, then alphabetically
+            result = self.wg_manager.query_configs(country=country, limit=1)
+        configs = result["configs"]
+        return configs[0]["name"] if configs else None
+
+    async def run_policy(self, policy: Dict, manual: bool = False) -> Dict:
+        """Apply a policy now"""
+        config_name = self.resolve_target(policy["target"])
+        if not config_name:
+            return self._record(policy, "no_config")
+
+        if self.wg_manager.active_config == config_name:
+            return self._record(policy, "already_active", config_name)
+
+        # Non-urgent: wait for the tunnel to go idle unless forced
+        when_idle = not policy["force"] and not manual
+        try:
+            result = await self.wg_manager.request_switch(
+                config_name, when_idle=when_idle, source=f"schedule:{policy['id']}", mode=policy.get("mode")
+            )
+        except Exception as e:
+            return self._record(policy, "failed", config_name, str(e))
+        if result["queued"]:
+            return self._record(policy, "queued_until_idle", config_name, result["pending"]["traffic"])
+        return self._record(policy, "switched", config_name, result["switch"])
+
+    def _on_deferred_switch(self, result: Dict) -> None:
+        """Record the outcome of a switch a policy queued until idle"""
+        source = result.get("source") or ""
+        if not source.startswith("schedule:"):
+            return
+        policy_id = source.split(":", 1)[1]
+        # The policy may have been deleted while its switch was waiting
+        policy = next((p for p in self.policies if p["id"] == policy_id), {"id": policy_id, "name": None})
+        if "error" in result:
+            self._record(policy, "failed", result["config"], result["error"])
+        else:
+            self._record(policy, "switched", result["config"], result["switch"])
+
+    def _due(self, policy: Dict, now: datetime) -> bool:
+        """Check if a policy is due this minute (and hasn't run this minute yet)"""
+        if not policy["enabled"]:
+            return False
+        moment = now.astimezone(ZoneInfo(policy["timezone"])) if policy["timezone"] else now
+        minute = moment.strftime("%Y-%m-%dT%H:%M")
+        if self._last_run.get(policy["id"]) == minute or not cron_matches(policy["cron"], moment):
+            return False
+        self._last_run[policy["id"]] = minute
+        return True
+
+    async def tick(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Run all policies due at the given time"""
+        now = now or datetime.now().astimezone()
+        results = []
+        for policy in list(self.policies):
+            if self._due(policy, now):
+                results.append(await self.run_policy(policy))
+        return results
+
+    async def run(self) -> None:
+        """Evaluate policies at the start of every minute"""
+        while True:
+            now = datetime.now().astimezone()
+            await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000 + 0.5)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Scheduler tick failed: {e}")
@@ -0,0 +1,239 @@
+"""
+LobbyShift - Request Tracing and Sampling Profiler
+"""
+
+import sys
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+# Slow traces kept for /api/debug/traces
+TRACE_BUFFER_SIZE = 50
+# Spans recorded per trace, the rest are only counted
+TRACE_MAX_SPANS = 200
+# Requests not traced (long-lived streams, static files)
+TRACE_EXCLUDE = ("/api/events", "/api/logs/export", "/static/")
+
+# Sampling profiler limits
+PROFILE_MAX_SECONDS = 30
+PROFILE_INTERVAL = 0.005
+PROFILE_MAX_DEPTH = 40
+
+_state = {
+    "enabled": False,
+    # Only traces at least this long are kept
+    "slow_ms": 200,
+}
+_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+# Current trace and innermost span of the running request (follows tasks and to_thread)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("lobbyshift_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("lobbyshift_span", default=None)
+_profile_lock = threading.Lock()
+
+
+def configure(enabled: bool, slow_ms: Optional[int] = None) -> Dict:
+    """Turn tracing on or off and set the slow threshold"""
+    _state["enabled"] = bool(enabled)
+    if slow_ms is not None:
+        if slow_ms < 0:
+            raise ValueError("slow_ms must not be negative")
+        _state["slow_ms"] = int(slow_ms)
+    return dict(_state)
+
+
+def is_enabled() -> bool:
+    """Check if tracing is on"""
+    return _state["enabled"]
+
+
+def get_state() -> Dict:
+    """Current tracing settings"""
+    return dict(_state)
+
+
+def get_traces() -> List[Dict]:
+    """Recent slow traces, newest first"""
+    return list(reversed(_traces))
+
+
+def clear_traces() -> None:
+    """Drop all recorded traces"""
+    _traces.clear()
+
+
+@contextmanager
+def _record_span(trace: Dict, name: str, attrs: Dict):
+    """Time a span inside a trace"""
+    if len(trace["spans"]) >= TRACE_MAX_SPANS:
+        trace["dropped_spans"] += 1
+        yield
+        return
+
+    record = {
+        "id": len(trace["spans"]) + 1,
+        "parent": _current_span.get(),
+        "name": name,
+        "start_ms": round((time.perf_counter() - trace["_start"]) * 1000, 3),
+        "duration_ms": None,
+        **({"attrs": attrs} if attrs else {})
+    }
+    trace["spans"].append(record)
+    token = _current_span.set(record["id"])
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(token)
+
+
+class _NoSpan:
+    """Shared no-op context manager used when nothing is traced"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attrs):
+    """Context manager timing a block as a span of the current trace (no-op outside a trace)"""
+    trace = _current_trace.get() if _state["enabled"] else None
+    if trace is None:
+        return _NO_SPAN
+    return _record_span(trace, name, attrs)
+
+
+def traced(name: str):
+    """Decorator recording calls of a sync or async function as spans"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _state["enabled"] or _current_trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"] or _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(name: str):
+    """Trace a request, keeping it in the ring buffer if it was slow"""
+    record = {
+        "name": name,
+        "started_at": time.time(),
+        "duration_ms": None,
+        "status": None,
+        "spans": [],
+        "dropped_spans": 0,
+        "_start": time.perf_counter()
+    }
+    trace_token = _current_trace.set(record)
+    span_token = _current_span.set(None)
+    try:
+        yield record
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        record["duration_ms"] = round((time.perf_counter() - record.pop("_start")) * 1000, 3)
+        if record["duration_ms"] >= _state["slow_ms"]:
+            _traces.append(record)
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing HTTP requests, a single flag check while tracing is off"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _state["enabled"] or scope["type"] != "http" or scope["path"].startswith(TRACE_EXCLUDE):
+            await self.app(scope, receive, send)
+            return
+
+        with trace(f"{scope['method']} {scope['path']}") as record:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    record["status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+# =============================================================================
+# Sampling Profiler
+# =============================================================================
+
+def _frame_stack(frame) -> str:
+    """Collapse a frame stack into 'outer;...;inner' (folded stack format)"""
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_profile(seconds: float, interval: float = PROFILE_INTERVAL, top: int = 30) -> Dict:
+    """Sample the stacks of all other threads for a while (blocking, run it in a thread)"""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+
+    try:
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        functions: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = _frame_stack(frame)
+                stacks[f"{thread_names.get(thread_id, thread_id)};{stack}"] += 1
+                functions[stack.rsplit(";", 1)[-1]] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    return {
+        "seconds": seconds,
+        "interval": interval,
+        "samples": samples,
+        # Innermost frames by sample count (where the time is spent)
+        "top": [
+            {"function": name, "samples": count, "percent": round(100 * count / samples, 1)}
+            for name, count in functions.most_common(top)
+        ],
+        # Folded stacks, input for flamegraph tools
+        "folded": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    }
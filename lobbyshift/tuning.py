@@ -0,0 +1,410 @@
+"""
+LobbyShift - Gateway Throughput Tuning
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import CONFIG_DIR
+
+
+_mtu_file = CONFIG_DIR / "path_mtu.json"
+
+# Path MTU discovery: search range (bytes) and how long a result is trusted (seconds)
+PATH_MTU_MIN = 1280
+PATH_MTU_MAX = 1500
+PATH_MTU_TTL = 86400
+# WireGuard overhead on top of the path MTU (outer IP + UDP + WireGuard header)
+WG_OVERHEAD_IPV4 = 60
+WG_OVERHEAD_IPV6 = 80
+
+# Offloads worth having on a forwarding gateway (ethtool feature -> ethtool -K name)
+OFFLOAD_FEATURES = {
+    "generic-receive-offload": "gro",
+    "generic-segmentation-offload": "gso",
+    # Keep UDP (WireGuard, game traffic) aggregated while forwarding, kernel 5.12+
+    "rx-udp-gro-forwarding": "rx-udp-gro-forwarding",
+}
+# Queueing disciplines that already avoid bufferbloat
+FAIR_QDISCS = ("fq_codel", "fq", "cake")
+
+# Local forwarding benchmark: client -> router -> server network namespaces
+BENCH_PREFIX = "lsbench"
+BENCH_PORT = 5201
+BENCH_MAX_SECONDS = 30
+
+_BENCH_SERVER = """
+import socket, time
+s = socket.socket()
+s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+s.bind(("10.201.2.2", %d))
+s.listen(1)
+s.settimeout(15)
+c, _ = s.accept()
+total, start = 0, time.perf_counter()
+while True:
+    data = c.recv(1 << 18)
+    if not data:
+        break
+    total += len(data)
+print(total, time.perf_counter() - start)
+""" % BENCH_PORT
+
+_BENCH_CLIENT = """
+import socket, sys, time
+deadline = time.monotonic() + 3
+while True:
+    try:
+        s = socket.create_connection(("10.201.2.2", %d), timeout=5)
+        break
+    except OSError:
+        if time.monotonic() > deadline:
+            raise
+        time.sleep(0.05)
+buf = b"\\0" * (1 << 16)
+end = time.perf_counter() + float(sys.argv[1])
+while time.perf_counter() < end:
+    s.sendall(buf)
+s.close()
+""" % BENCH_PORT
+
+
+def _cpu_mask(cpus: int) -> str:
+    """CPU bitmask in the comma separated 32-bit word format used by sysfs"""
+    mask = (1 << cpus) - 1
+    words = []
+    while True:
+        words.append(f"{mask & 0xFFFFFFFF:08x}")
+        mask >>= 32
+        if not mask:
+            break
+    return ",".join(reversed(words)).lstrip("0") or "0"
+
+
+def _parse_mask(value: str) -> int:
+    """Parse a sysfs CPU bitmask"""
+    try:
+        return int(value.strip().replace(",", ""), 16)
+    except ValueError:
+        return 0
+
+
+class Tuner:
+    """Checks and applies data-plane settings for forwarding through the tunnel"""
+
+    def __init__(self, runner, lan_interface: str):
+        self.runner = runner
+        self.lan_interface = lan_interface
+        # Endpoint host -> {"path_mtu", "measured_at"}
+        self.path_mtu: Dict[str, Dict] = self._load_mtu()
+        self._discovering: Dict[str, asyncio.Task] = {}
+        self._bench_lock = asyncio.Lock()
+
+    # =========================================================================
+    # Path MTU
+    # =========================================================================
+
+    @staticmethod
+    def _load_mtu() -> Dict[str, Dict]:
+        """Load discovered path MTUs from file"""
+        try:
+            if _mtu_file.exists():
+                return json.loads(_mtu_file.read_text())
+        except:
+            pass
+        return {}
+
+    def _save_mtu(self) -> None:
+        """Save discovered path MTUs to file"""
+        try:
+            _mtu_file.parent.mkdir(parents=True, exist_ok=True)
+            _mtu_file.write_text(json.dumps(self.path_mtu, indent=2))
+        except:
+            pass
+
+    async def _fits(self, host: str, size: int) -> bool:
+        """Check if a packet of this size reaches the host with fragmentation forbidden"""
+        ipv6 = ":" in host
+        payload = size - (48 if ipv6 else 28)  # IP + ICMP headers
+        result = await self.runner.run(
+            ["ping", "-6" if ipv6 else "-4", "-n", "-c", "1", "-W", "1", "-M", "do", "-s", str(payload), host],
+            check=False
+        )
+        return result.returncode == 0
+
+    async def discover_path_mtu(self, host: str) -> Optional[int]:
+        """Binary search the largest unfragmented packet to an endpoint, None if it doesn't answer pings"""
+        if not await self._fits(host, PATH_MTU_MIN):
+            return None
+        low, high = PATH_MTU_MIN, PATH_MTU_MAX
+        while low < high:
+            middle = (low + high + 1) // 2
+            if await self._fits(host, middle):
+                low = middle
+            else:
+                high = middle - 1
+
+        self.path_mtu[host] = {"path_mtu": low, "measured_at": time.time()}
+        self._save_mtu()
+        return low
+
+    def tunnel_mtu(self, host: str) -> Optional[int]:
+        """Tunnel MTU for an endpoint from a fresh discovery result, None if unknown"""
+        record = self.path_mtu.get(host)
+        if not record or time.time() - record["measured_at"] > PATH_MTU_TTL:
+            return None
+        overhead = WG_OVERHEAD_IPV6 if ":" in host else WG_OVERHEAD_IPV4
+        return record["path_mtu"] - overhead
+
+    def discover_in_background(self, host: str) -> None:
+        """Start a discovery for an endpoint unless one is running"""
+        if host in self._discovering:
+            return
+        task = asyncio.ensure_future(self.discover_path_mtu(host))
+        self._discovering[host] = task
+        task.add_done_callback(lambda _: self._discovering.pop(host, None))
+
+    async def discover_all(self, hosts: List[str]) -> Dict[str, Optional[int]]:
+        """Discover the path MTU to several endpoints"""
+        hosts = sorted(set(hosts))
+        results = await asyncio.gather(*(self.discover_path_mtu(host) for host in hosts))
+        return dict(zip(hosts, results))
+
+    # =========================================================================
+    # Interface Settings
+    # =========================================================================
+
+    async def _run(self, cmd: List[str], netns: Optional[str] = None, check: bool = False):
+        """Run a command, optionally inside a network namespace"""
+        if netns:
+            cmd = ["ip", "netns", "exec", netns] + cmd
+        return await self.runner.run(cmd, check=check)
+
+    async def _offloads(self, interface: str, netns: Optional[str] = None) -> Dict[str, Dict]:
+        """Current state of the relevant offloads"""
+        result = await self._run(["ethtool", "-k", interface], netns)
+        offloads = {}
+        for line in result.stdout.splitlines():
+            feature, _, value = line.strip().partition(": ")
+            if feature in OFFLOAD_FEATURES:
+                offloads[OFFLOAD_FEATURES[feature]] = {
+                    "on": value.startswith("on"),
+                    "fixed": "[fixed]" in value
+                }
+        return offloads
+
+    async def _qdisc(self, interface: str, netns: Optional[str] = None) -> Dict:
+        """Root queueing discipline and, for multiqueue devices, the per-queue ones"""
+        result = await self._run(["tc", "qdisc", "show", "dev", interface], netns)
+        root, children = None, []
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) < 3 or parts[0] != "qdisc":
+                continue
+            if "root" in parts:
+                root = parts[1]
+            elif "parent" in parts:
+                children.append(parts[1])
+        return {"root": root, "queues": children}
+
+    @staticmethod
+    def _steering(interface: str, kind: str) -> Dict:
+        """RPS (rx) or XPS (tx) CPU masks of all queues"""
+        prefix, file_name = ("rx-", "rps_cpus") if kind == "rps" else ("tx-", "xps_cpus")
+        masks = []
+        queues_dir = Path(f"/sys/class/net/{interface}/queues")
+        try:
+            for queue in sorted(queues_dir.glob(f"{prefix}*")):
+                try:
+                    masks.append((queue / file_name).read_text().strip())
+                except OSError:
+                    pass
+        except OSError:
+            pass
+        return {"queues": len(masks), "masks": masks}
+
+    @staticmethod
+    def _plan(report: Dict) -> List[tuple]:
+        """Changes the recommended settings need: (description, command or sysfs write)"""
+        interface = report["interface"]
+        plan = []
+        for name, state in report["offloads"].items():
+            if not state["on"] and not state["fixed"]:
+                plan.append((f"enable {name}", ["ethtool", "-K", interface, name, "on"]))
+
+        qdisc = report.get("qdisc")
+        if qdisc and qdisc["root"] == "mq":
+            if any(kind not in FAIR_QDISCS for kind in qdisc["queues"]):
+                # Re-creating mq builds its per-queue qdiscs from the default
+                plan.append(("fq_codel on every tx queue", [
+                    ["sysctl", "-qw", "net.core.default_qdisc=fq_codel"],
+                    ["tc", "qdisc", "replace", "dev", interface, "root", "mq"]
+                ]))
+        elif qdisc and qdisc["root"] not in FAIR_QDISCS + ("noqueue",):
+            # noqueue: virtual device without a queue of its own
+            plan.append(("fq_codel root qdisc", ["tc", "qdisc", "replace", "dev", interface, "root", "fq_codel"]))
+
+        # Single-queue NICs (Raspberry Pi) handle every packet on one CPU unless steered
+        cpus = os.cpu_count() or 1
+        for kind, prefix, file_name in (("rps", "rx-", "rps_cpus"), ("xps", "tx-", "xps_cpus")):
+            steering = report.get(kind)
+            if cpus > 1 and steering and steering["queues"] == 1 and _parse_mask(steering["masks"][0]) != (1 << cpus) - 1:
+                path = Path(f"/sys/class/net/{interface}/queues/{prefix}0/{file_name}")
+                plan.append((f"spread {kind} over all {cpus} CPUs", (path, _cpu_mask(cpus))))
+        return plan
+
+    async def check_interface(self, interface: str, lan: bool = True, netns: Optional[str] = None) -> Dict:
+        """Current settings of an interface and what tuning would change"""
+        report = {
+            "interface": interface,
+            "exists": netns is not None or Path(f"/sys/class/net/{interface}").exists(),
+            "offloads": {},
+            "recommendations": []
+        }
+        if not report["exists"]:
+            return report
+
+        report["offloads"] = await self._offloads(interface, netns)
+        if lan:
+            report["qdisc"] = await self._qdisc(interface, netns)
+            # sysfs shows the namespace of this process only
+            if netns is None:
+                report["rps"] = self._steering(interface, "rps")
+                report["xps"] = self._steering(interface, "xps")
+
+        report["recommendations"] = [description for description, _ in self._plan(report)]
+        return report
+
+    async def apply_interface(self, interface: str, lan: bool = True, netns: Optional[str] = None) -> Dict:
+        """Apply the recommended settings, returns the report before and after"""
+        before = await self.check_interface(interface, lan, netns)
+        if not before["exists"]:
+            return {"before": before, "after": before, "actions": [], "errors": [f"{interface} not found"]}
+
+        actions, errors = [], []
+        for description, change in self._plan(before):
+            if isinstance(change, tuple):
+                path, value = change
+                try:
+                    path.write_text(value)
+                    actions.append(description)
+                except OSError as e:
+                    errors.append(f"{description}: {e}")
+                continue
+
+            for cmd in (change if isinstance(change[0], list) else [change]):
+                result = await self._run(cmd, netns)
+                if result.returncode != 0:
+                    errors.append(f"{description}: {result.stderr or 'failed'}")
+                    break
+            else:
+                actions.append(description)
+
+        after = await self.check_interface(interface, lan, netns)
+        return {"before": before, "after": after, "actions": actions, "errors": errors}
+
+    async def check(self, tunnel_interface: Optional[str]) -> Dict:
+        """Report for the LAN interface and the active tunnel"""
+        report = {"lan": await self.check_interface(self.lan_interface, lan=True)}
+        if tunnel_interface:
+            report["tunnel"] = await self.check_interface(tunnel_interface, lan=False)
+        return report
+
+    async def apply(self, tunnel_interface: Optional[str]) -> Dict:
+        """Tune the LAN interface and the active tunnel"""
+        result = {"lan": await self.apply_interface(self.lan_interface, lan=True)}
+        if tunnel_interface:
+            result["tunnel"] = await self.apply_interface(tunnel_interface, lan=False)
+        return result
+
+    # =========================================================================
+    # Forwarding Benchmark
+    # =========================================================================
+
+    async def _bench_setup(self) -> None:
+        """Create client -> router -> server namespaces joined by veth pairs"""
+        client, router, server = (f"{BENCH_PREFIX}-{role}" for role in ("client", "router", "server"))
+        steps = [
+            ["ip", "netns", "add", client],
+            ["ip", "netns", "add", router],
+            ["ip", "netns", "add", server],
+            ["ip", "link", "add", f"{BENCH_PREFIX}-c", "netns", client, "type", "veth",
+             "peer", "name", f"{BENCH_PREFIX}-rc", "netns", router],
+            ["ip", "link", "add", f"{BENCH_PREFIX}-s", "netns", server, "type", "veth",
+             "peer", "name", f"{BENCH_PREFIX}-rs", "netns", router],
+            ["ip", "-n", client, "addr", "add", "10.201.1.2/24", "dev", f"{BENCH_PREFIX}-c"],
+            ["ip", "-n", router, "addr", "add", "10.201.1.1/24", "dev", f"{BENCH_PREFIX}-rc"],
+            ["ip", "-n", router, "addr", "add", "10.201.2.1/24", "dev", f"{BENCH_PREFIX}-rs"],
+            ["ip", "-n", server, "addr", "add", "10.201.2.2/24", "dev", f"{BENCH_PREFIX}-s"],
+        ]
+        for ns, links in ((client, ["lo", f"{BENCH_PREFIX}-c"]),
+                          (router, ["lo", f"{BENCH_PREFIX}-rc", f"{BENCH_PREFIX}-rs"]),
+                          (server, ["lo", f"{BENCH_PREFIX}-s"])):
+            steps.extend(["ip", "-n", ns, "link", "set", link, "up"] for link in links)
+        steps += [
+            ["ip", "-n", client, "route", "add", "default", "via", "10.201.1.1"],
+            ["ip", "-n", server, "route", "add", "default", "via", "10.201.2.1"],
+            ["ip", "netns", "exec", router, "sysctl", "-qw", "net.ipv4.ip_forward=1"],
+        ]
+        for cmd in steps:
+            await self.runner.run(cmd)
+
+    async def _bench_teardown(self) -> None:
+        """Remove the benchmark namespaces (and with them the veth pairs)"""
+        for role in ("client", "router", "server"):
+            if Path(f"/run/netns/{BENCH_PREFIX}-{role}").exists():
+                await self.runner.run(["ip", "netns", "del", f"{BENCH_PREFIX}-{role}"], check=False)
+
+    async def _bench_run(self, seconds: float) -> float:
+        """Single TCP stream from client to server through the router, in Mbit/s"""
+        server = asyncio.ensure_future(self.runner.run(
+            ["ip", "netns", "exec", f"{BENCH_PREFIX}-server", sys.executable, "-c", _BENCH_SERVER],
+            timeout=seconds + 20
+        ))
+        try:
+            await self.runner.run(
+                ["ip", "netns", "exec", f"{BENCH_PREFIX}-client", sys.executable, "-c", _BENCH_CLIENT, str(seconds)],
+                timeout=seconds + 20
+            )
+        except Exception:
+            server.cancel()
+            raise
+        total, elapsed = (float(value) for value in (await server).stdout.split())
+        return round(total * 8 / elapsed / 1_000_000, 1)
+
+    async def benchmark(self, seconds: float = 5) -> Dict:
+        """Forwarding throughput through a local router namespace, untuned and tuned"""
+        if not 0 < seconds <= BENCH_MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {BENCH_MAX_SECONDS}")
+        if self._bench_lock.locked():
+            raise RuntimeError("A benchmark is already running")
+
+        async with self._bench_lock:
+            router = f"{BENCH_PREFIX}-router"
+            await self._bench_teardown()
+            try:
+                await self._bench_setup()
+                # Start from the kernel defaults for veth devices
+                for link in (f"{BENCH_PREFIX}-rc", f"{BENCH_PREFIX}-rs"):
+                    await self._run(["ethtool", "-K", link, "gro", "off", "rx-udp-gro-forwarding", "off"], router)
+                baseline = await self._bench_run(seconds)
+
+                tuning = {}
+                for link in (f"{BENCH_PREFIX}-rc", f"{BENCH_PREFIX}-rs"):
+                    tuning[link] = await self.apply_interface(link, lan=True, netns=router)
+                tuned = await self._bench_run(seconds)
+            finally:
+                await self._bench_teardown()
+
+        return {
+            "seconds": seconds,
+            "baseline_mbps": baseline,
+            "tuned_mbps": tuned,
+            "improvement_percent": round((tuned - baseline) / baseline * 100, 1) if baseline else None,
+            "actions": {link: result["actions"] for link, result in tuning.items()}
+        }
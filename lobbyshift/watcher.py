@@ -0,0 +1,194 @@
+"""
+LobbyShift - Config Directory Watcher
+"""
+
+import os
+import struct
+import ctypes
+import ctypes.util
+import asyncio
+from typing import Callable, List, Optional, Set, Tuple
+
+
+# inotify event flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+# Files finished writing, renamed in/out, or deleted, and the directory itself going away
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# Events that mean individual changes may have been missed
+RESYNC_MASK = IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event: wd, mask, cookie, len, then the name
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Collect events for a moment before applying them (tools often write, then rename)
+WATCH_DEBOUNCE = 0.5
+# Full directory check: catches anything missed and retries Unknown GeoIP results (seconds)
+WATCH_RESYNC_INTERVAL = 300
+# Polling interval when inotify is not available (seconds)
+WATCH_POLL_INTERVAL = 5
+
+
+class Inotify:
+    """Minimal non-blocking inotify binding through libc"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """Watch a path, returns the watch descriptor"""
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self) -> List[Tuple[int, str]]:
+        """Read all pending events as (mask, name)"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                events.append((mask, name))
+
+    def close(self) -> None:
+        """Close the inotify descriptor"""
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """Keeps the WireGuard manager's config catalog in sync with the configs directory"""
+
+    def __init__(self, wg_manager, on_change: Optional[Callable[[List[str]], None]] = None):
+        self.wg_manager = wg_manager
+        self.on_change = on_change
+        # Set once the first full sync (GeoIP warmup) is done
+        self.synced = asyncio.Event()
+        self.mode: Optional[str] = None
+
+    async def _apply(self, names: Optional[Set[str]] = None, retry_unknown: bool = False) -> List[str]:
+        """Read changes in a worker thread, apply them to the catalog on the event loop"""
+        changes = await asyncio.to_thread(
+            self.wg_manager.collect_config_changes,
+            None if names is None else sorted(names),
+            retry_unknown
+        )
+        changed = self.wg_manager.apply_config_changes(changes)
+        if changed and self.on_change:
+            self.on_change(changed)
+        return changed
+
+    async def resync(self) -> List[str]:
+        """Check the whole directory, retrying Unknown GeoIP results"""
+        return await self._apply(retry_unknown=True)
+
+    def _open_inotify(self) -> Optional[Inotify]:
+        """Start watching the configs directory, None if inotify is not available"""
+        try:
+            inotify = Inotify()
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"Warning: inotify not available ({e}), polling {self.wg_manager.configs_dir}")
+            return None
+        try:
+            inotify.add_watch(str(self.wg_manager.configs_dir), WATCH_MASK)
+        except OSError as e:
+            inotify.close()
+            print(f"Warning: cannot watch {self.wg_manager.configs_dir} ({e}), polling instead")
+            return None
+        return inotify
+
+    async def run(self) -> None:
+        """Watch the configs directory until cancelled"""
+        inotify = self._open_inotify()
+        self.mode = "inotify" if inotify else "poll"
+        try:
+            # Watch first, then sync, so nothing written in between is missed
+            await self.resync()
+            self.synced.set()
+            self.wg_manager.watching = True
+
+            if inotify is None:
+                await self._poll()
+            else:
+                await self._watch(inotify)
+        finally:
+            self.wg_manager.watching = False
+            self.synced.set()
+            if inotify is not None:
+                inotify.close()
+
+    async def _poll(self) -> None:
+        """Fallback without inotify: stat the directory periodically"""
+        files = self.wg_manager._scan_configs_dir()
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time() + WATCH_RESYNC_INTERVAL
+        while True:
+            await asyncio.sleep(WATCH_POLL_INTERVAL)
+            try:
+                current = self.wg_manager._scan_configs_dir()
+                if current != files or loop.time() >= next_resync:
+                    await self.resync()
+                    files = current
+                    next_resync = loop.time() + WATCH_RESYNC_INTERVAL
+            except Exception as e:
+                print(f"Config directory poll failed: {e}")
+
+    async def _watch(self, inotify: Inotify) -> None:
+        """Apply inotify events in debounced batches"""
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(inotify.fd, readable.set)
+        try:
+            while True:
+                resync = False
+                names: Set[str] = set()
+                try:
+                    await asyncio.wait_for(readable.wait(), timeout=WATCH_RESYNC_INTERVAL)
+                except asyncio.TimeoutError:
+                    resync = True
+                else:
+                    # The reader is level-triggered: stop watching the fd until the batch is read,
+                    # or the loop spins on it for the whole debounce window
+                    loop.remove_reader(inotify.fd)
+                    await asyncio.sleep(WATCH_DEBOUNCE)
+                    readable.clear()
+                    for mask, name in inotify.read_events():
+                        if mask & RESYNC_MASK:
+                            resync = True
+                        elif name.endswith(".conf"):
+                            names.add(name[:-len(".conf")])
+                    loop.add_reader(inotify.fd, readable.set)
+
+                try:
+                    if resync:
+                        # Periodic check, queue overflow, or the directory was replaced: watch it again
+                        self.wg_manager.configs_dir.mkdir(parents=True, exist_ok=True)
+                        inotify.add_watch(str(self.wg_manager.configs_dir), WATCH_MASK)
+                        await self.resync()
+                    elif names:
+                        await self._apply(names)
+                except Exception as e:
+                    print(f"Config watcher failed to apply changes: {e}")
+        finally:
+            loop.remove_reader(inotify.fd)
@@ -0,0 +1,267 @@
+"""
+LobbyShift - WireGuard Config Model
+"""
+
+import re
+import base64
+import ipaddress
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+
+# Placeholder used when secrets are redacted for display
+REDACTED = "[HIDDEN]"
+
+# Comment used to keep the original hostname next to a pinned Endpoint IP
+HOSTNAME_COMMENT = "# Endpoint hostname:"
+
+
+class WireGuardConfigError(ValueError):
+    """Raised when a WireGuard config is invalid"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+@dataclass
+class Interface:
+    """[Interface] section"""
+
+    private_key: str = ""
+    addresses: List[str] = field(default_factory=list)
+    listen_port: Optional[int] = None
+    dns: List[str] = field(default_factory=list)
+    mtu: Optional[int] = None
+    table: Optional[str] = None
+    # Other keys (PostUp, FwMark, ...) in file order
+    extra: List[Tuple[str, str]] = field(default_factory=list)
+    comments: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Peer:
+    """[Peer] section"""
+
+    public_key: str = ""
+    preshared_key: Optional[str] = None
+    allowed_ips: List[str] = field(default_factory=list)
+    endpoint: Optional[str] = None
+    endpoint_hostname: Optional[str] = None
+    persistent_keepalive: Optional[int] = None
+    extra: List[Tuple[str, str]] = field(default_factory=list)
+    comments: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WireGuardConfig:
+    """Parsed WireGuard config"""
+
+    interface: Interface = field(default_factory=Interface)
+    peers: List[Peer] = field(default_factory=list)
+    # Comments before the first section
+    header: List[str] = field(default_factory=list)
+    # Problems found while parsing
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """Endpoint of the first peer that has one"""
+        for peer in self.peers:
+            if peer.endpoint:
+                return peer.endpoint
+        return None
+
+    def validate(self) -> List[str]:
+        """Return a list of problems (empty if the config is usable)"""
+        errors = list(self.errors)
+
+        if not is_valid_key(self.interface.private_key):
+            errors.append("Interface: invalid or missing PrivateKey")
+        if not self.interface.addresses:
+            errors.append("Interface: missing Address")
+        for address in self.interface.addresses:
+            try:
+                ipaddress.ip_interface(address)
+            except ValueError:
+                errors.append(f"Interface: invalid Address {address}")
+
+        if not self.peers:
+            errors.append("No [Peer] section")
+        for index, peer in enumerate(self.peers, 1):
+            if not is_valid_key(peer.public_key):
+                errors.append(f"Peer {index}: invalid or missing PublicKey")
+            if peer.preshared_key is not None and not is_valid_key(peer.preshared_key):
+                errors.append(f"Peer {index}: invalid PresharedKey")
+            for cidr in peer.allowed_ips:
+                try:
+                    ipaddress.ip_network(cidr, strict=False)
+                except ValueError:
+                    errors.append(f"Peer {index}: invalid AllowedIPs {cidr}")
+            if peer.endpoint:
+                try:
+                    split_endpoint(peer.endpoint)
+                except ValueError as e:
+                    errors.append(f"Peer {index}: {e}")
+
+        return errors
+
+    def check(self) -> None:
+        """Raise WireGuardConfigError if the config is invalid"""
+        errors = self.validate()
+        if errors:
+            raise WireGuardConfigError(errors)
+
+    def render(self, redact: bool = False) -> str:
+        """Render the config in a deterministic layout"""
+        lines = list(self.header)
+        if lines:
+            lines.append("")
+
+        iface = self.interface
+        lines.append("[Interface]")
+        lines.extend(iface.comments)
+        lines.append(f"PrivateKey = {REDACTED if redact else iface.private_key}")
+        if iface.addresses:
+            lines.append(f"Address = {', '.join(iface.addresses)}")
+        if iface.listen_port is not None:
+            lines.append(f"ListenPort = {iface.listen_port}")
+        if iface.dns:
+            lines.append(f"DNS = {', '.join(iface.dns)}")
+        if iface.mtu is not None:
+            lines.append(f"MTU = {iface.mtu}")
+        if iface.table is not None:
+            lines.append(f"Table = {iface.table}")
+        lines.extend(f"{key} = {value}" for key, value in iface.extra)
+
+        for peer in self.peers:
+            lines.append("")
+            lines.append("[Peer]")
+            lines.extend(peer.comments)
+            lines.append(f"PublicKey = {peer.public_key}")
+            if peer.preshared_key is not None:
+                lines.append(f"PresharedKey = {REDACTED if redact else peer.preshared_key}")
+            if peer.allowed_ips:
+                lines.append(f"AllowedIPs = {', '.join(peer.allowed_ips)}")
+            if peer.endpoint_hostname:
+                lines.append(f"{HOSTNAME_COMMENT} {peer.endpoint_hostname}")
+            if peer.endpoint:
+                lines.append(f"Endpoint = {peer.endpoint}")
+            if peer.persistent_keepalive is not None:
+                lines.append(f"PersistentKeepalive = {peer.persistent_keepalive}")
+            lines.extend(f"{key} = {value}" for key, value in peer.extra)
+
+        return "\n".join(lines) + "\n"
+
+
+def is_valid_key(key: Optional[str]) -> bool:
+    """Check if a string is a base64 encoded 32 byte WireGuard key"""
+    if not key or len(key) != 44:
+        return False
+    try:
+        return len(base64.b64decode(key, validate=True)) == 32
+    except ValueError:
+        return False
+
+
+def split_endpoint(endpoint: str) -> Tuple[str, int]:
+    """Split host:port or [ipv6]:port into host and port"""
+    match = re.match(r'^\[([^\]]+)\]:(\d+)$', endpoint) or re.match(r'^([^:\s]+):(\d+)$', endpoint)
+    if not match:
+        raise ValueError(f"invalid Endpoint {endpoint}")
+    port = int(match.group(2))
+    if not 0 < port < 65536:
+        raise ValueError(f"invalid Endpoint port {port}")
+    return match.group(1), port
+
+
+def join_endpoint(host: str, port: int) -> str:
+    """Build an Endpoint value, bracketing IPv6 addresses"""
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+
+def _split_list(value: str) -> List[str]:
+    """Split a comma separated value"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _parse_int(key: str, value: str, errors: List[str]) -> Optional[int]:
+    """Parse an integer value, recording an error if it isn't one"""
+    try:
+        return int(value)
+    except ValueError:
+        errors.append(f"{key}: not a number: {value}")
+        return None
+
+
+def parse_config(content: str) -> WireGuardConfig:
+    """Parse a WireGuard config, problems are collected in .errors"""
+    config = WireGuardConfig()
+    section = None
+    current = None
+
+    for number, raw in enumerate(content.splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            target = config.header if current is None else current.comments
+            if line.startswith(HOSTNAME_COMMENT) and isinstance(current, Peer):
+                current.endpoint_hostname = line[len(HOSTNAME_COMMENT):].strip()
+            else:
+                target.append(line)
+            continue
+
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1].strip().lower()
+            if section == "interface":
+                current = config.interface
+            elif section == "peer":
+                current = Peer()
+                config.peers.append(current)
+            else:
+                config.errors.append(f"Line {number}: unknown section {line}")
+                current = None
+            continue
+
+        if "=" not in line:
+            config.errors.append(f"Line {number}: expected 'Key = Value'")
+            continue
+        if current is None:
+            config.errors.append(f"Line {number}: key outside of a section")
+            continue
+
+        key, value = (part.strip() for part in line.split("=", 1))
+        lower = key.lower()
+
+        if isinstance(current, Interface):
+            if lower == "privatekey":
+                current.private_key = value
+            elif lower == "address":
+                current.addresses.extend(_split_list(value))
+            elif lower == "listenport":
+                current.listen_port = _parse_int(key, value, config.errors)
+            elif lower == "dns":
+                current.dns.extend(_split_list(value))
+            elif lower == "mtu":
+                current.mtu = _parse_int(key, value, config.errors)
+            elif lower == "table":
+                current.table = value
+            else:
+                current.extra.append((key, value))
+        else:
+            if lower == "publickey":
+                current.public_key = value
+            elif lower == "presharedkey":
+                current.preshared_key = value
+            elif lower == "allowedips":
+                current.allowed_ips.extend(_split_list(value))
+            elif lower == "endpoint":
+                current.endpoint = value
+            elif lower == "persistentkeepalive":
+                current.persistent_keepalive = _parse_int(key, value, config.errors)
+            else:
+                current.extra.append((key, value))
+
+    return config
@@ -7,12 +7,28 @@ import re
 import asyncio
 import subprocess
 import json
+import copy
+import time
+import signal
+import shlex
+import ipaddress
+import statistics
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Callable, List, Dict, Optional, Union
+from datetime import datetime, timedelta
+from collections import deque
 import urllib.request
 import socket
 
+from .config import CONFIG_DIR
+from .catalog import ConfigIndex
+from .tracing import traced
+from .runner import CommandRunner, CommandError
+from .tuning import Tuner
+from .accounting import ClientAccounting, ACCOUNTING_TABLE
+from .wgconfig import WireGuardConfig, WireGuardConfigError, parse_config, split_endpoint, join_endpoint, REDACTED
+
 
 # Country code mapping for flags (ALL countries)
 COUNTRY_FLAGS = {
@@ -103,11 +119,72 @@ COUNTRY_FLAGS = {
 
 # Cache for GeoIP lookups
 _geoip_cache: Dict[str, Dict] = {}
-_cache_file = Path("/etc/lobbyshift/geoip_cache.json")
-_favorites_file = Path("/etc/lobbyshift/favorites.json")
-_logs_file = Path("/etc/lobbyshift/connection_logs.json")
+_cache_file = CONFIG_DIR / "geoip_cache.json"
+_favorites_file = CONFIG_DIR / "favorites.json"
+# Append-only, one JSON entry per line, oldest first
+_logs_file = CONFIG_DIR / "connection_logs.ndjson"
+_flow_offload_file = CONFIG_DIR / "flow-offload.nft"
+_legacy_logs_file = CONFIG_DIR / "connection_logs.json"
+
+# Cache for endpoint DNS lookups: hostname -> {"ip": ..., "expires": unix time}
+# getaddrinfo doesn't expose record TTLs, so entries live for DNS_CACHE_TTL.
+# Expired entries are still used if a refresh fails (provider DNS outage).
+_dns_cache: Dict[str, Dict] = {}
+_dns_cache_file = CONFIG_DIR / "dns_cache.json"
+DNS_CACHE_TTL = 300
+DNS_REFRESH_INTERVAL = 60
+
+# Matchmaking RTT probes through the tunnel
+_latency_file = CONFIG_DIR / "latency.json"
+PROBE_INTERVAL = 60
+PROBE_COUNT = 3
+PROBE_SAMPLES_PER_RANGE = 2
+
+# Tunnel traffic above this rate (bytes/s) counts as an active session
+BUSY_THRESHOLD = 5000
+# Tunnel packet rate above this counts as an active session (game traffic is ~20-60 pps)
+BUSY_PPS = 20
+# Samples older than this are not used for rate calculation (seconds)
+TRAFFIC_SAMPLE_MAX_AGE = 30
+# How often a queued switch checks whether the tunnel went idle (seconds)
+SWITCH_GUARD_INTERVAL = 5
+
+# How often configs with an Unknown country are looked up again (seconds)
+GEOIP_RETRY_INTERVAL = 300
+
+# nftables table holding the flowtable for LAN <-> tunnel flows, and how long
+# an offloaded flow count serves status requests (seconds)
+FLOW_OFFLOAD_TABLE = "lobbyshift_offload"
+FLOW_COUNT_MAX_AGE = 5
+
+# How long one `wg show all dump` serves status requests (seconds)
+WG_DUMP_MAX_AGE = 1.0
+
+# Connection log paging and retention
+LOG_PAGE_SIZE = 100
+LOG_RETENTION_DAYS = 30
+LOG_RETENTION_ENTRIES = 1000
+LOG_RETENTION_INTERVAL = 3600
+_LOG_READ_CHUNK = 8192
+
+# Switch modes
+SWITCH_MODE_CLASSIC = "classic"
+SWITCH_MODE_MAKE_BEFORE_BREAK = "make_before_break"
+SWITCH_MODES = (SWITCH_MODE_CLASSIC, SWITCH_MODE_MAKE_BEFORE_BREAK)
+
+# Make-before-break timings (seconds)
+HANDSHAKE_TIMEOUT = 10
+DRAIN_SECONDS = 2
+
+# Busiest LAN clients included in the status
+CLIENTS_IN_STATUS = 5
 
+# Config validation: how long LAN addresses are reused, and pings sent to the endpoint
+LAN_ADDRESS_MAX_AGE = 30
+VALIDATE_PING_COUNT = 2
 
+
+@traced("file.geoip_cache.load")
 def _load_geoip_cache():
     """Load GeoIP cache from file"""
     global _geoip_cache
@@ -118,6 +195,7 @@ def _load_geoip_cache():
         _geoip_cache = {}
 
 
+@traced("file.geoip_cache.save")
 def _save_geoip_cache():
     """Save GeoIP cache to file"""
     try:
@@ -127,14 +205,106 @@ def _save_geoip_cache():
         pass
 
 
-def _resolve_hostname(hostname: str) -> Optional[str]:
-    """Resolve hostname to IP address"""
+def _load_dns_cache():
+    """Load DNS cache from file"""
+    global _dns_cache
     try:
-        return socket.gethostbyname(hostname)
+        if _dns_cache_file.exists():
+            _dns_cache = json.loads(_dns_cache_file.read_text())
     except:
-        return None
+        _dns_cache = {}
+
+
+def _save_dns_cache():
+    """Save DNS cache to file"""
+    try:
+        _dns_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        _dns_cache_file.write_text(json.dumps(_dns_cache))
+    except:
+        pass
+
+
+def get_cached_ip(hostname: str) -> Optional[str]:
+    """Get the cached IP for a hostname without resolving (may be expired)"""
+    if not _dns_cache:
+        _load_dns_cache()
+    entry = _dns_cache.get(hostname)
+    return entry["ip"] if entry else None
+
+
+@traced("dns.resolve")
+def _resolve_hostname(hostname: str, force: bool = False) -> Optional[str]:
+    """Resolve hostname to IP address through the DNS cache"""
+    if not _dns_cache:
+        _load_dns_cache()
+    
+    entry = _dns_cache.get(hostname)
+    if entry and not force and entry["expires"] > time.time():
+        return entry["ip"]
+    
+    try:
+        # First address in the system's preference order (gai.conf), IPv6 only if this host has it
+        ip = socket.getaddrinfo(hostname, None, type=socket.SOCK_DGRAM, flags=socket.AI_ADDRCONFIG)[0][4][0]
+    except:
+        # Serve stale rather than failing while DNS is down
+        return entry["ip"] if entry else None
+    
+    _dns_cache[hostname] = {"ip": ip, "expires": time.time() + DNS_CACHE_TTL}
+    _save_dns_cache()
+    return ip
+
+
+def _is_hostname(host: str) -> bool:
+    """Check if an endpoint host is a hostname rather than an IPv4/IPv6 address"""
+    try:
+        ipaddress.ip_address(host)
+        return False
+    except ValueError:
+        return True
+
+
+def _endpoint_host(value: str) -> str:
+    """Host of an address, host:port or [ipv6]:port value, IP addresses in canonical form"""
+    try:
+        host, _ = split_endpoint(value)
+    except ValueError:
+        host = value.strip().strip("[]")
+    try:
+        return ipaddress.ip_address(host).compressed
+    except ValueError:
+        return host
+
+
+def _normalize_ranges(ranges: List[str]) -> List[str]:
+    """Canonical IPv4/IPv6 networks, skipping (and reporting) invalid entries"""
+    networks = []
+    for cidr in ranges:
+        try:
+            network = str(ipaddress.ip_network(cidr.strip(), strict=False))
+        except ValueError:
+            print(f"Warning: ignoring invalid allowed_ips entry {cidr!r}")
+            continue
+        if network not in networks:
+            networks.append(network)
+    return networks
+
+
+def _index_latency(latency_ms: Optional[float]) -> Optional[int]:
+    """Latency as listed and sorted in the catalog (whole milliseconds)"""
+    return None if latency_ms is None else int(round(latency_ms))
 
 
+def _nft_table_name(prefix: str, interface: str) -> str:
+    """Per-instance nftables table name (identifiers can't contain '-')"""
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9_]', '_', interface)}"
+
+
+def _range_version(cidr: str) -> int:
+    """IP version (4 or 6) of a network"""
+    return ipaddress.ip_network(cidr, strict=False).version
+
+
+@traced("geoip.ip-api")
 def _lookup_ip_api(host: str) -> Optional[Dict]:
     """Try ip-api.com"""
     try:
@@ -155,6 +325,7 @@ def _lookup_ip_api(host: str) -> Optional[Dict]:
     return None
 
 
+@traced("geoip.ipwho")
 def _lookup_ipwho(host: str) -> Optional[Dict]:
     """Try ipwho.is (free, unlimited)"""
     try:
@@ -175,6 +346,7 @@ def _lookup_ipwho(host: str) -> Optional[Dict]:
     return None
 
 
+@traced("geoip.ipapi-co")
 def _lookup_ipapi_co(host: str) -> Optional[Dict]:
     """Try ipapi.co (free 1000/day)"""
     try:
@@ -195,6 +367,7 @@ def _lookup_ipapi_co(host: str) -> Optional[Dict]:
     return None
 
 
+@traced("geoip.lookup")
 def lookup_geoip(ip_or_hostname: str) -> Dict:
     """Lookup country for an IP address using multiple GeoIP services"""
     global _geoip_cache
@@ -203,11 +376,11 @@ def lookup_geoip(ip_or_hostname: str) -> Dict:
     if not _geoip_cache:
         _load_geoip_cache()
     
-    # Extract IP if it's hostname:port format
-    host = ip_or_hostname.split(":")[0]
+    # Extract the host from host:port and [ipv6]:port formats
+    host = _endpoint_host(ip_or_hostname)
     
     # Check if it's a hostname and resolve it
-    if not re.match(r'^\d+\.\d+\.\d+\.\d+$', host):
+    if _is_hostname(host):
         resolved_ip = _resolve_hostname(host)
         if resolved_ip:
             host = resolved_ip
@@ -245,6 +418,26 @@ def lookup_geoip(ip_or_hostname: str) -> Dict:
     return result
 
 
+def _format_bytes(value: int) -> str:
+    """Format a byte count like `wg show` does"""
+    for unit, size in (("TiB", 1 << 40), ("GiB", 1 << 30), ("MiB", 1 << 20), ("KiB", 1 << 10)):
+        if value >= size:
+            return f"{value / size:.2f} {unit}"
+    return f"{value} B"
+
+
+def _format_ago(seconds: int) -> str:
+    """Format a handshake age like `wg show` does"""
+    if seconds <= 0:
+        return "Now"
+    parts = []
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60), ("second", 1)):
+        count, seconds = divmod(seconds, size)
+        if count:
+            parts.append(f"{count} {unit}{'s' if count != 1 else ''}")
+    return ", ".join(parts) + " ago"
+
+
 def clear_geoip_cache_for_ip(ip: str) -> None:
     """Clear GeoIP cache for a specific IP to force re-lookup"""
     global _geoip_cache
@@ -252,6 +445,7 @@ def clear_geoip_cache_for_ip(ip: str) -> None:
     if not _geoip_cache:
         _load_geoip_cache()
     
+    ip = _endpoint_host(ip)
     if ip in _geoip_cache:
         del _geoip_cache[ip]
         _save_geoip_cache()
@@ -283,32 +477,122 @@ class WireGuardManager:
         self,
         configs_dir: Path,
         interface_name: str = "lobbyshift",
-        allowed_ips: List[str] = None
+        allowed_ips: List[str] = None,
+        switch_mode: str = SWITCH_MODE_MAKE_BEFORE_BREAK,
+        probe_host: str = "",
+        probe_targets: List[str] = None,
+        busy_threshold: int = BUSY_THRESHOLD,
+        busy_pps: int = BUSY_PPS,
+        busy_flows: int = 0,
+        lan_interface: str = "eth0",
+        path_mtu_discovery: bool = False,
+        flow_offload: bool = False,
+        client_accounting: bool = False
     ):
         self.configs_dir = Path(configs_dir)
         self.interface_name = interface_name
-        self.allowed_ips = allowed_ips or ["185.34.0.0/16"]
+        self.allowed_ips = _normalize_ranges(allowed_ips or ["185.34.0.0/16"])
+        self.switch_mode = switch_mode if switch_mode in SWITCH_MODES else SWITCH_MODE_MAKE_BEFORE_BREAK
+        self.probe_host = probe_host
+        self.probe_targets = probe_targets or []
+        self.busy_threshold = busy_threshold
+        self.busy_pps = busy_pps
+        # Conntrack UDP flows toward allowed_ips that count as a session (0 = don't check)
+        self.busy_flows = busy_flows
+        
+        # Switch waiting for the tunnel to go idle, and the last one executed
+        self.pending_switch: Optional[Dict] = None
+        self.last_deferred_switch: Optional[Dict] = None
+        # Called with the outcome of every queued switch once the guard executes it
+        self.deferred_switch_listeners: List[Callable[[Dict], None]] = []
+        
+        # Last tunnel byte counter sample: (monotonic time, interface, rx, tx)
+        self._traffic_sample: Optional[tuple] = None
         self.active_config: Optional[str] = None
         
+        # Interface currently carrying the tunnel. Make-before-break switching
+        # alternates between the primary and the staging interface.
+        self.active_interface = interface_name
+        self.staging_interface = f"{interface_name}-b"
+        
+        # Parsed config catalog: name -> {"key": (mtime_ns, size), "entry": {...}}
+        self._catalog: Dict[str, Dict] = {}
+        
+        # Store version counters, bumped on every change made through the manager
+        self._versions = {"configs": 0, "favorites": 0, "logs": 0}
+        
+        # Indexes over the catalog (country, continent, favorite, latency, last used)
+        self.index = ConfigIndex()
+        self._synced_files: Optional[tuple] = None
+        self._synced_favorites: Optional[tuple] = None
+        # Unknown countries were just looked up by the first read, retry them later
+        self._geoip_retry_at = time.monotonic() + GEOIP_RETRY_INTERVAL
+        self._geoip_retry_task: Optional[asyncio.Task] = None
+        # Set while a ConfigWatcher keeps the catalog in sync with the configs directory
+        self.watching = False
+        # Serializes appends with the swap at the end of a retention rewrite
+        self._logs_lock = threading.Lock()
+        self._migrate_legacy_logs()
+        last_log = next(self._iter_logs_reversed(), None)
+        self._next_log_id = last_log["id"] + 1 if last_log else 1
+        self._load_last_used()
+        
+        # Matchmaking RTT per config: name -> {"rtt_ms", "targets", "measured_at", ...}
+        self._latency: Dict[str, Dict] = self._load_latency()
+        self._seed_latency()
+        
+        # External commands: timeouts, bounded concurrency, shared `wg show` reads
+        self.runner = CommandRunner()
+        
+        # Data-plane tuning; with path MTU discovery the tunnel MTU follows each endpoint's path
+        self.tuner = Tuner(self.runner, lan_interface)
+        self.path_mtu_discovery = path_mtu_discovery
+        
+        # nftables flowtable fast path for established LAN <-> tunnel flows
+        self.lan_interface = lan_interface
+        self.flow_offload = flow_offload
+        self._offloaded_interface: Optional[str] = None
+        self._flow_offload_error: Optional[str] = None
+        # Suffixed with the interface, so instances with their own wg_interface keep separate tables
+        self.flow_offload_table = _nft_table_name(FLOW_OFFLOAD_TABLE, interface_name)
+        
+        # Per-LAN-client counters for tunneled traffic (nftables sets, sampled in the background)
+        self.accounting = ClientAccounting(
+            self.runner, lan_interface, _nft_table_name(ACCOUNTING_TABLE, interface_name)
+        ) if client_accounting else None
+        
         # Ensure configs directory exists
         self.configs_dir.mkdir(parents=True, exist_ok=True)
     
-    async def _run_command(self, cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
-        """Run a shell command asynchronously"""
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        if check and process.returncode != 0:
-            raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{stderr.decode()}")
-        
-        return subprocess.CompletedProcess(
-            cmd, process.returncode,
-            stdout.decode(), stderr.decode()
-        )
+    async def _run_command(self, cmd: List[str], check: bool = True, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """Run a command through the shared runner (timeouts, concurrency limit, metrics)"""
+        try:
+            return await self.runner.run(cmd, check=check, timeout=timeout)
+        finally:
+            # Bringing interfaces up or down makes shared `wg show` results stale
+            if cmd[0] == "wg-quick":
+                self.runner.invalidate()
+    
+    async def _wg_dump(self, max_age: float = WG_DUMP_MAX_AGE) -> Dict[str, Dict]:
+        """State of all WireGuard interfaces from one `wg show all dump`, shared by concurrent callers"""
+        result = await self.runner.run_shared(["wg", "show", "all", "dump"], max_age=max_age)
+        interfaces = {}
+        for line in result.stdout.splitlines():
+            fields = line.split("\t")
+            if len(fields) == 5:
+                # interface, private key, public key, listen port, fwmark
+                interfaces[fields[0]] = {"public_key": fields[2], "listen_port": fields[3], "peers": []}
+            elif len(fields) == 9 and fields[0] in interfaces:
+                # interface, public key, preshared key, endpoint, allowed ips, handshake, rx, tx, keepalive
+                interfaces[fields[0]]["peers"].append({
+                    "public_key": fields[1],
+                    "endpoint": None if fields[3] == "(none)" else fields[3],
+                    "allowed_ips": fields[4],
+                    "latest_handshake": int(fields[5]),
+                    "transfer_rx": int(fields[6]),
+                    "transfer_tx": int(fields[7])
+                })
+        return interfaces
     
     def _get_config_path(self, name: str) -> Path:
         """Get full path to a config file"""
@@ -316,57 +600,108 @@ class WireGuardManager:
         name = name.replace('.conf', '')
         return self.configs_dir / f"{name}.conf"
     
-    def _modify_config_for_split_tunnel(self, content: str) -> str:
-        """Modify a WireGuard config for split tunneling"""
-        lines = content.split('\n')
-        modified_lines = []
-        in_peer_section = False
+    def _scan_configs_dir(self) -> tuple:
+        """Stat all config files, no file is read"""
+        files = []
+        for entry in sorted(os.scandir(self.configs_dir), key=lambda e: e.name):
+            if entry.name.endswith(".conf"):
+                stat = entry.stat()
+                files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(files)
+    
+    def _bump_version(self, store: str) -> None:
+        """Mark a store as changed"""
+        self._versions[store] += 1
+    
+    def get_version(self, store: str) -> tuple:
+        """Get a cheap version key for a store (changes whenever its data may have changed)"""
+        if store == "configs":
+            files = None if self.watching else self._scan_configs_dir()
+            return (self._versions["configs"], self.active_config, self.get_version("favorites"), files)
         
-        for line in lines:
-            stripped = line.strip()
-            
-            # Track sections
-            if stripped.startswith('[Peer]'):
-                in_peer_section = True
-            elif stripped.startswith('[') and stripped.endswith(']'):
-                in_peer_section = False
-            
-            # Modify AllowedIPs in Peer section
-            if in_peer_section and stripped.lower().startswith('allowedips'):
-                # Replace with our specific IPs
-                allowed_ips_str = ', '.join(self.allowed_ips)
-                modified_lines.append(f"AllowedIPs = {allowed_ips_str}")
-                continue
-            
-            # Comment out DNS to prevent system DNS changes
-            if stripped.lower().startswith('dns'):
-                modified_lines.append(f"# {line}")
+        path = {"favorites": _favorites_file, "logs": _logs_file}[store]
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        return (self._versions[store], mtime)
+    
+    def _tunnel_ranges(self, parsed: WireGuardConfig) -> List[str]:
+        """Allowed ranges a config can carry: IPv6 ranges need an IPv6 Address, IPv4 ranges an IPv4 one"""
+        versions = set()
+        for address in parsed.interface.addresses:
+            try:
+                versions.add(ipaddress.ip_interface(address).version)
+            except ValueError:
                 continue
-            
-            modified_lines.append(line)
+        return [cidr for cidr in self.allowed_ips if _range_version(cidr) in versions]
+    
+    def _modify_config_for_split_tunnel(self, parsed: WireGuardConfig) -> WireGuardConfig:
+        """Modify a WireGuard config for split tunneling"""
+        # Replace AllowedIPs of every peer with our specific IPs. Routing a family the tunnel
+        # has no address for would blackhole it, so those ranges keep using the native path
+        ranges = self._tunnel_ranges(parsed)
+        for peer in parsed.peers:
+            peer.allowed_ips = list(ranges)
+        
+        # Comment out DNS to prevent system DNS changes
+        if parsed.interface.dns:
+            parsed.interface.comments.append(f"# DNS = {', '.join(parsed.interface.dns)}")
+            parsed.interface.dns = []
         
-        return '\n'.join(modified_lines)
+        return parsed
+    
+    def _prepare_config(self, content: str, existing: Optional[WireGuardConfig] = None) -> WireGuardConfig:
+        """Parse, validate and split-tunnel an uploaded config"""
+        parsed = parse_config(content)
+        
+        # Content edited in the UI carries redacted secrets, keep the stored ones
+        if existing is not None:
+            if parsed.interface.private_key == REDACTED:
+                parsed.interface.private_key = existing.interface.private_key
+            for peer, old_peer in zip(parsed.peers, existing.peers):
+                if peer.preshared_key == REDACTED:
+                    peer.preshared_key = old_peer.preshared_key
+        
+        parsed.check()
+        return self._modify_config_for_split_tunnel(parsed)
+    
+    def _refresh_geoip(self, parsed: WireGuardConfig) -> None:
+        """Force a fresh GeoIP lookup for a config's endpoint"""
+        if not parsed.endpoint:
+            return
+        host, _ = split_endpoint(parsed.endpoint)
+        # Clear cache for this IP to force fresh lookup
+        clear_geoip_cache_for_ip(host)
+        # Do the lookup now
+        lookup_geoip(parsed.endpoint)
+    
+    async def _check_config(self, parsed: WireGuardConfig) -> WireGuardConfig:
+        """Run the validation pipeline on an uploaded config, raising WireGuardConfigError on problems"""
+        report = await self.validate_config(parsed, strict=False)
+        if not report["valid"]:
+            raise WireGuardConfigError(report["errors"])
+        for warning in report["warnings"]:
+            print(f"Warning: {warning}")
+        return parsed
     
     async def save_config(self, name: str, content: str) -> Path:
         """Save a new WireGuard config with split tunnel modifications"""
         # Sanitize name
         name = re.sub(r'[^a-zA-Z0-9_-]', '_', name)
         
-        # Modify for split tunneling
-        modified_content = self._modify_config_for_split_tunnel(content)
+        # Validate and modify for split tunneling
+        parsed = await self._check_config(self._prepare_config(content))
         
         # Save
         config_path = self._get_config_path(name)
-        config_path.write_text(modified_content)
+        config_path.write_text(parsed.render())
         config_path.chmod(0o600)
+        self._bump_version("configs")
         
         # Trigger GeoIP lookup for the new config
-        endpoint = self._extract_endpoint(modified_content)
-        if endpoint and endpoint != "Unknown":
-            # Clear cache for this IP to force fresh lookup
-            clear_geoip_cache_for_ip(endpoint.split(":")[0])
-            # Do the lookup now
-            lookup_geoip(endpoint)
+        self._refresh_geoip(parsed)
+        self._catalog_entry(config_path)
         
         return config_path
     
@@ -377,17 +712,16 @@ class WireGuardManager:
         if not config_path.exists():
             raise FileNotFoundError(f"Config not found: {name}")
         
-        # Modify for split tunneling
-        modified_content = self._modify_config_for_split_tunnel(content)
+        # Validate and modify for split tunneling
+        parsed = await self._check_config(self._prepare_config(content, existing=self.get_parsed_config(name)))
         
-        config_path.write_text(modified_content)
+        config_path.write_text(parsed.render())
         config_path.chmod(0o600)
+        self._bump_version("configs")
         
         # Trigger GeoIP lookup for the updated config
-        endpoint = self._extract_endpoint(modified_content)
-        if endpoint and endpoint != "Unknown":
-            clear_geoip_cache_for_ip(endpoint.split(":")[0])
-            lookup_geoip(endpoint)
+        self._refresh_geoip(parsed)
+        self._catalog_entry(config_path)
         
         # Restart if this config is active
         if self.active_config == name:
@@ -400,17 +734,21 @@ class WireGuardManager:
         if not config_path.exists():
             raise FileNotFoundError(f"Config not found: {name}")
         
-        content = config_path.read_text()
-        
         if sanitize:
-            # Remove private key
-            content = re.sub(
-                r'(PrivateKey\s*=\s*)[^\n]+',
-                r'\1[HIDDEN]',
-                content
-            )
+            # Hide private and preshared keys
+            return self.get_parsed_config(name).render(redact=True)
+        
+        return config_path.read_text()
+    
+    def get_parsed_config(self, name: str) -> WireGuardConfig:
+        """Get a parsed copy of a config (parsed once, served from the catalog)"""
+        config_path = self._get_config_path(name)
         
-        return content
+        if not config_path.exists():
+            raise FileNotFoundError(f"Config not found: {name}")
+        
+        self._catalog_entry(config_path)
+        return copy.deepcopy(self._catalog[config_path.stem]["parsed"])
     
     def delete_config(self, name: str) -> None:
         """Delete a config file"""
@@ -420,41 +758,346 @@ class WireGuardManager:
             raise FileNotFoundError(f"Config not found: {name}")
         
         config_path.unlink()
+        self._forget_config(config_path.stem)
+        self._bump_version("configs")
+    
+    @traced("file.config.read")
+    def _read_catalog_entry(self, conf_file: Path, retry_unknown: bool = False) -> Optional[Dict]:
+        """Read a config file into a catalog record, None if the cached one is still current"""
+        name = conf_file.stem
+        stat = conf_file.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        
+        # Unknown countries are only looked up again by the throttled retry, never on the request path
+        cached = self._catalog.get(name)
+        if cached and cached["key"] == key and (not retry_unknown or cached["entry"]["country"].get("code") != "??"):
+            return None
+        
+        parsed = parse_config(conf_file.read_text())
+        endpoint = parsed.endpoint or "Unknown"
+        
+        # Get country from IP via GeoIP lookup
+        if endpoint != "Unknown":
+            country = lookup_geoip(endpoint)
+        else:
+            country = {"code": "??", "name": "Unknown", "flag": "🌍"}
+        
+        entry = {
+            "name": name,
+            "endpoint": endpoint,
+            "country": country,
+            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+        return {"key": key, "entry": entry, "parsed": parsed}
+    
+    def _catalog_entry(self, conf_file: Path) -> Dict:
+        """Get the cached catalog entry for a config file, re-reading it only when it changed"""
+        record = self._read_catalog_entry(conf_file)
+        if record is not None:
+            self._catalog[conf_file.stem] = record
+            self.index.update(record["entry"])
+        return self._catalog[conf_file.stem]["entry"]
+    
+    def _forget_config(self, name: str) -> None:
+        """Drop a deleted config from the catalog and its indexes"""
+        if name in self._catalog:
+            del self._catalog[name]
+            self.index.remove(name)
+    
+    def invalidate_catalog(self) -> None:
+        """Drop cached config entries (e.g. after the GeoIP cache was cleared)"""
+        if self.watching:
+            # Keep serving the current entries until the watcher has re-read them
+            for record in self._catalog.values():
+                record["key"] = None
+            return
+        
+        self._catalog.clear()
+        self.index = ConfigIndex()
+        self._synced_files = None
+        self._synced_favorites = None
+        self._load_last_used()
+        self._seed_latency()
+        self._bump_version("configs")
+    
+    def _seed_latency(self) -> None:
+        """Seed the latency index from the stored probe results"""
+        for name, record in self._latency.items():
+            self.index.set_latency(name, _index_latency(record.get("rtt_ms")))
+    
+    def _load_last_used(self) -> None:
+        """Seed the last-used index from the connection log"""
+        for log in self.iter_connection_logs():
+            if log.get("action") == "connected" and log.get("config"):
+                self.index.set_last_used(log["config"], log["timestamp"])
+    
+    @traced("catalog.sync")
+    def _sync_catalog(self) -> None:
+        """Bring the catalog and its indexes up to date with the configs directory"""
+        favorites_version = self.get_version("favorites")
+        if favorites_version != self._synced_favorites:
+            self.index.set_favorites(self.get_favorites())
+            self._synced_favorites = favorites_version
+        
+        # The config watcher keeps the catalog current, don't scan on the request path
+        if self.watching:
+            return
+        
+        if time.monotonic() >= self._geoip_retry_at:
+            self._schedule_geoip_retry()
+        
+        files = self._scan_configs_dir()
+        if files == self._synced_files:
+            return
+        
+        seen = set()
+        for file_name, _, _ in files:
+            entry = self._catalog_entry(self.configs_dir / file_name)
+            seen.add(entry["name"])
+        
+        # Forget deleted configs
+        for name in set(self._catalog) - seen:
+            self._forget_config(name)
+        
+        self._synced_files = files
+    
+    def _schedule_geoip_retry(self) -> None:
+        """Retry Unknown countries in the background (GeoIP may block for seconds per provider)"""
+        self._geoip_retry_at = time.monotonic() + GEOIP_RETRY_INTERVAL
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._geoip_retry_task is None or self._geoip_retry_task.done():
+            self._geoip_retry_task = loop.create_task(self.retry_unknown_geoip())
+    
+    async def retry_unknown_geoip(self) -> List[str]:
+        """Look up Unknown countries again in a worker thread, returns the changed names"""
+        names = [name for name, record in self._catalog.copy().items()
+                 if record["entry"]["country"].get("code") == "??"]
+        if not names:
+            return []
+        changes = await asyncio.to_thread(self.collect_config_changes, names, True)
+        return self.apply_config_changes(changes)
+    
+    def _adopt_config(self, conf_file: Path) -> None:
+        """Apply the split-tunnel rewrite to a config dropped into the directory by another tool"""
+        content = conf_file.read_text()
+        parsed = parse_config(content)
+        errors = parsed.validate()
+        if errors:
+            print(f"Warning: {conf_file.name} is not a valid WireGuard config: {'; '.join(errors)}")
+            return
+        
+        rendered = self._modify_config_for_split_tunnel(parsed).render()
+        if rendered != content:
+            conf_file.write_text(rendered)
+            conf_file.chmod(0o600)
+    
+    def collect_config_changes(self, names: Optional[List[str]] = None, retry_unknown: bool = False) -> Dict:
+        """Read changed config files (blocking: file I/O and GeoIP), names=None checks the whole directory"""
+        if names is None:
+            names = [file_name[:-len(".conf")] for file_name, _, _ in self._scan_configs_dir()]
+            # dict.copy() is atomic, the event loop may update the catalog meanwhile
+            removed = set(self._catalog.copy()) - set(names)
+        else:
+            removed = set()
+        
+        updated = []
+        for name in sorted(set(names)):
+            conf_file = self.configs_dir / f"{name}.conf"
+            try:
+                self._adopt_config(conf_file)
+                record = self._read_catalog_entry(conf_file, retry_unknown)
+            except FileNotFoundError:
+                removed.add(name)
+                continue
+            except OSError as e:
+                print(f"Warning: could not read {conf_file}: {e}")
+                continue
+            if record is not None:
+                updated.append(record)
+        
+        return {"updated": updated, "removed": sorted(removed)}
+    
+    def apply_config_changes(self, changes: Dict) -> List[str]:
+        """Apply collected changes to the catalog and its indexes, returns the changed names"""
+        changed = []
+        for record in changes["updated"]:
+            name = record["entry"]["name"]
+            self._catalog[name] = record
+            self.index.update(record["entry"])
+            changed.append(name)
+        for name in changes["removed"]:
+            if name in self._catalog:
+                self._forget_config(name)
+                changed.append(name)
+        
+        if changed:
+            self._bump_version("configs")
+        return changed
     
+    def _present(self, name: str) -> Dict:
+        """Build the API representation of a catalog entry"""
+        entry = self.index.entries[name]
+        last_used = self.index.last_used.get(name)
+        return {
+            **entry,
+            "active": name == self.active_config,
+            "favorite": name in self.index.favorites,
+            "latency_ms": self.index.latency.get(name),
+            "last_used": datetime.fromtimestamp(last_used).isoformat() if last_used else None
+        }
+    
+    @traced("catalog.list")
     def list_configs(self) -> List[Dict]:
-        """List all available configs"""
-        configs = []
-        favorites = self.get_favorites()
+        """List all available configs (favorites first, then alphabetically)"""
+        self._sync_catalog()
+        return [self._present(name) for name in self.index.query()["names"]]
+    
+    def get_config(self, name: str) -> Optional[Dict]:
+        """Get one config by name without listing the catalog"""
+        self._sync_catalog()
+        if self.index.get(name) is None:
+            return None
+        return self._present(name)
+    
+    @traced("catalog.query")
+    def query_configs(
+        self,
+        country: Optional[str] = None,
+        continent: Optional[str] = None,
+        favorite: Optional[bool] = None,
+        sort: str = "name",
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """Filter, sort and paginate configs using the catalog indexes"""
+        self._sync_catalog()
+        result = self.index.query(
+            country=country, continent=continent, favorite=favorite,
+            sort=sort, offset=offset, limit=limit
+        )
+        return {
+            "configs": [self._present(name) for name in result["names"]],
+            "total": result["total"],
+            "offset": offset,
+            "limit": limit
+        }
+    
+    def record_latency(self, name: str, latency_ms: Optional[float]) -> None:
+        """Store the latest latency measured for a config"""
+        latency_ms = _index_latency(latency_ms)
+        # Probe jitter alone must not change the configs version (and the ETag clients poll with)
+        if self.index.latency.get(name) == latency_ms:
+            return
+        self.index.set_latency(name, latency_ms)
+        self._bump_version("configs")
+    
+    def _write_interface_config(self, interface: str, parsed: WireGuardConfig, table_off: bool = False) -> Path:
+        """Write a config to the WireGuard directory for the given interface"""
+        if table_off:
+            # Routes are managed by us, wg-quick must not install them
+            parsed.interface.table = "off"
         
-        for conf_file in sorted(self.configs_dir.glob("*.conf")):
-            name = conf_file.stem
-            stat = conf_file.stat()
-            content = conf_file.read_text()
-            
-            # Try to extract endpoint from config
-            endpoint_match = re.search(r'Endpoint\s*=\s*([^\s]+)', content)
-            endpoint = endpoint_match.group(1) if endpoint_match else "Unknown"
-            
-            # Get country from IP via GeoIP lookup
-            if endpoint != "Unknown":
-                country = lookup_geoip(endpoint)
-            else:
-                country = {"code": "??", "name": "Unknown", "flag": "🌍"}
+        wg_config_path = Path(f"/etc/wireguard/{interface}.conf")
+        wg_config_path.write_text(parsed.render())
+        wg_config_path.chmod(0o600)
+        return wg_config_path
+    
+    async def _pin_endpoint(self, parsed: WireGuardConfig) -> WireGuardConfig:
+        """Replace hostname Endpoints with their cached IP, so wg-quick never waits on DNS"""
+        for peer in parsed.peers:
+            if not peer.endpoint:
+                continue
+            host, port = split_endpoint(peer.endpoint)
+            if not _is_hostname(host):
+                continue
             
-            configs.append({
-                "name": name,
-                "endpoint": endpoint,
-                "country": country,
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "active": name == self.active_config,
-                "favorite": name in favorites
-            })
+            # Only hostnames never seen before need a (blocking) lookup
+            ip = get_cached_ip(host) or await asyncio.to_thread(_resolve_hostname, host)
+            if ip:
+                # Keep the hostname as metadata next to the pinned address
+                peer.endpoint_hostname = host
+                peer.endpoint = join_endpoint(ip, port)
+        
+        return parsed
+    
+    def _apply_path_mtu(self, parsed: WireGuardConfig, discover: bool = True) -> WireGuardConfig:
+        """Set MTU from the discovered path MTU to the (pinned) endpoint, never above the provider's MTU"""
+        if not self.path_mtu_discovery or not parsed.endpoint:
+            return parsed
+        host, _ = split_endpoint(parsed.endpoint)
+        mtu = self.tuner.tunnel_mtu(host)
+        if mtu:
+            # A lower provider MTU may account for their own encapsulation
+            parsed.interface.mtu = min(parsed.interface.mtu, mtu) if parsed.interface.mtu else mtu
+        elif discover:
+            # Don't hold up the switch, the next connect to this endpoint uses the result
+            self.tuner.discover_in_background(host)
+        return parsed
+    
+    async def discover_path_mtus(self) -> Dict[str, Optional[int]]:
+        """Discover the path MTU to every IP endpoint in the catalog"""
+        self._sync_catalog()
+        hosts = []
+        for record in list(self._catalog.values()):
+            endpoint = record["parsed"].endpoint
+            if endpoint:
+                host, _ = split_endpoint(endpoint)
+                # Hostnames are measured at the address wg-quick will use
+                if _is_hostname(host):
+                    host = get_cached_ip(host)
+                if host:
+                    hosts.append(host)
+        return await self.tuner.discover_all(hosts)
+    
+    async def refresh_endpoint_dns(self) -> int:
+        """Re-resolve hostname endpoints from the config catalog before they expire"""
+        if not _dns_cache:
+            _load_dns_cache()
+        
+        hostnames = set()
+        for cached in self._catalog.values():
+            for peer in cached["parsed"].peers:
+                try:
+                    host, _ = split_endpoint(peer.endpoint or "")
+                except ValueError:
+                    continue
+                if _is_hostname(host):
+                    hostnames.add(host)
         
-        # Sort: favorites first, then alphabetically
-        configs.sort(key=lambda x: (not x["favorite"], x["name"].lower()))
+        refreshed = 0
+        soon = time.time() + DNS_REFRESH_INTERVAL
+        for hostname in hostnames:
+            entry = _dns_cache.get(hostname)
+            if entry is None or entry["expires"] < soon:
+                await asyncio.to_thread(_resolve_hostname, hostname, True)
+                refreshed += 1
         
-        return configs
+        return refreshed
     
+    async def run_dns_refresh(self) -> None:
+        """Keep endpoint DNS entries fresh in the background"""
+        while True:
+            try:
+                await self.refresh_endpoint_dns()
+            except Exception as e:
+                print(f"DNS refresh failed: {e}")
+            await asyncio.sleep(DNS_REFRESH_INTERVAL)
+    
+    async def _interface_exists(self, interface: str) -> bool:
+        """Check if a WireGuard interface exists"""
+        return interface in await self._wg_dump(max_age=0)
+    
+    async def _log_connected(self, config_name: str, parsed: WireGuardConfig) -> None:
+        """Log a connection event with endpoint country"""
+        endpoint = parsed.endpoint or "Unknown"
+        # GeoIP may go out to the network, keep it off the event loop
+        country = await asyncio.to_thread(lookup_geoip, endpoint) if endpoint != "Unknown" else {"name": "Unknown"}
+        self._log_connection("connected", config_name, f"{country.get('name', 'Unknown')} ({endpoint})")
+    
+    @traced("wg.start")
     async def start(self, config_name: str) -> None:
         """Start WireGuard with a specific config"""
         config_path = self._get_config_path(config_name)
@@ -463,115 +1106,806 @@ class WireGuardManager:
             raise FileNotFoundError(f"Config not found: {config_name}")
         
         # Stop if already running
+        previous = self.active_config
         await self.stop()
         
         # Copy config to WireGuard directory with our interface name
-        wg_config_path = Path(f"/etc/wireguard/{self.interface_name}.conf")
-        wg_config_path.write_text(config_path.read_text())
-        wg_config_path.chmod(0o600)
+        parsed = self.get_parsed_config(config_name)
+        self._write_interface_config(self.interface_name, self._apply_path_mtu(await self._pin_endpoint(copy.deepcopy(parsed))))
         
-        # Start WireGuard
-        await self._run_command(["wg-quick", "up", self.interface_name])
+        # Start WireGuard, bringing the previous tunnel back if it fails
+        try:
+            await self._run_command(["wg-quick", "up", self.interface_name])
+        except CommandError:
+            await self._run_command(["wg-quick", "down", self.interface_name], check=False)
+            if previous and previous != config_name:
+                print(f"Starting {config_name} failed, restoring {previous}")
+                try:
+                    await self.start(previous)
+                except Exception as e:
+                    print(f"Failed to restore {previous}: {e}")
+            raise
         
         self.active_config = config_name
+        self.active_interface = self.interface_name
         
         # Log connection
-        content = config_path.read_text()
-        endpoint_match = re.search(r'Endpoint\s*=\s*([^\s]+)', content)
-        endpoint = endpoint_match.group(1) if endpoint_match else "Unknown"
-        country = lookup_geoip(endpoint) if endpoint != "Unknown" else {"name": "Unknown"}
-        self._log_connection("connected", config_name, f"{country.get('name', 'Unknown')} ({endpoint})")
+        await self._log_connected(config_name, parsed)
         
         # Refresh iptables rules
         await self.refresh_iptables()
+        await self._sync_flow_offload()
+        await self._sync_accounting()
     
+    @traced("wg.stop")
     async def stop(self) -> None:
         """Stop WireGuard"""
         was_active = self.active_config
         
-        try:
-            await self._run_command(
-                ["wg-quick", "down", self.interface_name],
-                check=False
-            )
-        except:
-            pass
+        for interface in (self.interface_name, self.staging_interface):
+            try:
+                await self._run_command(
+                    ["wg-quick", "down", interface],
+                    check=False
+                )
+                # Tunnel rules are added per interface on start and switch, don't leave them behind
+                await self._remove_vpn_rules(interface)
+            except:
+                pass
         
         # Log disconnection
         if was_active:
             self._log_connection("disconnected", was_active)
         
         self.active_config = None
+        self.active_interface = self.interface_name
+        await self._sync_flow_offload()
+        await self._sync_accounting()
     
     async def restart(self) -> None:
         """Restart WireGuard with current config"""
         if self.active_config:
             await self.start(self.active_config)
     
-    async def switch(self, config_name: str) -> None:
-        """Switch to a different config"""
-        await self.start(config_name)
+    @traced("wg.switch")
+    async def switch(self, config_name: str, mode: Optional[str] = None) -> Dict:
+        """Switch to a different config, returns a report with measured packet loss"""
+        config_path = self._get_config_path(config_name)
+        
+        if not config_path.exists():
+            raise FileNotFoundError(f"Config not found: {config_name}")
+        
+        mode = await self._resolve_switch_mode(mode)
+        
+        # Find problems before anything of the working tunnel is touched
+        report = await self.validate_config(config_name)
+        if not report["valid"]:
+            raise WireGuardConfigError(report["errors"])
+        
+        started = time.monotonic()
+        probe = await self._start_loss_probe()
+        
+        try:
+            if mode == SWITCH_MODE_MAKE_BEFORE_BREAK:
+                await self._switch_make_before_break(config_name)
+            else:
+                await self.start(config_name)
+        finally:
+            packet_loss = await self._stop_loss_probe(probe)
+        
+        return {
+            "mode": mode,
+            "interface": self.active_interface,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            "packet_loss": packet_loss
+        }
+    
+    async def _resolve_switch_mode(self, mode: Optional[str]) -> str:
+        """Requested switch mode, classic when there is no running tunnel to hand over from"""
+        mode = mode or self.switch_mode
+        if mode not in SWITCH_MODES:
+            raise ValueError(f"Unknown switch mode: {mode}")
+        
+        # Make-before-break needs a running tunnel to hand over from
+        if mode == SWITCH_MODE_MAKE_BEFORE_BREAK:
+            if not self.active_config or not await self._interface_exists(self.active_interface):
+                mode = SWITCH_MODE_CLASSIC
+        return mode
+    
+    # =========================================================================
+    # Config Validation
+    # =========================================================================
+    
+    async def _lan_networks(self) -> List:
+        """Networks of the LAN interface (link-local excluded)"""
+        result = await self.runner.run_shared(["ip", "-o", "addr", "show", "dev", self.lan_interface], max_age=LAN_ADDRESS_MAX_AGE)
+        networks = []
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            if len(fields) < 4 or fields[2] not in ("inet", "inet6"):
+                continue
+            try:
+                network = ipaddress.ip_interface(fields[3]).network
+            except ValueError:
+                continue
+            if not network.is_link_local:
+                networks.append(network)
+        return networks
+    
+    async def validate_config(self, config: Union[str, WireGuardConfig], strict: bool = True,
+                              probe: bool = False) -> Dict:
+        """Check a config (name or parsed) before it is used, without touching the running tunnel"""
+        # Endpoint resolution and route problems only block when strict (not at upload, DNS may be down).
+        # A missing ping reply never blocks, many endpoints filter ICMP
+        parsed = self.get_parsed_config(config) if isinstance(config, str) else config
+        checks = []
+        
+        def add(check: str, ok: bool, detail: str = "", blocking: bool = True) -> None:
+            checks.append({"check": check, "ok": ok, "detail": detail, "blocking": blocking})
+        
+        # 1. Keys, addresses, AllowedIPs and Endpoint syntax
+        errors = parsed.validate()
+        add("format", not errors, "; ".join(errors))
+        
+        # 2. Tunnel addresses and routed ranges must not cover the LAN
+        lan = await self._lan_networks()
+        ranges = self._tunnel_ranges(parsed)
+        conflicts = []
+        for address in parsed.interface.addresses:
+            try:
+                tunnel_network = ipaddress.ip_interface(address).network
+            except ValueError:
+                continue
+            conflicts += [f"Address {address} overlaps LAN {net}" for net in lan if tunnel_network.overlaps(net)]
+        for cidr in ranges:
+            routed = ipaddress.ip_network(cidr)
+            conflicts += [f"allowed range {cidr} overlaps LAN {net}" for net in lan if routed.overlaps(net)]
+        add("lan_conflict", not conflicts, "; ".join(conflicts))
+        
+        endpoint = parsed.endpoint
+        if not endpoint or errors:
+            add("endpoint", bool(endpoint), "" if endpoint else "No Endpoint")
+            return self._validation_report(checks)
+        
+        # 3. Endpoint resolvability (cached answers count, wg-quick is pinned to them)
+        host, _ = split_endpoint(endpoint)
+        ip = host
+        if _is_hostname(host):
+            ip = get_cached_ip(host) or await asyncio.to_thread(_resolve_hostname, host)
+            add("resolve", ip is not None, f"{host} -> {ip}" if ip else f"{host} does not resolve",
+                blocking=strict)
+        if not ip:
+            return self._validation_report(checks)
+        
+        # 4. The endpoint inside a tunneled range would route the tunnel through itself
+        address = ipaddress.ip_address(ip)
+        loops = [cidr for cidr in ranges if address in ipaddress.ip_network(cidr)]
+        add("routing_loop", not loops, f"Endpoint {ip} is inside {', '.join(loops)}" if loops else "")
+        
+        # 5. Reachability: a route to the endpoint, optionally an ICMP reply
+        result = await self._run_command(["ip", "route", "get", ip], check=False)
+        route = result.stdout.strip().splitlines()[0].strip() if result.returncode == 0 and result.stdout.strip() else result.stderr.strip()
+        add("route", result.returncode == 0, route, blocking=strict)
+        if probe:
+            result = await self._run_command(
+                ["ping", "-n", "-q", "-c", str(VALIDATE_PING_COUNT), "-W", "1", ip], check=False
+            )
+            match = re.search(r'= [\d.]+/([\d.]+)/', result.stdout)
+            add("ping", match is not None,
+                f"{ip} answered in {match.group(1)} ms" if match else f"{ip} did not answer (ICMP may be filtered)",
+                blocking=False)
+        
+        return self._validation_report(checks)
+    
+    @staticmethod
+    def _validation_report(checks: List[Dict]) -> Dict:
+        """Summarize validation checks into errors and warnings"""
+        failed = [check for check in checks if not check["ok"]]
+        return {
+            "valid": not any(check["blocking"] for check in failed),
+            "errors": [f"{check['check']}: {check['detail']}" for check in failed if check["blocking"]],
+            "warnings": [f"{check['check']}: {check['detail']}" for check in failed if not check["blocking"]],
+            "checks": checks
+        }
+    
+    async def dry_run(self, config_name: str, mode: Optional[str] = None) -> Dict:
+        """Validate a switch and render what it would apply, without changing anything"""
+        config_path = self._get_config_path(config_name)
+        if not config_path.exists():
+            raise FileNotFoundError(f"Config not found: {config_name}")
+        
+        mode = await self._resolve_switch_mode(mode)
+        parsed = self.get_parsed_config(config_name)
+        report = await self.validate_config(parsed, probe=True)
+        
+        rendered = self._apply_path_mtu(await self._pin_endpoint(copy.deepcopy(parsed)), discover=False)
+        ranges = self._tunnel_ranges(parsed)
+        steps = []
+        
+        def step(action: str, command: Optional[List[str]] = None, **extra) -> None:
+            steps.append({"action": action, **({"command": " ".join(command)} if command else {}), **extra})
+        
+        if mode == SWITCH_MODE_MAKE_BEFORE_BREAK:
+            old_interface = self.active_interface
+            interface = self.staging_interface if old_interface == self.interface_name else self.interface_name
+            rendered.interface.table = "off"
+            step("bring up new tunnel without routes", ["wg-quick", "up", interface], file=f"/etc/wireguard/{interface}.conf")
+            step(f"wait up to {HANDSHAKE_TIMEOUT}s for a handshake")
+            for command in self._vpn_rule_commands(interface, ranges):
+                step("add firewall rule", command)
+            for cidr in ranges:
+                step("move route", ["ip", f"-{_range_version(cidr)}", "route", "replace", cidr, "dev", interface])
+            step(f"drain old tunnel for {DRAIN_SECONDS}s")
+            step("remove firewall rules of the old tunnel", interface=old_interface)
+            step("take down old tunnel", ["wg-quick", "down", old_interface])
+        else:
+            interface = self.interface_name
+            for old_interface in (self.interface_name, self.staging_interface):
+                step("take down tunnel", ["wg-quick", "down", old_interface])
+            step("bring up tunnel", ["wg-quick", "up", interface], file=f"/etc/wireguard/{interface}.conf")
+            iptables_script = CONFIG_DIR / "iptables-rules.sh"
+            if iptables_script.exists():
+                step("apply gateway firewall script", ["bash", str(iptables_script)])
+            for command in self._vpn_rule_commands(interface, ranges):
+                step("add firewall rule", command)
+        
+        return {
+            "config": config_name,
+            "mode": mode,
+            "interface": interface,
+            "validation": report,
+            "rendered_config": rendered.render(redact=True),
+            "steps": steps,
+            "flow_offload_ruleset": self._flow_offload_ruleset(interface) if self.flow_offload else None
+        }
+    
+    # =========================================================================
+    # Make-Before-Break Switching
+    # =========================================================================
+    
+    async def _switch_make_before_break(self, config_name: str) -> None:
+        """Bring up the new peer next to the old one, then hand over routes and NAT"""
+        old_interface = self.active_interface
+        old_config = self.active_config
+        new_interface = self.staging_interface if old_interface == self.interface_name else self.interface_name
+        
+        # 1. Bring up the new peer on the free interface without routes
+        parsed = self.get_parsed_config(config_name)
+        await self._run_command(["wg-quick", "down", new_interface], check=False)
+        self._write_interface_config(new_interface, self._apply_path_mtu(await self._pin_endpoint(copy.deepcopy(parsed))), table_off=True)
+        await self._run_command(["wg-quick", "up", new_interface])
+        
+        # 2. Verify the handshake before touching the working tunnel
+        if not await self._wait_for_handshake(new_interface):
+            await self._run_command(["wg-quick", "down", new_interface], check=False)
+            raise RuntimeError(f"No handshake on {new_interface} within {HANDSHAKE_TIMEOUT}s, kept {old_config}")
+        
+        # 3. Move NAT and forwarding first, then the routes (ip route replace is atomic)
+        ranges = self._tunnel_ranges(parsed)
+        try:
+            await self._apply_vpn_rules(new_interface, ranges)
+            for cidr in ranges:
+                await self._run_command(["ip", f"-{_range_version(cidr)}", "route", "replace", cidr, "dev", new_interface])
+        except Exception:
+            await self._rollback_handover(old_interface, old_config, new_interface, ranges)
+            raise
+        
+        self.active_interface = new_interface
+        self.active_config = config_name
+        if old_config:
+            self._log_connection("disconnected", old_config)
+        await self._log_connected(config_name, parsed)
+        
+        # 4. Let in-flight packets on the old tunnel drain, then remove it
+        await asyncio.sleep(DRAIN_SECONDS)
+        await self._remove_vpn_rules(old_interface)
+        await self._run_command(["wg-quick", "down", old_interface], check=False)
+        await self._sync_flow_offload()
+        await self._sync_accounting()
+    
+    async def _rollback_handover(self, old_interface: Optional[str], old_config: Optional[str],
+                                 new_interface: str, ranges: List[str]) -> None:
+        """Give the routes back to the old tunnel and tear down the new one after a failed handover"""
+        old_ranges = []
+        if old_config:
+            try:
+                old_ranges = self._tunnel_ranges(self.get_parsed_config(old_config))
+            except Exception as e:
+                print(f"Rollback: could not read {old_config}: {e}")
+        
+        for cidr in old_ranges:
+            await self._run_command(["ip", f"-{_range_version(cidr)}", "route", "replace", cidr, "dev", old_interface], check=False)
+        for cidr in ranges:
+            if cidr not in old_ranges:
+                await self._run_command(["ip", f"-{_range_version(cidr)}", "route", "del", cidr, "dev", new_interface], check=False)
+        await self._remove_vpn_rules(new_interface)
+        await self._run_command(["wg-quick", "down", new_interface], check=False)
+    
+    async def _get_latest_handshakes(self, interface: str) -> Dict[str, int]:
+        """Get latest handshake timestamps per peer"""
+        dump = await self._wg_dump(max_age=0)
+        peers = dump.get(interface, {}).get("peers", [])
+        return {peer["public_key"]: peer["latest_handshake"] for peer in peers}
+    
+    async def _wait_for_handshake(self, interface: str) -> bool:
+        """Trigger and wait for a handshake on the interface"""
+        probe_host = self._get_probe_host()
+        deadline = time.monotonic() + HANDSHAKE_TIMEOUT
+        
+        while time.monotonic() < deadline:
+            handshakes = await self._get_latest_handshakes(interface)
+            if any(ts > 0 for ts in handshakes.values()):
+                return True
+            # Outgoing traffic on the interface makes WireGuard initiate a handshake
+            if probe_host:
+                await self._run_command(
+                    ["ping", "-n", "-c", "1", "-W", "1", "-I", interface, probe_host],
+                    check=False
+                )
+            else:
+                await asyncio.sleep(0.5)
+        
+        return False
+    
+    def _vpn_rule_commands(self, interface: str, ranges: List[str], versions: tuple = (4, 6)) -> List[List[str]]:
+        """NAT and forwarding rules for a tunnel interface (iptables for IPv4, ip6tables for IPv6)"""
+        comment = ["-m", "comment", "--comment", f"lobbyshift-vpn-{interface}"]
+        commands = []
+        for version, program in ((4, "iptables"), (6, "ip6tables")):
+            family_ranges = [cidr for cidr in ranges if _range_version(cidr) == version]
+            if version not in versions or not family_ranges:
+                continue
+            commands.append([program, "-t", "nat", "-I", "POSTROUTING", "-o", interface, "-j", "MASQUERADE"] + comment)
+            for cidr in family_ranges:
+                commands.append([program, "-I", "FORWARD", "-o", interface, "-d", cidr, "-j", "ACCEPT"] + comment)
+            commands.append([program, "-I", "FORWARD", "-i", interface, "-m", "state", "--state", "RELATED,ESTABLISHED", "-j", "ACCEPT"] + comment)
+        return commands
+    
+    async def _apply_vpn_rules(self, interface: str, ranges: Optional[List[str]] = None,
+                               versions: tuple = (4, 6)) -> None:
+        """Add NAT and forwarding rules for a tunnel interface"""
+        if ranges is None:
+            ranges = self._tunnel_ranges(self.get_parsed_config(self.active_config)) if self.active_config else []
+        for command in self._vpn_rule_commands(interface, ranges, versions):
+            await self._run_command(command)
+    
+    async def _remove_vpn_rules(self, interface: str, programs: tuple = ("iptables", "ip6tables")) -> None:
+        """Remove rules added by _apply_vpn_rules or the iptables script for an interface"""
+        for program in programs:
+            for table in ("nat", "filter"):
+                result = await self._run_command([program, "-t", table, "-S"], check=False)
+                for rule in result.stdout.splitlines():
+                    if not rule.startswith("-A ") or "lobbyshift" not in rule:
+                        continue
+                    if f"-o {interface} " not in rule and f"-i {interface} " not in rule:
+                        continue
+                    await self._run_command([program, "-t", table, "-D"] + shlex.split(rule)[1:], check=False)
+    
+    # =========================================================================
+    # Flow Offload
+    # =========================================================================
+    
+    def _flow_offload_ruleset(self, interface: str) -> str:
+        """nftables ruleset offloading established flows between the LAN interface and a tunnel"""
+        table = self.flow_offload_table
+        lan = self.lan_interface
+        # Declaring the table first makes the delete safe, the file is applied as one transaction
+        return f"""table inet {table}
+delete table inet {table}
+table inet {table} {{
+    flowtable ft {{
+        hook ingress priority 0
+        devices = {{ "{lan}", "{interface}" }}
+        counter
+    }}
+    chain forward {{
+        type filter hook forward priority 0; policy accept;
+        iifname "{lan}" oifname "{interface}" ct state established meta l4proto {{ tcp, udp }} flow add @ft
+        iifname "{interface}" oifname "{lan}" ct state established meta l4proto {{ tcp, udp }} flow add @ft
+    }}
+}}
+"""
+    
+    async def _sync_flow_offload(self) -> None:
+        """Point the flowtable at the active tunnel, or remove it when no tunnel is up"""
+        if not self.flow_offload:
+            return
+        
+        # Flowtables lose devices that go down, so this runs after every interface change
+        interface = self.active_interface if self.active_config else None
+        try:
+            if interface:
+                _flow_offload_file.write_text(self._flow_offload_ruleset(interface))
+                await self._run_command(["nft", "-f", str(_flow_offload_file)])
+            else:
+                await self._run_command(["nft", "delete", "table", "inet", self.flow_offload_table], check=False)
+            self._offloaded_interface = interface
+            self._flow_offload_error = None
+        except Exception as e:
+            self._offloaded_interface = None
+            self._flow_offload_error = str(e)
+            print(f"Flow offload failed: {e}")
+    
+    async def _sync_accounting(self) -> None:
+        """Count per-client traffic for the ranges of the active tunnel, stop when no tunnel is up"""
+        if self.accounting is None:
+            return
+        ranges = self._tunnel_ranges(self.get_parsed_config(self.active_config)) if self.active_config else None
+        await self.accounting.sync(ranges)
+    
+    async def get_flow_offload_status(self) -> Dict:
+        """Flowtable state and the number of flows currently on the fast path"""
+        status = {
+            "enabled": self.flow_offload,
+            "interface": self._offloaded_interface,
+            "offloaded_flows": None,
+            "error": self._flow_offload_error
+        }
+        if not self.flow_offload or not self._offloaded_interface:
+            return status
+        
+        # conntrack lists one family at a time, the flowtable (inet) carries both
+        for family in ("ipv4", "ipv6"):
+            result = await self.runner.run_shared(["conntrack", "-L", "-f", family], max_age=FLOW_COUNT_MAX_AGE)
+            if result.returncode != 0:
+                continue
+            status["offloaded_flows"] = (status["offloaded_flows"] or 0) + sum(
+                1 for line in result.stdout.splitlines() if "[OFFLOAD]" in line or "[HW_OFFLOAD]" in line
+            )
+        return status
+    
+    # =========================================================================
+    # Switch Packet Loss Measurement
+    # =========================================================================
+    
+    def _get_probe_host(self) -> Optional[str]:
+        """Get the host probed during switches (default: first host of the first allowed range)"""
+        if self.probe_host:
+            return self.probe_host
+        for cidr in self.allowed_ips:
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+                return str(next(network.hosts(), network.network_address))
+            except ValueError:
+                continue
+        return None
+    
+    async def _start_loss_probe(self) -> Optional[asyncio.subprocess.Process]:
+        """Start a ping probe that runs for the duration of a switch"""
+        probe_host = self._get_probe_host()
+        if not probe_host:
+            return None
+        
+        try:
+            return await asyncio.create_subprocess_exec(
+                "ping", "-n", "-i", "0.1", "-W", "1", probe_host,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except:
+            return None
+    
+    async def _stop_loss_probe(self, process: Optional[asyncio.subprocess.Process]) -> Dict:
+        """Stop the ping probe and return its packet loss statistics"""
+        packet_loss = {"host": self._get_probe_host(), "sent": 0, "received": 0, "loss_pct": None}
+        if process is None:
+            return packet_loss
+        
+        try:
+            # SIGINT makes ping print its summary
+            process.send_signal(signal.SIGINT)
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=3)
+        except:
+            process.kill()
+            # Reap the killed ping so it doesn't linger as a zombie
+            await process.wait()
+            return packet_loss
+        
+        match = re.search(r'(\d+) packets transmitted, (\d+) received', stdout.decode())
+        if match:
+            sent, received = int(match.group(1)), int(match.group(2))
+            packet_loss["sent"] = sent
+            packet_loss["received"] = received
+            # No replies at all means the probe host doesn't answer, not 100% loss
+            if sent and received:
+                packet_loss["loss_pct"] = round((sent - received) * 100 / sent, 1)
+        
+        return packet_loss
+    
+    # =========================================================================
+    # Matchmaking RTT Probes
+    # =========================================================================
+    
+    def _get_probe_targets(self) -> List[str]:
+        """Sample addresses inside the matchmaking ranges to probe through the tunnel"""
+        if self.probe_targets:
+            return list(self.probe_targets)
+        
+        targets = []
+        for cidr in self.allowed_ips:
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                continue
+            # First host and one from the middle of the range
+            candidates = [network.network_address + 1, network.network_address + network.num_addresses // 2 + 1]
+            for address in candidates[:PROBE_SAMPLES_PER_RANGE]:
+                if address in network and address != network.broadcast_address and str(address) not in targets:
+                    targets.append(str(address))
+        
+        probe_host = self._get_probe_host()
+        if probe_host and probe_host not in targets:
+            targets.insert(0, probe_host)
+        return targets
+    
+    async def _ping_rtt(self, host: str, interface: str) -> Optional[float]:
+        """Average RTT to a host through an interface, None if it didn't answer"""
+        result = await self._run_command(
+            ["ping", "-n", "-q", "-c", str(PROBE_COUNT), "-i", "0.2", "-W", "1", "-I", interface, host],
+            check=False
+        )
+        match = re.search(r'= [\d.]+/([\d.]+)/', result.stdout)
+        return float(match.group(1)) if match else None
+    
+    async def probe_matchmaking_rtt(self) -> Optional[Dict]:
+        """Measure RTT from the exit server to the matchmaking ranges for the active tunnel"""
+        config_name = self.active_config
+        interface = self.active_interface
+        if not config_name or not await self._interface_exists(interface):
+            return None
+        
+        targets = self._get_probe_targets()
+        rtts = await asyncio.gather(*(self._ping_rtt(host, interface) for host in targets))
+        answered = [rtt for rtt in rtts if rtt is not None]
+        
+        record = {
+            "rtt_ms": round(statistics.median(answered), 1) if answered else None,
+            "targets": dict(zip(targets, rtts)),
+            "interface": interface,
+            "measured_at": datetime.now().isoformat()
+        }
+        
+        # The tunnel may have been switched while probing
+        if self.active_config != config_name:
+            return None
+        
+        self._latency[config_name] = record
+        self._save_latency()
+        self.record_latency(config_name, record["rtt_ms"])
+        return record
+    
+    async def run_latency_probes(self, interval: int = PROBE_INTERVAL) -> None:
+        """Probe matchmaking RTT in the background"""
+        while True:
+            try:
+                await self.probe_matchmaking_rtt()
+            except Exception as e:
+                print(f"Latency probe failed: {e}")
+            await asyncio.sleep(interval)
+    
+    def get_latency(self, name: Optional[str] = None):
+        """Get matchmaking RTT results for one or all configs"""
+        if name is not None:
+            return self._latency.get(name)
+        return dict(self._latency)
+    
+    def _load_latency(self) -> Dict[str, Dict]:
+        """Load stored latency results"""
+        try:
+            if _latency_file.exists():
+                return json.loads(_latency_file.read_text())
+        except:
+            pass
+        return {}
+    
+    def _save_latency(self) -> None:
+        """Save latency results"""
+        try:
+            _latency_file.parent.mkdir(parents=True, exist_ok=True)
+            _latency_file.write_text(json.dumps(self._latency))
+        except:
+            pass
+    
+    # =========================================================================
+    # Traffic Rate
+    # =========================================================================
+    
+    def _read_counters(self, interface: str) -> Optional[tuple]:
+        """Read byte and packet counters of an interface from sysfs"""
+        stats = Path(f"/sys/class/net/{interface}/statistics")
+        try:
+            return tuple(
+                int((stats / name).read_text())
+                for name in ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets")
+            )
+        except (OSError, ValueError):
+            return None
+    
+    async def _count_game_flows(self) -> Optional[int]:
+        """Count conntrack UDP flows toward the matchmaking ranges (None if conntrack is unavailable)"""
+        flows = 0
+        for cidr in self.allowed_ips:
+            family = "ipv6" if _range_version(cidr) == 6 else "ipv4"
+            try:
+                result = await self._run_command(["conntrack", "-L", "-f", family, "-p", "udp", "-d", cidr], check=False)
+            except OSError:
+                return None
+            if result.returncode != 0:
+                return None
+            flows += sum(1 for line in result.stdout.splitlines() if line.startswith("udp"))
+        return flows
+    
+    @traced("wg.traffic")
+    async def get_traffic_rate(self) -> Dict:
+        """Current tunnel throughput and packet rate from counter deltas"""
+        rate = {
+            "rx_bps": 0, "tx_bps": 0, "pps": 0, "flows": None, "busy": False,
+            "threshold": self.busy_threshold, "pps_threshold": self.busy_pps
+        }
+        interface = self.active_interface
+        if not self.active_config:
+            return rate
+        
+        previous = self._traffic_sample
+        if previous is None or previous[1] != interface or time.monotonic() - previous[0] > TRAFFIC_SAMPLE_MAX_AGE:
+            # No usable sample yet, take one and measure over a second
+            counters = self._read_counters(interface)
+            if counters is None:
+                return rate
+            previous = (time.monotonic(), interface) + counters
+            await asyncio.sleep(1)
+        
+        counters = self._read_counters(interface)
+        if counters is None:
+            return rate
+        now = time.monotonic()
+        self._traffic_sample = (now, interface) + counters
+        
+        elapsed = max(now - previous[0], 0.001)
+        rx_bytes, tx_bytes, rx_packets, tx_packets = (
+            max(current - old, 0) for current, old in zip(counters, previous[2:])
+        )
+        rate["rx_bps"] = int(rx_bytes / elapsed)
+        rate["tx_bps"] = int(tx_bytes / elapsed)
+        rate["pps"] = int((rx_packets + tx_packets) / elapsed)
+        rate["busy"] = rate["rx_bps"] + rate["tx_bps"] > self.busy_threshold or rate["pps"] > self.busy_pps
+        
+        # Only ask conntrack when the counters alone don't decide it
+        if not rate["busy"] and self.busy_flows:
+            rate["flows"] = await self._count_game_flows()
+            rate["busy"] = rate["flows"] is not None and rate["flows"] >= self.busy_flows
+        
+        return rate
     
+    # =========================================================================
+    # Deferred Switching
+    # =========================================================================
+    
+    async def request_switch(self, config_name: str, when_idle: bool = False, source: str = "ui",
+                             mode: Optional[str] = None) -> Dict:
+        """Switch now, or queue the switch until the tunnel is idle"""
+        if not self._get_config_path(config_name).exists():
+            raise FileNotFoundError(f"Config not found: {config_name}")
+        if mode is not None and mode not in SWITCH_MODES:
+            raise ValueError(f"Unknown switch mode: {mode}")
+        
+        if when_idle:
+            traffic = await self.get_traffic_rate()
+            if traffic["busy"]:
+                # Only the latest request is kept
+                self.pending_switch = {
+                    "config": config_name,
+                    "mode": mode,
+                    "source": source,
+                    "requested_at": datetime.now().isoformat(),
+                    "traffic": traffic
+                }
+                return {"queued": True, "pending": self.pending_switch}
+        
+        # An explicit switch supersedes whatever was waiting
+        self.pending_switch = None
+        return {"queued": False, "switch": await self.switch(config_name, mode=mode)}
+    
+    def cancel_pending_switch(self) -> Optional[Dict]:
+        """Drop the queued switch"""
+        pending, self.pending_switch = self.pending_switch, None
+        return pending
+    
+    async def run_switch_guard(self, interval: int = SWITCH_GUARD_INTERVAL) -> None:
+        """Execute the queued switch once tunnel traffic drops below the thresholds"""
+        while True:
+            await asyncio.sleep(interval)
+            pending = self.pending_switch
+            if not pending:
+                continue
+            try:
+                traffic = await self.get_traffic_rate()
+            except Exception as e:
+                print(f"Switch guard failed to read traffic: {e}")
+                continue
+            if traffic["busy"] or self.pending_switch is not pending:
+                pending["traffic"] = traffic
+                continue
+            
+            self.pending_switch = None
+            result = {**pending, "executed_at": datetime.now().isoformat()}
+            try:
+                result["switch"] = await self.switch(pending["config"], mode=pending.get("mode"))
+            except Exception as e:
+                # Keep the outcome visible to whoever queued the switch
+                result["error"] = str(e)
+            self.last_deferred_switch = result
+            for listener in self.deferred_switch_listeners:
+                listener(result)
+    
+    @traced("wg.status")
     async def get_status(self) -> Dict:
         """Get current WireGuard status"""
         status = {
             "active": False,
             "config": None,
-            "interface": self.interface_name,
+            "interface": self.active_interface,
             "peer": None,
             "endpoint": None,
             "latest_handshake": None,
             "transfer_rx": 0,
-            "transfer_tx": 0
+            "transfer_tx": 0,
+            "pending_switch": self.pending_switch,
+            "last_deferred_switch": self.last_deferred_switch
         }
         
-        # Check if interface exists
+        # One shared `wg show all dump` serves every concurrent status request
         try:
-            result = await self._run_command(
-                ["wg", "show", self.interface_name],
-                check=False
-            )
+            interface = (await self._wg_dump()).get(self.active_interface)
             
-            if result.returncode == 0:
+            if interface is not None:
                 status["active"] = True
                 status["config"] = self.active_config
                 
-                output = result.stdout
-                
-                # Parse wg show output
-                peer_match = re.search(r'peer:\s*(\S+)', output)
-                if peer_match:
-                    status["peer"] = peer_match.group(1)[:16] + "..."
-                
-                endpoint_match = re.search(r'endpoint:\s*(\S+)', output)
-                if endpoint_match:
-                    status["endpoint"] = endpoint_match.group(1)
-                
-                handshake_match = re.search(r'latest handshake:\s*(.+)', output)
-                if handshake_match:
-                    status["latest_handshake"] = handshake_match.group(1)
-                
-                transfer_match = re.search(r'transfer:\s*([\d.]+\s*\w+)\s*received,\s*([\d.]+\s*\w+)\s*sent', output)
-                if transfer_match:
-                    status["transfer_rx"] = transfer_match.group(1)
-                    status["transfer_tx"] = transfer_match.group(2)
+                if interface["peers"]:
+                    peer = interface["peers"][0]
+                    status["peer"] = peer["public_key"][:16] + "..."
+                    status["endpoint"] = peer["endpoint"]
+                    if peer["latest_handshake"]:
+                        status["latest_handshake"] = _format_ago(int(time.time()) - peer["latest_handshake"])
+                    if peer["transfer_rx"] or peer["transfer_tx"]:
+                        status["transfer_rx"] = _format_bytes(peer["transfer_rx"])
+                        status["transfer_tx"] = _format_bytes(peer["transfer_tx"])
+            
+            if self.flow_offload:
+                status["flow_offload"] = await self.get_flow_offload_status()
+            
+            if self.accounting is not None:
+                clients = self.accounting.get_clients()["clients"]
+                status["clients"] = {
+                    "active": sum(1 for client in clients if client["rx_bps"] or client["tx_bps"]),
+                    "top": clients[:CLIENTS_IN_STATUS]
+                }
         
         except Exception as e:
             status["error"] = str(e)
         
         return status
     
+    @traced("iptables.refresh")
     async def refresh_iptables(self) -> None:
-        """Refresh iptables rules for the VPN"""
-        iptables_script = Path("/etc/lobbyshift/iptables-rules.sh")
+        """Refresh the gateway rules (iptables script) and the tunnel rules for the active interface"""
+        iptables_script = CONFIG_DIR / "iptables-rules.sh"
         
         if iptables_script.exists():
             await self._run_command(["bash", str(iptables_script)])
+        
+        # Tunnel rules always come from allowed_ips: the script may be missing (extra instances),
+        # or an older one with a hardcoded interface and range
+        if self.active_config:
+            await self._remove_vpn_rules(self.active_interface)
+            await self._apply_vpn_rules(self.active_interface)
     
     # =========================================================================
     # Favorites Management
     # =========================================================================
     
+    @traced("file.favorites.read")
     def get_favorites(self) -> List[str]:
         """Get list of favorite config names"""
         try:
@@ -588,6 +1922,7 @@ class WireGuardManager:
             favorites.append(name)
             _favorites_file.parent.mkdir(parents=True, exist_ok=True)
             _favorites_file.write_text(json.dumps(favorites))
+            self._bump_version("favorites")
     
     def remove_favorite(self, name: str) -> None:
         """Remove a config from favorites"""
@@ -595,6 +1930,7 @@ class WireGuardManager:
         if name in favorites:
             favorites.remove(name)
             _favorites_file.write_text(json.dumps(favorites))
+            self._bump_version("favorites")
     
     def is_favorite(self, name: str) -> bool:
         """Check if a config is a favorite"""
@@ -604,40 +1940,178 @@ class WireGuardManager:
     # Connection Logging
     # =========================================================================
     
+    def _migrate_legacy_logs(self) -> None:
+        """Convert the old newest-first JSON log into the append-only format"""
+        if not _legacy_logs_file.exists() or _logs_file.exists():
+            return
+        try:
+            logs = json.loads(_legacy_logs_file.read_text())
+            with open(_logs_file, "w") as f:
+                for log_id, log in enumerate(reversed(logs), 1):
+                    f.write(json.dumps({"id": log_id, **log}) + "\n")
+            _legacy_logs_file.unlink()
+        except:
+            pass
+    
+    @traced("file.logs.append")
     def _log_connection(self, action: str, config_name: str = None, details: str = None) -> None:
         """Log a connection event"""
-        logs = self.get_connection_logs()
-        
         log_entry = {
+            "id": self._next_log_id,
             "timestamp": datetime.now().isoformat(),
             "action": action,
             "config": config_name,
             "details": details
         }
+        self._next_log_id += 1
+        if action == "connected" and config_name:
+            self.index.set_last_used(config_name, log_entry["timestamp"])
+        self._bump_version("logs")
         
-        logs.insert(0, log_entry)  # Newest first
-        
-        # Keep only last 100 entries
-        logs = logs[:100]
-        
+        # Appending keeps logging O(1), retention trims the file in the background
         try:
             _logs_file.parent.mkdir(parents=True, exist_ok=True)
-            _logs_file.write_text(json.dumps(logs, indent=2))
+            with self._logs_lock, open(_logs_file, "a") as f:
+                f.write(json.dumps(log_entry) + "\n")
         except:
             pass
     
-    def get_connection_logs(self) -> List[Dict]:
-        """Get connection history"""
+    def iter_connection_logs(self):
+        """Iterate over connection logs, oldest first, without loading the whole file"""
         try:
-            if _logs_file.exists():
-                return json.loads(_logs_file.read_text())
-        except:
-            pass
-        return []
+            with open(_logs_file) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            return
     
-    def clear_connection_logs(self) -> None:
-        """Clear all connection logs"""
+    def _iter_logs_reversed(self):
+        """Iterate over connection logs, newest first, reading the file backwards in chunks"""
         try:
-            _logs_file.write_text("[]")
+            f = open(_logs_file, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b""
+            while position > 0:
+                size = min(_LOG_READ_CHUNK, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b"\n")
+                # The first piece may be a partial line, keep it for the next chunk
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            if remainder.strip():
+                try:
+                    yield json.loads(remainder)
+                except ValueError:
+                    pass
+    
+    @traced("file.logs.read")
+    def get_connection_logs(self, limit: Optional[int] = LOG_PAGE_SIZE, before: Optional[int] = None) -> List[Dict]:
+        """Get connection history, newest first (before: only entries with a smaller id)"""
+        logs = []
+        for log in self._iter_logs_reversed():
+            if before is not None and log.get("id", 0) >= before:
+                continue
+            logs.append(log)
+            if limit is not None and len(logs) >= limit:
+                break
+        return logs
+    
+    def get_logs_page(self, limit: int = LOG_PAGE_SIZE, before: Optional[int] = None) -> Dict:
+        """Get a page of connection logs with the cursor for the next (older) page"""
+        # One extra entry tells whether there is another page
+        logs = self.get_connection_logs(limit=limit + 1, before=before)
+        has_more = len(logs) > limit
+        logs = logs[:limit]
+        return {
+            "logs": logs,
+            "next_cursor": logs[-1]["id"] if has_more and logs else None
+        }
+    
+    def clear_connection_logs(self, older_than_days: Optional[int] = None, keep_last: Optional[int] = None) -> int:
+        """Clear connection logs, all of them or by retention policy; returns the number removed (blocking)"""
+        if older_than_days is None and keep_last is None:
+            with self._logs_lock:
+                removed = sum(1 for _ in self.iter_connection_logs())
+                try:
+                    _logs_file.write_text("")
+                except:
+                    pass
+            return removed
+        
+        # Trim a snapshot of the file, entries appended meanwhile are carried over below
+        try:
+            with open(_logs_file, "rb") as f:
+                snapshot = f.read()
+        except OSError:
+            return 0
+        
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat() if older_than_days is not None else None
+        kept = deque(maxlen=keep_last) if keep_last is not None else deque()
+        total = 0
+        # Only complete lines, a partial last line belongs to an append in progress
+        complete = snapshot[:snapshot.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                log = json.loads(line)
+            except ValueError:
+                continue
+            total += 1
+            if cutoff is None or log.get("timestamp", "") >= cutoff:
+                kept.append(log)
+        
+        if len(kept) == total:
+            return 0
+        
+        # Write to a temporary file and swap, so readers never see a partial log
+        tmp_file = _logs_file.with_suffix(".tmp")
+        try:
+            with open(tmp_file, "w") as f:
+                for log in kept:
+                    f.write(json.dumps(log) + "\n")
+            with self._logs_lock:
+                with open(_logs_file, "rb") as f:
+                    f.seek(len(complete))
+                    appended = f.read()
+                with open(tmp_file, "ab") as f:
+                    f.write(appended)
+                os.replace(tmp_file, _logs_file)
         except:
-            pass
+            return 0
+        return total - len(kept)
+    
+    async def trim_connection_logs(self, older_than_days: Optional[int] = None, keep_last: Optional[int] = None) -> int:
+        """Clear or trim connection logs in a worker thread; returns the number removed"""
+        removed = await asyncio.to_thread(self.clear_connection_logs, older_than_days, keep_last)
+        if removed:
+            self._bump_version("logs")
+        return removed
+    
+    async def run_log_retention(
+        self,
+        days: int = LOG_RETENTION_DAYS,
+        max_entries: int = LOG_RETENTION_ENTRIES,
+        interval: int = LOG_RETENTION_INTERVAL
+    ) -> None:
+        """Enforce log retention in the background"""
+        while True:
+            try:
+                await self.trim_connection_logs(
+                    days if days > 0 else None,
+                    max_entries if max_entries > 0 else None
+                )
+            except Exception as e:
+                print(f"Log retention failed: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,1305 @@
+let currentEditConfig = null;
+let currentRegionTimezone = null;
+let allConfigs = [];
+let configNames = {};
+let currentLang = localStorage.getItem('lobbyshift_lang') || 'en';
+
+// Translations
+const translations = {
+    en: {
+        tagline: "Tactical Matchmaking Control",
+        systemStatus: "System Status",
+        online: "Online",
+        offline: "Offline",
+        activeConfig: "Active Config",
+        endpoint: "Endpoint",
+        lastHandshake: "Last Handshake",
+        transfer: "Transfer",
+        deployVpn: "Deploy VPN",
+        disconnect: "Disconnect",
+        refresh: "Refresh",
+        vpnRegions: "VPN Regions",
+        noActiveRegion: "No active region",
+        noRegions: "No regions deployed. Upload a WireGuard config to begin.",
+        deployNewRegion: "Deploy New Region",
+        dropConfig: "Drop WireGuard config here",
+        refreshFlags: "Refresh Flags",
+        switchWhenIdle: "Switch when idle (don't interrupt a match)",
+        switchQueued: "Switch queued until the match ends",
+        queuedSwitchFailed: "Queued switch failed",
+        offloadedFlows: "fast-path flows",
+        activeClients: "active clients",
+        operationLog: "Operation Log",
+        noLogs: "No operations logged",
+        loadOlderLogs: "Load older",
+        settings: "Settings",
+        autostartConfig: "Autostart Configuration",
+        autostartDisabled: "Autostart Disabled",
+        enable: "Enable",
+        region: "Region",
+        selectConfig: "-- Select Config --",
+        autostartInfo: "When enabled, LobbyShift will automatically connect to the selected VPN region when the server starts or reboots.",
+        saveSettings: "Save Settings",
+        customNames: "Custom Region Names",
+        customNamesDesc: "Give your VPN configs friendly names (e.g. \"Bot Lobbies\" instead of \"mx-free-47\")",
+        enterCustomName: "Enter custom name...",
+        saveNames: "Save Names",
+        clearAll: "Clear All",
+        consoleConfig: "Console Configuration",
+        consoleConfigDesc: "Set your PS5/Xbox network gateway to this server:",
+        gateway: "Gateway",
+        dns: "DNS",
+        orRouterIp: "or your router IP",
+        deploy: "Deploy",
+        active: "Active",
+        edit: "Edit",
+        delete: "Delete",
+        editConfig: "Edit Config",
+        save: "Save",
+        cancel: "Cancel",
+        missionUpdated: "Mission Updated",
+        regionDeployed: "Region deployed successfully!",
+        restartGame: "Restart your game to apply new matchmaking region.",
+        newLobbies: "New lobbies will use the updated location.",
+        rogerThat: "Roger That",
+        localTime: "Local Time",
+        info: "Info",
+        deployedTo: "Deployed to",
+        disconnectedFrom: "Disconnected from"
+    },
+    de: {
+        tagline: "Taktische Matchmaking-Steuerung",
+        systemStatus: "Systemstatus",
+        online: "Online",
+        offline: "Offline",
+        activeConfig: "Aktive Konfiguration",
+        endpoint: "Endpunkt",
+        lastHandshake: "Letzter Handshake",
+        transfer: "Übertragung",
+        deployVpn: "VPN Starten",
+        disconnect: "Trennen",
+        refresh: "Aktualisieren",
+        vpnRegions: "VPN Regionen",
+        noActiveRegion: "Keine aktive Region",
+        noRegions: "Keine Regionen vorhanden. Lade eine WireGuard-Konfiguration hoch.",
+        deployNewRegion: "Neue Region hinzufügen",
+        dropConfig: "WireGuard-Konfiguration hier ablegen",
+        refreshFlags: "Flaggen aktualisieren",
+        switchWhenIdle: "Wechseln wenn frei (kein laufendes Match unterbrechen)",
+        switchQueued: "Wechsel nach Matchende geplant",
+        queuedSwitchFailed: "Geplanter Wechsel fehlgeschlagen",
+        offloadedFlows: "Fast-Path-Flows",
+        activeClients: "aktive Clients",
+        operationLog: "Verbindungsprotokoll",
+        noLogs: "Keine Einträge vorhanden",
+        loadOlderLogs: "Ältere laden",
+        settings: "Einstellungen",
+        autostartConfig: "Autostart-Konfiguration",
+        autostartDisabled: "Autostart deaktiviert",
+        enable: "Aktivieren",
+        region: "Region",
+        selectConfig: "-- Konfiguration wählen --",
+        autostartInfo: "Wenn aktiviert, verbindet sich LobbyShift automatisch mit der gewählten VPN-Region beim Serverstart.",
+        saveSettings: "Einstellungen speichern",
+        customNames: "Benutzerdefinierte Namen",
+        customNamesDesc: "Gib deinen VPN-Konfigurationen eigene Namen (z.B. \"Bot Lobbies\" statt \"mx-free-47\")",
+        enterCustomName: "Namen eingeben...",
+        saveNames: "Namen speichern",
+        clearAll: "Alle löschen",
+        consoleConfig: "Konsolen-Konfiguration",
+        consoleConfigDesc: "Setze das Gateway deiner PS5/Xbox auf diesen Server:",
+        gateway: "Gateway",
+        dns: "DNS",
+        orRouterIp: "oder deine Router-IP",
+        deploy: "Aktivieren",
+        active: "Aktiv",
+        edit: "Bearbeiten",
+        delete: "Löschen",
+        editConfig: "Konfiguration bearbeiten",
+        save: "Speichern",
+        cancel: "Abbrechen",
+        missionUpdated: "Region gewechselt",
+        regionDeployed: "Region erfolgreich aktiviert!",
+        restartGame: "Starte dein Spiel neu, um die neue Matchmaking-Region zu übernehmen.",
+        newLobbies: "Neue Lobbys werden den aktualisierten Standort verwenden.",
+        rogerThat: "Verstanden",
+        localTime: "Ortszeit",
+        info: "Info",
+        deployedTo: "Verbunden mit",
+        disconnectedFrom: "Getrennt von"
+    },
+    fr: {
+        tagline: "Contrôle Tactique du Matchmaking",
+        systemStatus: "État du Système",
+        online: "En ligne",
+        offline: "Hors ligne",
+        activeConfig: "Config Active",
+        endpoint: "Point d'accès",
+        lastHandshake: "Dernière connexion",
+        transfer: "Transfert",
+        deployVpn: "Démarrer VPN",
+        disconnect: "Déconnecter",
+        refresh: "Actualiser",
+        vpnRegions: "Régions VPN",
+        noActiveRegion: "Aucune région active",
+        noRegions: "Aucune région. Téléchargez une config WireGuard.",
+        deployNewRegion: "Ajouter une Région",
+        dropConfig: "Déposez la config WireGuard ici",
+        refreshFlags: "Actualiser les drapeaux",
+        switchWhenIdle: "Changer quand inactif (sans interrompre un match)",
+        switchQueued: "Changement prévu après le match",
+        queuedSwitchFailed: "Le changement prévu a échoué",
+        offloadedFlows: "flux accélérés",
+        activeClients: "clients actifs",
+        operationLog: "Journal des Opérations",
+        noLogs: "Aucune opération enregistrée",
+        loadOlderLogs: "Charger plus ancien",
+        settings: "Paramètres",
+        autostartConfig: "Configuration Autostart",
+        autostartDisabled: "Autostart désactivé",
+        enable: "Activer",
+        region: "Région",
+        selectConfig: "-- Choisir config --",
+        autostartInfo: "Si activé, LobbyShift se connectera automatiquement à la région VPN sélectionnée au démarrage du serveur.",
+        saveSettings: "Enregistrer",
+        customNames: "Noms Personnalisés",
+        customNamesDesc: "Donnez des noms à vos configs VPN (ex: \"Bot Lobbies\" au lieu de \"mx-free-47\")",
+        enterCustomName: "Entrer un nom...",
+        saveNames: "Enregistrer Noms",
+        clearAll: "Tout Effacer",
+        consoleConfig: "Configuration Console",
+        consoleConfigDesc: "Définissez la passerelle de votre PS5/Xbox sur ce serveur:",
+        gateway: "Passerelle",
+        dns: "DNS",
+        orRouterIp: "ou l'IP de votre routeur",
+        deploy: "Déployer",
+        active: "Actif",
+        edit: "Modifier",
+        delete: "Supprimer",
+        editConfig: "Modifier Config",
+        save: "Enregistrer",
+        cancel: "Annuler",
+        missionUpdated: "Région Changée",
+        regionDeployed: "Région déployée avec succès!",
+        restartGame: "Redémarrez votre jeu pour appliquer la nouvelle région.",
+        newLobbies: "Les nouveaux lobbies utiliseront le nouvel emplacement.",
+        rogerThat: "Compris",
+        localTime: "Heure Locale",
+        info: "Info",
+        deployedTo: "Connecté à",
+        disconnectedFrom: "Déconnecté de"
+    },
+    it: {
+        tagline: "Controllo Tattico del Matchmaking",
+        systemStatus: "Stato Sistema",
+        online: "Online",
+        offline: "Offline",
+        activeConfig: "Config Attiva",
+        endpoint: "Endpoint",
+        lastHandshake: "Ultimo Handshake",
+        transfer: "Trasferimento",
+        deployVpn: "Avvia VPN",
+        disconnect: "Disconnetti",
+        refresh: "Aggiorna",
+        vpnRegions: "Regioni VPN",
+        noActiveRegion: "Nessuna regione attiva",
+        noRegions: "Nessuna regione. Carica una config WireGuard.",
+        deployNewRegion: "Aggiungi Regione",
+        dropConfig: "Trascina la config WireGuard qui",
+        refreshFlags: "Aggiorna bandiere",
+        switchWhenIdle: "Cambia quando inattivo (non interrompere una partita)",
+        switchQueued: "Cambio in coda fino a fine partita",
+        queuedSwitchFailed: "Cambio in coda non riuscito",
+        offloadedFlows: "flussi accelerati",
+        activeClients: "client attivi",
+        operationLog: "Registro Operazioni",
+        noLogs: "Nessuna operazione registrata",
+        loadOlderLogs: "Carica precedenti",
+        settings: "Impostazioni",
+        autostartConfig: "Configurazione Autostart",
+        autostartDisabled: "Autostart disabilitato",
+        enable: "Attiva",
+        region: "Regione",
+        selectConfig: "-- Seleziona config --",
+        autostartInfo: "Se abilitato, LobbyShift si connetterà automaticamente alla regione VPN selezionata all'avvio del server.",
+        saveSettings: "Salva Impostazioni",
+        customNames: "Nomi Personalizzati",
+        customNamesDesc: "Dai nomi alle tue config VPN (es: \"Bot Lobbies\" invece di \"mx-free-47\")",
+        enterCustomName: "Inserisci nome...",
+        saveNames: "Salva Nomi",
+        clearAll: "Cancella Tutto",
+        consoleConfig: "Configurazione Console",
+        consoleConfigDesc: "Imposta il gateway della tua PS5/Xbox su questo server:",
+        gateway: "Gateway",
+        dns: "DNS",
+        orRouterIp: "o l'IP del tuo router",
+        deploy: "Attiva",
+        active: "Attivo",
+        edit: "Modifica",
+        delete: "Elimina",
+        editConfig: "Modifica Config",
+        save: "Salva",
+        cancel: "Annulla",
+        missionUpdated: "Regione Cambiata",
+        regionDeployed: "Regione attivata con successo!",
+        restartGame: "Riavvia il gioco per applicare la nuova regione.",
+        newLobbies: "Le nuove lobby useranno la nuova posizione.",
+        rogerThat: "Capito",
+        localTime: "Ora Locale",
+        info: "Info",
+        deployedTo: "Connesso a",
+        disconnectedFrom: "Disconnesso da"
+    },
+    es: {
+        tagline: "Control Táctico de Matchmaking",
+        systemStatus: "Estado del Sistema",
+        online: "En línea",
+        offline: "Desconectado",
+        activeConfig: "Config Activa",
+        endpoint: "Punto de acceso",
+        lastHandshake: "Última conexión",
+        transfer: "Transferencia",
+        deployVpn: "Iniciar VPN",
+        disconnect: "Desconectar",
+        refresh: "Actualizar",
+        vpnRegions: "Regiones VPN",
+        noActiveRegion: "Sin región activa",
+        noRegions: "Sin regiones. Sube una config WireGuard.",
+        deployNewRegion: "Añadir Región",
+        dropConfig: "Arrastra la config WireGuard aquí",
+        refreshFlags: "Actualizar banderas",
+        switchWhenIdle: "Cambiar cuando esté inactivo (sin interrumpir una partida)",
+        switchQueued: "Cambio en cola hasta que termine la partida",
+        queuedSwitchFailed: "El cambio en cola falló",
+        offloadedFlows: "flujos acelerados",
+        activeClients: "clientes activos",
+        operationLog: "Registro de Operaciones",
+        noLogs: "Sin operaciones registradas",
+        loadOlderLogs: "Cargar anteriores",
+        settings: "Configuración",
+        autostartConfig: "Configuración Autostart",
+        autostartDisabled: "Autostart desactivado",
+        enable: "Activar",
+        region: "Región",
+        selectConfig: "-- Seleccionar config --",
+        autostartInfo: "Si está activado, LobbyShift se conectará automáticamente a la región VPN seleccionada al iniciar el servidor.",
+        saveSettings: "Guardar Configuración",
+        customNames: "Nombres Personalizados",
+        customNamesDesc: "Dale nombres a tus configs VPN (ej: \"Bot Lobbies\" en vez de \"mx-free-47\")",
+        enterCustomName: "Introducir nombre...",
+        saveNames: "Guardar Nombres",
+        clearAll: "Borrar Todo",
+        consoleConfig: "Configuración de Consola",
+        consoleConfigDesc: "Configura el gateway de tu PS5/Xbox a este servidor:",
+        gateway: "Gateway",
+        dns: "DNS",
+        orRouterIp: "o la IP de tu router",
+        deploy: "Activar",
+        active: "Activo",
+        edit: "Editar",
+        delete: "Eliminar",
+        editConfig: "Editar Config",
+        save: "Guardar",
+        cancel: "Cancelar",
+        missionUpdated: "Región Cambiada",
+        regionDeployed: "¡Región activada con éxito!",
+        restartGame: "Reinicia tu juego para aplicar la nueva región.",
+        newLobbies: "Los nuevos lobbies usarán la nueva ubicación.",
+        rogerThat: "Entendido",
+        localTime: "Hora Local",
+        info: "Info",
+        deployedTo: "Conectado a",
+        disconnectedFrom: "Desconectado de"
+    }
+};
+
+function t(key) {
+    return translations[currentLang]?.[key] || translations['en'][key] || key;
+}
+
+function changeLanguage(lang) {
+    currentLang = lang;
+    localStorage.setItem('lobbyshift_lang', lang);
+    document.getElementById('language-select').value = lang;
+    updateAllTranslations();
+}
+
+function updateAllTranslations() {
+    // Update all elements with data-i18n attribute
+    document.querySelectorAll('[data-i18n]').forEach(el => {
+        const key = el.getAttribute('data-i18n');
+        el.textContent = t(key);
+    });
+    
+    // Update placeholders
+    document.querySelectorAll('[data-i18n-placeholder]').forEach(el => {
+        const key = el.getAttribute('data-i18n-placeholder');
+        el.placeholder = t(key);
+    });
+    
+    // Re-render dynamic content
+    if (allConfigs.length > 0) {
+        renderConfigs(allConfigs);
+        updateActiveSummary();
+    }
+    renderLogs(lastLogs || []);
+    if (settingsLoaded) {
+        renderConfigNamesList(lastAvailableConfigs || []);
+    }
+}
+
+let lastLogs = [];
+// Cursor for the next (older) page of logs, null when all are loaded
+let logsCursor = null;
+let lastAvailableConfigs = [];
+let settingsLoaded = false;
+
+// Country to timezone mapping
+const countryTimezones = {
+    // A
+    'AF': 'Asia/Kabul', 'Afghanistan': 'Asia/Kabul',
+    'AL': 'Europe/Tirane', 'Albania': 'Europe/Tirane',
+    'DZ': 'Africa/Algiers', 'Algeria': 'Africa/Algiers',
+    'AO': 'Africa/Luanda', 'Angola': 'Africa/Luanda',
+    'AR': 'America/Argentina/Buenos_Aires', 'Argentina': 'America/Argentina/Buenos_Aires',
+    'AM': 'Asia/Yerevan', 'Armenia': 'Asia/Yerevan',
+    'AU': 'Australia/Sydney', 'Australia': 'Australia/Sydney',
+    'AT': 'Europe/Vienna', 'Austria': 'Europe/Vienna',
+    'AZ': 'Asia/Baku', 'Azerbaijan': 'Asia/Baku',
+    // B
+    'BH': 'Asia/Bahrain', 'Bahrain': 'Asia/Bahrain',
+    'BD': 'Asia/Dhaka', 'Bangladesh': 'Asia/Dhaka',
+    'BY': 'Europe/Minsk', 'Belarus': 'Europe/Minsk',
+    'BE': 'Europe/Brussels', 'Belgium': 'Europe/Brussels',
+    'BZ': 'America/Belize', 'Belize': 'America/Belize',
+    'BO': 'America/La_Paz', 'Bolivia': 'America/La_Paz',
+    'BA': 'Europe/Sarajevo', 'Bosnia and Herzegovina': 'Europe/Sarajevo',
+    'BW': 'Africa/Gaborone', 'Botswana': 'Africa/Gaborone',
+    'BR': 'America/Sao_Paulo', 'Brazil': 'America/Sao_Paulo',
+    'BN': 'Asia/Brunei', 'Brunei': 'Asia/Brunei',
+    'BG': 'Europe/Sofia', 'Bulgaria': 'Europe/Sofia',
+    // C
+    'KH': 'Asia/Phnom_Penh', 'Cambodia': 'Asia/Phnom_Penh',
+    'CM': 'Africa/Douala', 'Cameroon': 'Africa/Douala',
+    'CA': 'America/Toronto', 'Canada': 'America/Toronto',
+    'CL': 'America/Santiago', 'Chile': 'America/Santiago',
+    'CN': 'Asia/Shanghai', 'China': 'Asia/Shanghai',
+    'CO': 'America/Bogota', 'Colombia': 'America/Bogota',
+    'CR': 'America/Costa_Rica', 'Costa Rica': 'America/Costa_Rica',
+    'HR': 'Europe/Zagreb', 'Croatia': 'Europe/Zagreb',
+    'CU': 'America/Havana', 'Cuba': 'America/Havana',
+    'CY': 'Asia/Nicosia', 'Cyprus': 'Asia/Nicosia',
+    'CZ': 'Europe/Prague', 'Czech Republic': 'Europe/Prague', 'Czechia': 'Europe/Prague',
+    // D
+    'DK': 'Europe/Copenhagen', 'Denmark': 'Europe/Copenhagen',
+    'DO': 'America/Santo_Domingo', 'Dominican Republic': 'America/Santo_Domingo',
+    // E
+    'EC': 'America/Guayaquil', 'Ecuador': 'America/Guayaquil',
+    'EG': 'Africa/Cairo', 'Egypt': 'Africa/Cairo',
+    'SV': 'America/El_Salvador', 'El Salvador': 'America/El_Salvador',
+    'EE': 'Europe/Tallinn', 'Estonia': 'Europe/Tallinn',
+    'ET': 'Africa/Addis_Ababa', 'Ethiopia': 'Africa/Addis_Ababa',
+    // F
+    'FI': 'Europe/Helsinki', 'Finland': 'Europe/Helsinki',
+    'FR': 'Europe/Paris', 'France': 'Europe/Paris',
+    // G
+    'GE': 'Asia/Tbilisi', 'Georgia': 'Asia/Tbilisi',
+    'DE': 'Europe/Berlin', 'Germany': 'Europe/Berlin',
+    'GH': 'Africa/Accra', 'Ghana': 'Africa/Accra',
+    'GR': 'Europe/Athens', 'Greece': 'Europe/Athens',
+    'GT': 'America/Guatemala', 'Guatemala': 'America/Guatemala',
+    // H
+    'HN': 'America/Tegucigalpa', 'Honduras': 'America/Tegucigalpa',
+    'HK': 'Asia/Hong_Kong', 'Hong Kong': 'Asia/Hong_Kong',
+    'HU': 'Europe/Budapest', 'Hungary': 'Europe/Budapest',
+    // I
+    'IS': 'Atlantic/Reykjavik', 'Iceland': 'Atlantic/Reykjavik',
+    'IN': 'Asia/Kolkata', 'India': 'Asia/Kolkata',
+    'ID': 'Asia/Jakarta', 'Indonesia': 'Asia/Jakarta',
+    'IR': 'Asia/Tehran', 'Iran': 'Asia/Tehran',
+    'IQ': 'Asia/Baghdad', 'Iraq': 'Asia/Baghdad',
+    'IE': 'Europe/Dublin', 'Ireland': 'Europe/Dublin',
+    'IL': 'Asia/Jerusalem', 'Israel': 'Asia/Jerusalem',
+    'IT': 'Europe/Rome', 'Italy': 'Europe/Rome',
+    // J
+    'JM': 'America/Jamaica', 'Jamaica': 'America/Jamaica',
+    'JP': 'Asia/Tokyo', 'Japan': 'Asia/Tokyo',
+    'JO': 'Asia/Amman', 'Jordan': 'Asia/Amman',
+    // K
+    'KZ': 'Asia/Almaty', 'Kazakhstan': 'Asia/Almaty',
+    'KE': 'Africa/Nairobi', 'Kenya': 'Africa/Nairobi',
+    'KW': 'Asia/Kuwait', 'Kuwait': 'Asia/Kuwait',
+    'KG': 'Asia/Bishkek', 'Kyrgyzstan': 'Asia/Bishkek',
+    'KR': 'Asia/Seoul', 'South Korea': 'Asia/Seoul', 'Korea': 'Asia/Seoul',
+    // L
+    'LA': 'Asia/Vientiane', 'Laos': 'Asia/Vientiane',
+    'LV': 'Europe/Riga', 'Latvia': 'Europe/Riga',
+    'LB': 'Asia/Beirut', 'Lebanon': 'Asia/Beirut',
+    'LY': 'Africa/Tripoli', 'Libya': 'Africa/Tripoli',
+    'LI': 'Europe/Vaduz', 'Liechtenstein': 'Europe/Vaduz',
+    'LT': 'Europe/Vilnius', 'Lithuania': 'Europe/Vilnius',
+    'LU': 'Europe/Luxembourg', 'Luxembourg': 'Europe/Luxembourg',
+    // M
+    'MO': 'Asia/Macau', 'Macau': 'Asia/Macau',
+    'MY': 'Asia/Kuala_Lumpur', 'Malaysia': 'Asia/Kuala_Lumpur',
+    'MV': 'Indian/Maldives', 'Maldives': 'Indian/Maldives',
+    'MT': 'Europe/Malta', 'Malta': 'Europe/Malta',
+    'MX': 'America/Mexico_City', 'Mexico': 'America/Mexico_City',
+    'MD': 'Europe/Chisinau', 'Moldova': 'Europe/Chisinau',
+    'MC': 'Europe/Monaco', 'Monaco': 'Europe/Monaco',
+    'MN': 'Asia/Ulaanbaatar', 'Mongolia': 'Asia/Ulaanbaatar',
+    'ME': 'Europe/Podgorica', 'Montenegro': 'Europe/Podgorica',
+    'MA': 'Africa/Casablanca', 'Morocco': 'Africa/Casablanca',
+    'MZ': 'Africa/Maputo', 'Mozambique': 'Africa/Maputo',
+    'MM': 'Asia/Yangon', 'Myanmar': 'Asia/Yangon',
+    // N
+    'NA': 'Africa/Windhoek', 'Namibia': 'Africa/Windhoek',
+    'NP': 'Asia/Kathmandu', 'Nepal': 'Asia/Kathmandu',
+    'NL': 'Europe/Amsterdam', 'Netherlands': 'Europe/Amsterdam',
+    'NZ': 'Pacific/Auckland', 'New Zealand': 'Pacific/Auckland',
+    'NI': 'America/Managua', 'Nicaragua': 'America/Managua',
+    'NG': 'Africa/Lagos', 'Nigeria': 'Africa/Lagos',
+    'MK': 'Europe/Skopje', 'North Macedonia': 'Europe/Skopje',
+    'NO': 'Europe/Oslo', 'Norway': 'Europe/Oslo',
+    // O
+    'OM': 'Asia/Muscat', 'Oman': 'Asia/Muscat',
+    // P
+    'PK': 'Asia/Karachi', 'Pakistan': 'Asia/Karachi',
+    'PS': 'Asia/Gaza', 'Palestine': 'Asia/Gaza',
+    'PA': 'America/Panama', 'Panama': 'America/Panama',
+    'PY': 'America/Asuncion', 'Paraguay': 'America/Asuncion',
+    'PE': 'America/Lima', 'Peru': 'America/Lima',
+    'PH': 'Asia/Manila', 'Philippines': 'Asia/Manila',
+    'PL': 'Europe/Warsaw', 'Poland': 'Europe/Warsaw',
+    'PT': 'Europe/Lisbon', 'Portugal': 'Europe/Lisbon',
+    'PR': 'America/Puerto_Rico', 'Puerto Rico': 'America/Puerto_Rico',
+    // Q
+    'QA': 'Asia/Qatar', 'Qatar': 'Asia/Qatar',
+    // R
+    'RO': 'Europe/Bucharest', 'Romania': 'Europe/Bucharest',
+    'RU': 'Europe/Moscow', 'Russia': 'Europe/Moscow',
+    'RW': 'Africa/Kigali', 'Rwanda': 'Africa/Kigali',
+    // S
+    'SA': 'Asia/Riyadh', 'Saudi Arabia': 'Asia/Riyadh',
+    'SN': 'Africa/Dakar', 'Senegal': 'Africa/Dakar',
+    'RS': 'Europe/Belgrade', 'Serbia': 'Europe/Belgrade',
+    'SG': 'Asia/Singapore', 'Singapore': 'Asia/Singapore',
+    'SK': 'Europe/Bratislava', 'Slovakia': 'Europe/Bratislava',
+    'SI': 'Europe/Ljubljana', 'Slovenia': 'Europe/Ljubljana',
+    'ZA': 'Africa/Johannesburg', 'South Africa': 'Africa/Johannesburg',
+    'ES': 'Europe/Madrid', 'Spain': 'Europe/Madrid',
+    'LK': 'Asia/Colombo', 'Sri Lanka': 'Asia/Colombo',
+    'SD': 'Africa/Khartoum', 'Sudan': 'Africa/Khartoum',
+    'SE': 'Europe/Stockholm', 'Sweden': 'Europe/Stockholm',
+    'CH': 'Europe/Zurich', 'Switzerland': 'Europe/Zurich',
+    'SY': 'Asia/Damascus', 'Syria': 'Asia/Damascus',
+    // T
+    'TW': 'Asia/Taipei', 'Taiwan': 'Asia/Taipei',
+    'TJ': 'Asia/Dushanbe', 'Tajikistan': 'Asia/Dushanbe',
+    'TZ': 'Africa/Dar_es_Salaam', 'Tanzania': 'Africa/Dar_es_Salaam',
+    'TH': 'Asia/Bangkok', 'Thailand': 'Asia/Bangkok',
+    'TN': 'Africa/Tunis', 'Tunisia': 'Africa/Tunis',
+    'TR': 'Europe/Istanbul', 'Turkey': 'Europe/Istanbul',
+    'TM': 'Asia/Ashgabat', 'Turkmenistan': 'Asia/Ashgabat',
+    // U
+    'UG': 'Africa/Kampala', 'Uganda': 'Africa/Kampala',
+    'UA': 'Europe/Kiev', 'Ukraine': 'Europe/Kiev',
+    'AE': 'Asia/Dubai', 'UAE': 'Asia/Dubai', 'United Arab Emirates': 'Asia/Dubai',
+    'GB': 'Europe/London', 'UK': 'Europe/London', 'United Kingdom': 'Europe/London',
+    'US': 'America/New_York', 'USA': 'America/New_York', 'United States': 'America/New_York',
+    'UY': 'America/Montevideo', 'Uruguay': 'America/Montevideo',
+    'UZ': 'Asia/Tashkent', 'Uzbekistan': 'Asia/Tashkent',
+    // V
+    'VE': 'America/Caracas', 'Venezuela': 'America/Caracas',
+    'VN': 'Asia/Ho_Chi_Minh', 'Vietnam': 'Asia/Ho_Chi_Minh',
+    // Y
+    'YE': 'Asia/Aden', 'Yemen': 'Asia/Aden',
+    // Z
+    'ZM': 'Africa/Lusaka', 'Zambia': 'Africa/Lusaka',
+    'ZW': 'Africa/Harare', 'Zimbabwe': 'Africa/Harare'
+};
+
+function getTimezoneForCountry(countryName) {
+    if (!countryName) return null;
+    return countryTimezones[countryName] || null;
+}
+
+function getLocalTimeForCountry(countryName) {
+    const timezone = getTimezoneForCountry(countryName);
+    if (!timezone) return null;
+    try {
+        return new Date().toLocaleTimeString('en-US', {
+            timeZone: timezone,
+            hour: '2-digit',
+            minute: '2-digit',
+            hour12: false
+        });
+    } catch (e) {
+        return null;
+    }
+}
+
+function updateRegionClock() {
+    if (!currentRegionTimezone) return;
+    try {
+        const now = new Date();
+        const timeStr = now.toLocaleTimeString('en-US', {
+            timeZone: currentRegionTimezone,
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit',
+            hour12: false
+        });
+        document.getElementById('region-clock-time').textContent = timeStr;
+    } catch (e) {
+        console.error('Failed to update clock:', e);
+    }
+}
+
+function updateRegionDisplay(config) {
+    const display = document.getElementById('region-time-display');
+    
+    if (!config || !config.country) {
+        display.style.display = 'none';
+        currentRegionTimezone = null;
+        return;
+    }
+    
+    const timezone = getTimezoneForCountry(config.country.name);
+    if (!timezone) {
+        display.style.display = 'none';
+        currentRegionTimezone = null;
+        return;
+    }
+    
+    currentRegionTimezone = timezone;
+    display.style.display = 'flex';
+    document.getElementById('region-flag').textContent = config.country.flag || '🌍';
+    document.getElementById('region-name').textContent = config.country.name;
+    document.getElementById('region-timezone').textContent = timezone.replace('_', ' ');
+    updateRegionClock();
+}
+
+function toggleSection(section) {
+    const header = document.querySelector(`#${section}-card .card-header`);
+    const body = document.getElementById(`${section}-body`);
+    const summary = document.getElementById(`${section}-summary`);
+    
+    header.classList.toggle('collapsed');
+    body.classList.toggle('collapsed');
+    
+    if (summary) {
+        summary.classList.toggle('visible', header.classList.contains('collapsed'));
+    }
+}
+
+function updateActiveSummary() {
+    const summary = document.getElementById('regions-summary');
+    const activeConfig = allConfigs.find(c => c.active);
+    
+    if (!activeConfig) {
+        summary.innerHTML = `<span style="color: var(--text-muted);">${t('noActiveRegion')}</span>`;
+        return;
+    }
+    
+    const localTime = getLocalTimeForCountry(activeConfig.country?.name);
+    const customName = configNames[activeConfig.name];
+    const displayName = customName || activeConfig.country?.name || 'Unknown';
+    const showOriginal = customName ? activeConfig.name : null;
+    
+    summary.innerHTML = `
+        <span class="config-flag">${activeConfig.country?.flag || '🌍'}</span>
+        <div class="config-info">
+            <div class="config-name">${displayName}${showOriginal ? ` (${showOriginal})` : ''}</div>
+            <div class="config-meta">
+                <span class="config-endpoint">${activeConfig.endpoint}</span>
+                ${localTime ? `<span class="config-time">🕐 ${localTime}</span>` : ''}
+            </div>
+        </div>
+    `;
+    
+    // Parse emojis with Twemoji
+    if (typeof twemoji !== 'undefined') {
+        twemoji.parse(summary);
+    }
+}
+
+async function api(endpoint, method = 'GET', body = null) {
+    const options = { method };
+    if (body) {
+        if (body instanceof FormData) {
+            options.body = body;
+        } else {
+            options.headers = { 'Content-Type': 'application/json' };
+            options.body = JSON.stringify(body);
+        }
+    }
+    const response = await fetch(`/api${endpoint}`, options);
+    return response.json();
+}
+
+// Versions seen by the last snapshot, used to skip re-rendering unchanged data
+let snapshotVersions = null;
+
+async function refreshSnapshot() {
+    try {
+        // The server leaves out configs and settings that match the versions we already have
+        const query = snapshotVersions ? '?' + new URLSearchParams(snapshotVersions) : '';
+        const snapshot = await api(`/snapshot${query}`);
+        updateStatusUI(snapshot.status);
+        
+        if (snapshotVersions && snapshot.configs) {
+            allConfigs = snapshot.configs;
+            renderConfigs(allConfigs);
+            updateActiveSummary();
+            updateRegionDisplay(allConfigs.find(c => c.active));
+        }
+        if (snapshotVersions && snapshot.settings) {
+            applySettings(snapshot.settings);
+        }
+        snapshotVersions = snapshot.versions;
+    } catch (e) {
+        console.error('Failed to refresh snapshot:', e);
+    }
+}
+
+// Config changes pushed by the server (uploads, edits, files dropped into the configs directory)
+function subscribeEvents() {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource('/api/events');
+    source.addEventListener('configs', () => loadConfigs());
+    source.addEventListener('clients', (event) => renderClients(JSON.parse(event.data).clients));
+}
+
+// Per-client tunnel traffic: count next to the transfer totals, busiest clients in the tooltip
+function renderClients(clients, active = null) {
+    const transfer = document.getElementById('transfer');
+    if (transfer.dataset.base === undefined) return;
+    if (active === null) active = clients.filter(c => c.rx_bps || c.tx_bps).length;
+    transfer.textContent = `${transfer.dataset.base} · 👥 ${active} ${t('activeClients')}`;
+    transfer.title = clients.slice(0, 5)
+        .map(c => `${c.address}  ↓ ${Math.round(c.rx_bps / 1024)} KB/s / ↑ ${Math.round(c.tx_bps / 1024)} KB/s`)
+        .join('\n');
+}
+
+async function refreshStatus() {
+    try {
+        const status = await api('/status');
+        updateStatusUI(status);
+    } catch (e) {
+        console.error('Failed to refresh status:', e);
+    }
+}
+
+// executed_at of the last failed queued switch already reported (undefined until the first status)
+let lastDeferredFailure;
+
+function updateStatusUI(status) {
+    const badge = document.getElementById('status-badge');
+    const statusText = document.getElementById('status-text');
+    const activeConfig = document.getElementById('active-config');
+    const endpoint = document.getElementById('endpoint');
+    const handshake = document.getElementById('handshake');
+    const transfer = document.getElementById('transfer');
+    const btnStart = document.getElementById('btn-start');
+    const btnStop = document.getElementById('btn-stop');
+    
+    if (status.active) {
+        badge.className = 'status-badge active';
+        statusText.textContent = 'Online';
+        activeConfig.textContent = status.config || '-';
+        endpoint.textContent = status.endpoint || '-';
+        handshake.textContent = status.latest_handshake || '-';
+        transfer.textContent = status.transfer_rx && status.transfer_tx 
+            ? `↓ ${status.transfer_rx} / ↑ ${status.transfer_tx}` : '-';
+        if (status.flow_offload && status.flow_offload.offloaded_flows !== null) {
+            transfer.textContent += ` · ⚡ ${status.flow_offload.offloaded_flows} ${t('offloadedFlows')}`;
+        }
+        delete transfer.dataset.base;
+        if (status.clients) {
+            transfer.dataset.base = transfer.textContent;
+            renderClients(status.clients.top, status.clients.active);
+        }
+        btnStart.disabled = true;
+        btnStop.disabled = false;
+        if (status.pending_switch) {
+            activeConfig.textContent = `${status.config || '-'} → ${status.pending_switch.config} ⏳`;
+        }
+    } else {
+        badge.className = 'status-badge inactive';
+        statusText.textContent = 'Offline';
+        activeConfig.textContent = '-';
+        endpoint.textContent = '-';
+        handshake.textContent = '-';
+        transfer.textContent = '-';
+        transfer.title = '';
+        delete transfer.dataset.base;
+        btnStart.disabled = false;
+        btnStop.disabled = true;
+        updateRegionDisplay(null);
+    }
+    
+    // Report a queued switch that failed once it ran, once per attempt
+    const deferred = status.last_deferred_switch;
+    if (deferred && deferred.error && deferred.executed_at !== lastDeferredFailure) {
+        if (lastDeferredFailure !== undefined) {
+            showToast(`${t('queuedSwitchFailed')}: ${deferred.config} (${deferred.error})`, 'error');
+        }
+        lastDeferredFailure = deferred.executed_at;
+    } else if (lastDeferredFailure === undefined) {
+        lastDeferredFailure = null;
+    }
+}
+
+async function loadConfigs() {
+    try {
+        const data = await api('/configs');
+        allConfigs = data.configs;
+        renderConfigs(allConfigs);
+        updateActiveSummary();
+        
+        // Update region display for active config
+        const activeConfig = allConfigs.find(c => c.active);
+        updateRegionDisplay(activeConfig);
+    } catch (e) {
+        console.error('Failed to load configs:', e);
+    }
+}
+
+async function refreshFlags() {
+    try {
+        showToast('Refreshing flags...', 'success');
+        // Clear GeoIP cache to force re-lookup
+        await api('/geoip-cache', 'DELETE');
+        // Reload configs to trigger fresh GeoIP lookups
+        await loadConfigs();
+        showToast('Flags refreshed!', 'success');
+    } catch (e) {
+        showToast('Failed to refresh flags', 'error');
+        console.error('Failed to refresh flags:', e);
+    }
+}
+
+function renderConfigs(configs) {
+    const list = document.getElementById('config-list');
+    
+    if (configs.length === 0) {
+        list.innerHTML = `<p style="color: var(--text-muted); text-align: center; padding: 20px;">${t('noRegions')}</p>`;
+        return;
+    }
+    
+    configs.sort((a, b) => {
+        if (a.favorite && !b.favorite) return -1;
+        if (!a.favorite && b.favorite) return 1;
+        if (a.active && !b.active) return -1;
+        if (!a.active && b.active) return 1;
+        return 0;
+    });
+    
+    list.innerHTML = configs.map(config => {
+        const localTime = getLocalTimeForCountry(config.country?.name);
+        const customName = configNames[config.name];
+        const displayName = customName || config.country?.name || 'Unknown';
+        const showOriginal = customName ? config.name : null;
+        
+        return `
+        <div class="config-item ${config.active ? 'active' : ''} ${config.favorite ? 'favorite' : ''}">
+            <div class="config-info">
+                <button class="favorite-btn ${config.favorite ? 'active' : ''}" onclick="event.stopPropagation(); toggleFavorite('${config.name}')" title="${config.favorite ? 'Remove from favorites' : 'Add to favorites'}">
+                    ${config.favorite ? '⭐' : '☆'}
+                </button>
+                <div class="config-details">
+                    <div class="config-name">
+                        <span class="config-flag">${config.country?.flag || '🌍'}</span>
+                        ${displayName}
+                        ${showOriginal ? `<span style="color: var(--text-muted); font-weight: 400;">(${showOriginal})</span>` : ''}
+                        ${config.active ? ' ✓' : ''}
+                    </div>
+                    <div class="config-meta">
+                        <span class="config-endpoint">${config.endpoint}</span>
+                        ${localTime ? `<span class="config-time">🕐 ${localTime}</span>` : ''}
+                    </div>
+                </div>
+            </div>
+            <div class="config-actions">
+                <button class="btn-primary" onclick="event.stopPropagation(); switchConfig('${config.name}')" ${config.active ? 'disabled' : ''}>
+                    ${config.active ? t('active') : t('deploy')}
+                </button>
+                <button class="btn-secondary" onclick="event.stopPropagation(); editConfig('${config.name}')">${t('edit')}</button>
+                <button class="btn-danger" onclick="event.stopPropagation(); deleteConfig('${config.name}')">${t('delete')}</button>
+            </div>
+        </div>
+    `}).join('');
+    
+    // Parse emojis with Twemoji for cross-browser flag support
+    if (typeof twemoji !== 'undefined') {
+        twemoji.parse(list);
+    }
+}
+
+async function toggleFavorite(name) {
+    try {
+        const config = allConfigs.find(c => c.name === name);
+        if (config?.favorite) {
+            await api(`/favorites/${name}`, 'DELETE');
+        } else {
+            await api(`/favorites/${name}`, 'POST');
+        }
+        await loadConfigs();
+    } catch (e) {
+        showToast('Failed to update favorite', 'error');
+    }
+}
+
+async function loadLogs() {
+    try {
+        const data = await api('/logs?limit=20');
+        logsCursor = data.next_cursor;
+        renderLogs(data.logs);
+    } catch (e) {
+        console.error('Failed to load logs:', e);
+    }
+}
+
+async function loadOlderLogs() {
+    if (logsCursor === null) return;
+    try {
+        const data = await api(`/logs?limit=20&before=${logsCursor}`);
+        logsCursor = data.next_cursor;
+        renderLogs(lastLogs.concat(data.logs));
+    } catch (e) {
+        console.error('Failed to load older logs:', e);
+    }
+}
+
+function renderLogs(logs) {
+    lastLogs = logs;
+    const container = document.getElementById('logs-container');
+    if (!logs || logs.length === 0) {
+        container.innerHTML = `<div class="empty-logs">${t('noLogs')}</div>`;
+        return;
+    }
+    container.innerHTML = logs.map(log => {
+        const date = new Date(log.timestamp);
+        const timeStr = date.toLocaleDateString() + ' ' + date.toLocaleTimeString();
+        const icon = log.action === 'connected' ? '🟢' : '⚪';
+        const iconClass = log.action === 'connected' ? 'connected' : '';
+        return `
+            <div class="log-entry">
+                <span class="log-icon ${iconClass}">${icon}</span>
+                <div class="log-details">
+                    <div>
+                        <span class="log-action">${log.action === 'connected' ? t('deployedTo') : t('disconnectedFrom')}</span>
+                        <span class="log-config">${log.config || 'Unknown'}</span>
+                    </div>
+                    ${log.details ? `<div class="log-extra">${log.details}</div>` : ''}
+                    <div class="log-time">${timeStr}</div>
+                </div>
+            </div>
+        `;
+    }).join('');
+    if (logsCursor !== null) {
+        container.innerHTML += `<button class="btn-secondary load-older-logs" onclick="loadOlderLogs()">${t('loadOlderLogs')}</button>`;
+    }
+    
+    // Parse emojis with Twemoji
+    if (typeof twemoji !== 'undefined') {
+        twemoji.parse(container);
+    }
+}
+
+async function clearLogs() {
+    if (!confirm('Clear all operation logs?')) return;
+    try {
+        await api('/logs', 'DELETE');
+        await loadLogs();
+        showToast('Logs cleared', 'success');
+    } catch (e) {
+        showToast('Failed to clear logs', 'error');
+    }
+}
+
+async function startVPN() {
+    try {
+        showToast('Deploying VPN...', 'success');
+        await api('/up', 'POST');
+        await refreshStatus();
+        await loadConfigs();
+        await loadLogs();
+        showToast('VPN Online', 'success');
+    } catch (e) {
+        showToast('Deployment failed', 'error');
+    }
+}
+
+async function stopVPN() {
+    try {
+        await api('/down', 'POST');
+        await refreshStatus();
+        await loadConfigs();
+        await loadLogs();
+        showToast('VPN Disconnected', 'success');
+    } catch (e) {
+        showToast('Disconnect failed', 'error');
+    }
+}
+
+async function switchConfig(name) {
+    try {
+        showToast(`${t('deploy')}...`, 'success');
+        const whenIdle = document.getElementById('switch-when-idle').checked;
+        const result = await api(`/switch/${name}${whenIdle ? '?when_idle=true' : ''}`, 'POST');
+        if (result.pending) {
+            await refreshStatus();
+            showToast(t('switchQueued'), 'success');
+            return;
+        }
+        await refreshStatus();
+        await loadConfigs();
+        await loadLogs();
+        const loss = result.switch?.packet_loss?.loss_pct;
+        const lossInfo = loss !== null && loss !== undefined ? `<br><br>📉 ${loss}% packet loss (${result.switch.duration_ms} ms)` : '';
+        showModal(t('missionUpdated'), `${t('regionDeployed')}${lossInfo}<br><br>⚠️ <strong>${t('restartGame')}</strong><br><br>${t('newLobbies')}`);
+    } catch (e) {
+        showToast('Deployment failed', 'error');
+    }
+}
+
+async function editConfig(name) {
+    try {
+        const data = await api(`/configs/${name}`);
+        currentEditConfig = name;
+        document.getElementById('modal-title').textContent = `${t('edit')}: ${name}`;
+        document.getElementById('config-editor').value = data.content;
+        document.getElementById('edit-modal').classList.add('active');
+    } catch (e) {
+        showToast('Failed to load config', 'error');
+    }
+}
+
+async function saveConfig() {
+    if (!currentEditConfig) return;
+    try {
+        const content = document.getElementById('config-editor').value;
+        await api(`/configs/${currentEditConfig}`, 'PUT', { content });
+        closeModal();
+        await refreshStatus();
+        showToast('Config saved', 'success');
+    } catch (e) {
+        showToast('Failed to save config', 'error');
+    }
+}
+
+async function deleteConfig(name) {
+    if (!confirm(`Remove region "${name}"?`)) return;
+    try {
+        await api(`/configs/${name}`, 'DELETE');
+        await loadConfigs();
+        showToast('Region removed', 'success');
+    } catch (e) {
+        showToast('Failed to remove region', 'error');
+    }
+}
+
+async function uploadConfig(file) {
+    if (!file) return;
+    try {
+        const formData = new FormData();
+        formData.append('file', file);
+        showToast('Uploading...', 'success');
+        await api('/configs', 'POST', formData);
+        await loadConfigs();
+        showToast('Region deployed', 'success');
+        document.getElementById('file-input').value = '';
+    } catch (e) {
+        showToast('Upload failed', 'error');
+    }
+}
+
+function setupDragDrop() {
+    const zone = document.getElementById('upload-zone');
+    ['dragenter', 'dragover', 'dragleave', 'drop'].forEach(event => {
+        zone.addEventListener(event, e => { e.preventDefault(); e.stopPropagation(); });
+    });
+    ['dragenter', 'dragover'].forEach(event => {
+        zone.addEventListener(event, () => zone.classList.add('dragover'));
+    });
+    ['dragleave', 'drop'].forEach(event => {
+        zone.addEventListener(event, () => zone.classList.remove('dragover'));
+    });
+    zone.addEventListener('drop', e => {
+        const file = e.dataTransfer.files[0];
+        if (file && file.name.endsWith('.conf')) {
+            uploadConfig(file);
+        } else {
+            showToast('Invalid file type', 'error');
+        }
+    });
+}
+
+function closeModal() {
+    document.getElementById('edit-modal').classList.remove('active');
+    currentEditConfig = null;
+}
+
+function showModal(title, body) {
+    document.getElementById('info-modal-title').textContent = title;
+    document.getElementById('info-modal-body').innerHTML = body;
+    document.getElementById('info-modal').classList.add('active');
+}
+
+function closeInfoModal() {
+    document.getElementById('info-modal').classList.remove('active');
+}
+
+function showToast(message, type = 'success') {
+    const toast = document.getElementById('toast');
+    toast.textContent = message;
+    toast.className = `toast ${type} show`;
+    setTimeout(() => { toast.classList.remove('show'); }, 3000);
+}
+
+// Settings Functions
+async function loadSettings() {
+    try {
+        applySettings(await api('/settings'));
+    } catch (e) {
+        console.error('Failed to load settings:', e);
+    }
+}
+
+function applySettings(response) {
+    // Store config names globally
+    configNames = response.config_names || {};
+    lastAvailableConfigs = response.available_configs || [];
+    settingsLoaded = true;
+    
+    // Populate config dropdown
+    const select = document.getElementById('autostart-config');
+    select.innerHTML = `<option value="">${t('selectConfig')}</option>`;
+    
+    if (response.available_configs) {
+        response.available_configs.forEach(name => {
+            const option = document.createElement('option');
+            option.value = name;
+            const displayName = configNames[name] || name;
+            option.textContent = displayName;
+            if (name === response.autostart_config) {
+                option.selected = true;
+            }
+            select.appendChild(option);
+        });
+        
+        // Render config names list
+        renderConfigNamesList(response.available_configs);
+    }
+    
+    document.getElementById('autostart-toggle').checked = response.autostart || false;
+    updateAutostartStatusUI(response.autostart, response.autostart_config);
+    
+    // Re-render configs with custom names
+    if (allConfigs.length > 0) {
+        renderConfigs(allConfigs);
+    }
+}
+
+function renderConfigNamesList(configs) {
+    lastAvailableConfigs = configs || [];
+    const list = document.getElementById('config-names-list');
+    if (!configs || configs.length === 0) {
+        list.innerHTML = `<p style="color: var(--text-muted);">${t('noRegions')}</p>`;
+        return;
+    }
+    
+    // Get country info for each config
+    const configCountries = {};
+    allConfigs.forEach(c => {
+        configCountries[c.name] = c.country;
+    });
+    
+    list.innerHTML = configs.map(name => {
+        const country = configCountries[name];
+        const flag = country?.flag || '🌍';
+        const customName = configNames[name] || '';
+        return `
+            <div class="config-name-item">
+                <div class="config-original">
+                    <span class="flag">${flag}</span>
+                    <span>${name}</span>
+                </div>
+                <span class="arrow">→</span>
+                <input type="text" 
+                       id="name-${name}" 
+                       value="${customName}" 
+                       placeholder="${t('enterCustomName')}">
+            </div>
+        `;
+    }).join('');
+    
+    // Parse emojis with Twemoji
+    if (typeof twemoji !== 'undefined') {
+        twemoji.parse(list);
+    }
+}
+
+async function saveConfigNames() {
+    const inputs = document.querySelectorAll('.config-name-item input');
+    const newNames = {};
+    
+    inputs.forEach(input => {
+        const configName = input.id.replace('name-', '');
+        const customName = input.value.trim();
+        if (customName) {
+            newNames[configName] = customName;
+        }
+    });
+    
+    try {
+        showToast('Saving names...', 'success');
+        await api('/settings/config-names', 'POST', { config_names: newNames });
+        configNames = newNames;
+        
+        // Re-render configs with new names
+        if (allConfigs.length > 0) {
+            renderConfigs(allConfigs);
+            updateActiveSummary();
+        }
+        
+        // Update autostart dropdown directly
+        updateAutostartDropdown();
+        
+        showToast('Names saved!', 'success');
+    } catch (e) {
+        showToast('Failed to save names', 'error');
+        console.error(e);
+    }
+}
+
+function updateAutostartDropdown() {
+    const select = document.getElementById('autostart-config');
+    const currentValue = select.value;
+    
+    select.innerHTML = `<option value="">${t('selectConfig')}</option>`;
+    
+    lastAvailableConfigs.forEach(name => {
+        const option = document.createElement('option');
+        option.value = name;
+        // Wenn kein custom name existiert, zeige den Original-Dateinamen
+        option.textContent = configNames[name] || name;
+        if (name === currentValue) {
+            option.selected = true;
+        }
+        select.appendChild(option);
+    });
+}
+
+async function clearAllNames() {
+    if (!confirm('Clear all custom names?')) return;
+    
+    try {
+        await api('/settings/config-names', 'POST', { config_names: {} });
+        configNames = {};
+        
+        // Clear inputs
+        document.querySelectorAll('.config-name-item input').forEach(input => {
+            input.value = '';
+        });
+        
+        // Re-render
+        if (allConfigs.length > 0) {
+            renderConfigs(allConfigs);
+            updateActiveSummary();
+        }
+        
+        // Update dropdown to show original names
+        updateAutostartDropdown();
+        showToast('Names cleared', 'success');
+    } catch (e) {
+        showToast('Failed to clear names', 'error');
+    }
+}
+
+function updateAutostartStatusUI(enabled, configName) {
+    const status = document.getElementById('autostart-status');
+    const statusText = document.getElementById('autostart-status-text');
+    const toggleStatus = document.getElementById('autostart-toggle-status');
+    
+    if (enabled && configName) {
+        status.classList.add('active');
+        statusText.textContent = `Autostart: ${configName}`;
+        toggleStatus.textContent = 'ON';
+        toggleStatus.classList.remove('inactive');
+        toggleStatus.classList.add('active');
+    } else {
+        status.classList.remove('active');
+        statusText.textContent = 'Autostart Disabled';
+        toggleStatus.textContent = 'OFF';
+        toggleStatus.classList.remove('active');
+        toggleStatus.classList.add('inactive');
+    }
+}
+
+function toggleAutostartPreview() {
+    const enabled = document.getElementById('autostart-toggle').checked;
+    const toggleStatus = document.getElementById('autostart-toggle-status');
+    
+    toggleStatus.textContent = enabled ? 'ON' : 'OFF';
+    toggleStatus.classList.toggle('active', enabled);
+    toggleStatus.classList.toggle('inactive', !enabled);
+}
+
+async function saveAutostartSettings() {
+    const autostartEnabled = document.getElementById('autostart-toggle').checked;
+    const autostartConfig = document.getElementById('autostart-config').value;
+    
+    if (autostartEnabled && !autostartConfig) {
+        showToast('Please select a config', 'error');
+        return;
+    }
+    
+    try {
+        showToast('Saving settings...', 'success');
+        
+        const response = await api('/settings/autostart', 'POST', {
+            autostart: autostartEnabled,
+            autostart_config: autostartConfig
+        });
+        
+        updateAutostartStatusUI(autostartEnabled, autostartConfig);
+        showToast('Autostart settings saved!', 'success');
+    } catch (e) {
+        showToast('Failed to save settings', 'error');
+        console.error(e);
+    }
+}
+
+// Load settings on page load
+document.addEventListener('DOMContentLoaded', async () => {
+    // Set language selector to saved language
+    document.getElementById('language-select').value = currentLang;
+    updateAllTranslations();
+    
+    refreshStatus();
+    await loadConfigs(); // Load configs first to get allConfigs with flags
+    await loadSettings(); // Then load settings which needs allConfigs
+    loadLogs();
+    setupDragDrop();
+    subscribeEvents();
+    setInterval(refreshSnapshot, 10000);
+    setInterval(updateRegionClock, 1000);
+    setInterval(() => {
+        if (allConfigs.length > 0) {
+            renderConfigs(allConfigs);
+            updateActiveSummary();
+        }
+    }, 60000);
+    
+    // Parse all emojis on page with Twemoji for cross-browser support
+    if (typeof twemoji !== 'undefined') {
+        twemoji.parse(document.body);
+    }
+});
+
+document.addEventListener('keydown', e => {
+    if (e.key === 'Escape') { closeModal(); closeInfoModal(); }
+});